@@ -0,0 +1,267 @@
+"""BK-tree index"""
+
+import heapq
+
+from py_stringmatching import utils
+from py_stringmatching.similarity_measure.levenshtein import Levenshtein
+
+# position of the string and of the children in a node
+STRING_POS = 0
+CHILDREN_POS = 1
+
+
+class BKTree(object):
+    """BK-tree index over a set of strings, for Levenshtein radius and nearest neighbour queries.
+
+    Every node of the tree holds a string, and its children are keyed by their distance to that string. Thanks to the
+    triangle inequality, a query only has to descend into the children whose key is within the query radius of the
+    distance between the query and the node, which prunes most of the comparisons.
+
+    The tree only holds plain Python lists and dicts, so it can be pickled once built and loaded later on.
+
+    Parameters:
+        measure (Levenshtein): Levenshtein measure used to compute the distances (defaults to Levenshtein()). Its
+                               insertion and deletion costs have to be equal, so that the distance is symmetric.
+
+    Raises:
+        ValueError : If the insertion and deletion costs of the measure differ
+    """
+    def __init__(self, measure=None):
+        if measure is None:
+            measure = Levenshtein()
+        if measure.get_ins_cost() != measure.get_del_cost():
+            raise ValueError('BK-tree requires equal insertion and deletion costs')
+        self.measure = measure
+        self.__root = None
+        self.__size = 0
+        self.__max_len = 0
+
+    def __len__(self):
+        return self.__size
+
+    def build(self, strings):
+        """
+        Inserts all the strings of an iterable in the tree.
+
+        Args:
+            strings (iterable): Input strings
+
+        Returns:
+            The tree itself (BKTree)
+
+        Raises:
+            TypeError : If one of the inputs is not a string
+
+        Examples:
+            >>> tree = BKTree().build(['book', 'books', 'cake', 'boo', 'cape'])
+            >>> len(tree)
+            5
+        """
+        for string in strings:
+            self.insert(string)
+        return self
+
+    def insert(self, string):
+        """
+        Inserts a string in the tree.
+
+        Args:
+            string (str): Input string
+
+        Returns:
+            True if the string was inserted, False if it was already in the tree (boolean)
+
+        Raises:
+            TypeError : If the input is not a string
+
+        Examples:
+            >>> tree = BKTree()
+            >>> tree.insert('book')
+            True
+            >>> tree.insert('book')
+            False
+        """
+        # input validations
+        utils.tok_check_for_none(string)
+        utils.tok_check_for_string_input(string)
+
+        if self.__root is None:
+            self.__root = [string, {}]
+            self.__size = 1
+            self.__max_len = len(string)
+            return True
+
+        node = self.__root
+        while True:
+            if string == node[STRING_POS]:
+                return False
+            # different strings can be at distance zero when some costs of
+            # the measure are, in which case they are children of key zero
+            distance = self.measure.get_raw_score(string, node[STRING_POS])
+            child = node[CHILDREN_POS].get(distance)
+            if child is None:
+                node[CHILDREN_POS][distance] = [string, {}]
+                self.__size += 1
+                self.__max_len = max(self.__max_len, len(string))
+                return True
+            node = child
+
+    def query(self, string, max_distance):
+        """
+        Finds all the strings of the tree within a distance of the input string.
+
+        Args:
+            string (str): Input string
+            max_distance (float): Largest distance of the strings to return
+
+        Returns:
+            List of (string, distance) tuples, sorted by increasing distance (list)
+
+        Raises:
+            TypeError : If the input is not a string
+            ValueError : If max_distance is negative
+
+        Examples:
+            >>> tree = BKTree().build(['book', 'books', 'cake', 'boo', 'cape'])
+            >>> tree.query('bo', 2)
+            [('boo', 1), ('book', 2)]
+            >>> tree.query('cope', 1)
+            [('cape', 1)]
+        """
+        # input validations
+        utils.tok_check_for_none(string)
+        utils.tok_check_for_string_input(string)
+        if max_distance < 0:
+            raise ValueError('max_distance should be greater than or equal to zero')
+
+        matches = []
+        if self.__root is None:
+            return matches
+
+        exact_distances = self.__has_exact_distances(string)
+        nodes = [self.__root]
+        while nodes:
+            node = nodes.pop()
+            distance = self.__get_distance(string, node, max_distance)
+            if distance is None:
+                continue
+            if distance <= utils.add_distance_slack(max_distance, max_distance):
+                if not exact_distances:
+                    distance = self.measure.get_raw_score(string, node[STRING_POS])
+                if distance <= max_distance:
+                    matches.append((node[STRING_POS], distance))
+            for child_distance, child in node[CHILDREN_POS].items():
+                if self.__may_hold_matches(child_distance, distance, max_distance):
+                    nodes.append(child)
+
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def nearest(self, string, k=1):
+        """
+        Finds the k strings of the tree nearest to the input string.
+
+        The search radius shrinks to the distance of the k-th nearest string found so far, so that the subtrees
+        which cannot hold a nearer string are pruned.
+
+        Args:
+            string (str): Input string
+            k (int): Number of strings to return (defaults to 1)
+
+        Returns:
+            List of at most k (string, distance) tuples, sorted by increasing distance (list)
+
+        Raises:
+            TypeError : If the input is not a string
+            ValueError : If k is not positive
+
+        Examples:
+            >>> tree = BKTree().build(['book', 'books', 'cake', 'boo', 'cape'])
+            >>> tree.nearest('bool')
+            [('book', 1)]
+            >>> tree.nearest('cakes', 2)
+            [('cake', 1), ('cape', 2)]
+        """
+        # input validations
+        utils.tok_check_for_none(string)
+        utils.tok_check_for_string_input(string)
+        if k < 1:
+            raise ValueError('k should be greater than zero')
+
+        if self.__root is None:
+            return []
+
+        # max-heap of the k best matches found so far, as (-distance,
+        # string) tuples so that the farthest one is on top
+        best = []
+        radius = float('inf')
+        exact_distances = self.__has_exact_distances(string)
+        nodes = [self.__root]
+        while nodes:
+            node = nodes.pop()
+            distance = self.__get_distance(string, node, radius)
+            if distance is None:
+                continue
+            if (not exact_distances and
+                    distance <= utils.add_distance_slack(radius, radius)):
+                distance = self.measure.get_raw_score(string, node[STRING_POS])
+            if distance < radius:
+                heapq.heappush(best, (-distance, node[STRING_POS]))
+                if len(best) > k:
+                    heapq.heappop(best)
+                if len(best) == k:
+                    radius = -best[0][0]
+            # children nearest to the query are pushed last, so that they
+            # are visited first and shrink the radius early
+            children = [(abs(child_distance - distance), child)
+                        for child_distance, child in node[CHILDREN_POS].items()
+                        if self.__may_hold_matches(child_distance, distance, radius)]
+            children.sort(key=lambda child: child[0], reverse=True)
+            nodes.extend(child for _, child in children)
+
+        matches = [(match, -distance) for distance, match in best]
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def get_measure(self):
+        """
+        Get Levenshtein measure
+
+        Returns:
+            Levenshtein measure (Levenshtein)
+        """
+        return self.measure
+
+    def __has_exact_distances(self, string):
+        # True if the distances between string and the strings of the tree
+        # are exact whatever the order of the additions of the costs, in
+        # which case the distances used to prune the tree are those returned
+        # by get_raw_score.
+        return utils.has_exact_sums([self.measure.get_ins_cost(), self.measure.get_del_cost(),
+                                     self.measure.get_sub_cost()],
+                                    len(string) + self.__max_len + 2)
+
+    def __may_hold_matches(self, child_distance, distance, radius):
+        # By the triangle inequality, the strings of the subtree of a child
+        # of a node are at least abs(child_distance - distance) away from a
+        # string at distance from the node.
+        return abs(child_distance - distance) <= utils.add_distance_slack(
+            radius, child_distance + distance + radius)
+
+    def __get_distance(self, string, node, radius):
+        # Distance between string and the string of node, or None if it is
+        # known to be too large for the node or any of its children to be
+        # within radius of string. The children of node are at most
+        # max_child_distance away from it, so by the triangle inequality
+        # distances above radius + max_child_distance need not be computed
+        # exactly.
+        max_child_distance = max(node[CHILDREN_POS]) if node[CHILDREN_POS] else 0
+        max_distance = radius + max_child_distance
+        max_distance = utils.add_distance_slack(max_distance, max_distance)
+        if max_distance == float('inf'):
+            return self.measure.get_raw_score(string, node[STRING_POS])
+        distance = self.measure.get_raw_score(string, node[STRING_POS],
+                                              max_distance)
+        if distance > max_distance:
+            return None
+        return distance
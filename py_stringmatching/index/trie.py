@@ -0,0 +1,167 @@
+"""Trie index"""
+
+from py_stringmatching import utils
+from py_stringmatching.similarity_measure.cython_levenshtein import \
+                                                levenshtein_trie_query
+from py_stringmatching.similarity_measure.levenshtein import Levenshtein
+
+# position of the children and of the word in a node
+CHILDREN_POS = 0
+WORD_POS = 1
+
+
+class Trie(object):
+    """Trie index over a set of strings, for Levenshtein radius queries.
+
+    A query walks down the trie and computes one row of the Levenshtein DP table per node, from the row of its parent.
+    The rows of a common prefix are thus computed once for all the strings sharing it, instead of once per string as
+    in a linear scan. A subtree is pruned as soon as the smallest value of the row of its root exceeds the query
+    radius, as the values of a row never decrease further down the trie.
+
+    The trie only holds plain Python lists and dicts, so it can be pickled once built and loaded later on.
+
+    Parameters:
+        measure (Levenshtein): Levenshtein measure whose costs are used to compute the distances (defaults to
+                               Levenshtein()).
+    """
+    def __init__(self, measure=None):
+        if measure is None:
+            measure = Levenshtein()
+        self.measure = measure
+        self.__root = [{}, None]
+        self.__size = 0
+        self.__max_len = 0
+
+    def __len__(self):
+        return self.__size
+
+    def __contains__(self, string):
+        node = self.__root
+        for char in string:
+            node = node[CHILDREN_POS].get(char)
+            if node is None:
+                return False
+        return node[WORD_POS] is not None
+
+    def build(self, strings):
+        """
+        Inserts all the strings of an iterable in the trie.
+
+        Args:
+            strings (iterable): Input strings
+
+        Returns:
+            The trie itself (Trie)
+
+        Raises:
+            TypeError : If one of the inputs is not a string
+
+        Examples:
+            >>> trie = Trie().build(['book', 'books', 'cake', 'boo', 'cape'])
+            >>> len(trie)
+            5
+        """
+        for string in strings:
+            self.insert(string)
+        return self
+
+    def insert(self, string):
+        """
+        Inserts a string in the trie.
+
+        Args:
+            string (str): Input string
+
+        Returns:
+            True if the string was inserted, False if it was already in the trie (boolean)
+
+        Raises:
+            TypeError : If the input is not a string
+
+        Examples:
+            >>> trie = Trie()
+            >>> trie.insert('book')
+            True
+            >>> trie.insert('book')
+            False
+        """
+        # input validations
+        utils.tok_check_for_none(string)
+        utils.tok_check_for_string_input(string)
+
+        node = self.__root
+        for char in string:
+            child = node[CHILDREN_POS].get(char)
+            if child is None:
+                child = [{}, None]
+                node[CHILDREN_POS][char] = child
+            node = child
+        if node[WORD_POS] is not None:
+            return False
+        node[WORD_POS] = string
+        self.__size += 1
+        self.__max_len = max(self.__max_len, len(string))
+        return True
+
+    def query(self, string, max_distance):
+        """
+        Finds all the strings of the trie within a Levenshtein distance of the input string.
+
+        The distance of a string of the trie is the one returned by the get_raw_score method of the measure, with the
+        input string as first argument.
+
+        Args:
+            string (str): Input string
+            max_distance (float): Largest distance of the strings to return
+
+        Returns:
+            List of (string, distance) tuples, sorted by increasing distance (list)
+
+        Raises:
+            TypeError : If the input is not a string
+            ValueError : If max_distance is negative
+
+        Examples:
+            >>> trie = Trie().build(['book', 'books', 'cake', 'boo', 'cape'])
+            >>> trie.query('bo', 2)
+            [('boo', 1), ('book', 2)]
+            >>> trie.query('cope', 1)
+            [('cape', 1)]
+        """
+        # input validations
+        utils.tok_check_for_none(string)
+        utils.tok_check_for_string_input(string)
+        if max_distance < 0:
+            raise ValueError('max_distance should be greater than or equal to zero')
+
+        costs = [self.measure.get_ins_cost(), self.measure.get_del_cost(),
+                 self.measure.get_sub_cost()]
+        if utils.has_exact_sums(costs, len(string) + self.__max_len + 2):
+            matches = levenshtein_trie_query(self.__root, string,
+                                             self.__max_len, max_distance,
+                                             *costs)
+        else:
+            # The rows of the trie add the costs in another order than
+            # get_raw_score, so the words are looked for within a slightly
+            # larger distance, and are then scored by get_raw_score.
+            matches = levenshtein_trie_query(
+                self.__root, string, self.__max_len,
+                utils.add_distance_slack(max_distance, max_distance), *costs)
+            matches = [(match, self.measure.get_raw_score(string, match))
+                       for match, _ in matches]
+            matches = [match for match in matches
+                       if match[1] <= max_distance]
+        if self.measure._has_unit_costs():
+            # unit cost distances are integers
+            matches = [(match, int(distance)) for match, distance in matches]
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def get_measure(self):
+        """
+        Get Levenshtein measure
+
+        Returns:
+            Levenshtein measure (Levenshtein)
+        """
+        return self.measure
@@ -2,9 +2,9 @@
 
 import numpy as np
 
-
 from py_stringmatching import utils
-from six.moves import xrange
+from py_stringmatching.similarity_measure.cython_alignment import affine, \
+                                                                 affine_batch
 from py_stringmatching.similarity_measure.sequence_similarity_measure import \
                                                     SequenceSimilarityMeasure
 
@@ -22,13 +22,20 @@ class Affine(SequenceSimilarityMeasure):
     Parameters:
         gap_start (float): Cost for the gap at the start (defaults to 1)
         gap_continuation (float): Cost for the gap continuation (defaults to 0.5)
-        sim_func (function): Function computing similarity score between two chars, 
-        represented as strings (defaults to identity).
+        sim_func (function or SubstitutionMatrix): Function computing similarity score between two chars, 
+        represented as strings (defaults to identity). A SubstitutionMatrix is looked up without calling a Python
+        function per pair of characters.
+        band (int or str): If an integer, only the alignments staying within band diagonals of the diagonals joining
+        the corners of the DP tables are scored, which takes O(band * n) time instead of O(n * m), and gives a lower
+        bound of the score. If 'adaptive', the band is doubled until the score is provably the affine gap score.
+        Defaults to None, where the whole DP tables are computed.
     """
-    def __init__(self, gap_start=1, gap_continuation=0.5, sim_func=sim_ident):
+    def __init__(self, gap_start=1, gap_continuation=0.5, sim_func=sim_ident, band=None):
+        utils.sim_check_for_band(band)
         self.gap_start = gap_start
         self.gap_continuation = gap_continuation
         self.sim_func = sim_func
+        self.band = band
         super(Affine, self).__init__()
 
     def get_raw_score(self, string1, string2):
@@ -54,6 +61,9 @@ class Affine(SequenceSimilarityMeasure):
             >>> aff = Affine(gap_continuation=0.2, sim_func=lambda s1, s2: (int(1 if s1 == s2 else 0)))
             >>> aff.get_raw_score('AAAGAATTCA', 'AAATCA')
             4.4
+            >>> aff = Affine(band='adaptive')
+            >>> aff.get_raw_score('dva', 'deeva')
+            1.5
         """
         # input validations
         utils.sim_check_for_none(string1, string2)
@@ -65,41 +75,86 @@ class Affine(SequenceSimilarityMeasure):
 
         gap_start = -self.gap_start
         gap_continuation = -self.gap_continuation
-        m = np.zeros((len(string1) + 1, len(string2) + 1), dtype=np.float)
-        x = np.zeros((len(string1) + 1, len(string2) + 1), dtype=np.float)
-        y = np.zeros((len(string1) + 1, len(string2) + 1), dtype=np.float)
-
-        # DP initialization
-        for i in xrange(1, len(string1) + 1):
-            m[i][0] = -float("inf")
-            x[i][0] = gap_start + (i - 1) * gap_continuation
-            y[i][0] = -float("inf")
-
-        # DP initialization
-        for j in xrange(1, len(string2) + 1):
-            m[0][j] = -float("inf")
-            x[0][j] = -float("inf")
-            y[0][j] = gap_start + (j - 1) * gap_continuation
-
-        # affine gap calculation using DP
-        for i in xrange(1, len(string1) + 1):
-            for j in xrange(1, len(string2) + 1):
-                # best score between x_1....x_i and y_1....y_j
-                # given that x_i is aligned to y_j
-                m[i][j] = (self.sim_func(string1[i - 1], string2[j - 1]) +
-                           max(m[i - 1][j - 1], x[i - 1][j - 1],
-                               y[i - 1][j - 1]))
-
-                # the best score given that x_i is aligned to a gap
-                x[i][j] = max(gap_start + m[i - 1][j],
-                              gap_continuation + x[i - 1][j])
-
-                # the best score given that y_j is aligned to a gap
-                y[i][j] = max(gap_start + m[i][j - 1],
-                              gap_continuation + y[i][j - 1])
-
-        return max(m[len(string1)][len(string2)], x[len(string1)][len(string2)],
-                   y[len(string1)][len(string2)])
+
+        # With the identity similarity and a gap continuation no costlier
+        # than a gap start, the common prefix and suffix of the strings are
+        # always aligned with each other, so they only add their length to
+        # the score of the rest. They are only trimmed when the scores add
+        # up exactly, as otherwise the score of the rest plus their length
+        # can differ from the whole DP in the last bits.
+        affix_score = 0
+        if (self.sim_func is sim_ident and
+                0 <= self.gap_continuation <= self.gap_start and
+                utils.has_exact_sums([self.gap_start, self.gap_continuation],
+                                     len(string1) + len(string2) + 2)):
+            prefix_len, suffix_len = utils.get_common_affix_lengths(string1,
+                                                                    string2)
+            affix_score = prefix_len + suffix_len
+            string1 = string1[prefix_len:len(string1) - suffix_len]
+            string2 = string2[prefix_len:len(string2) - suffix_len]
+            # what is left of the shorter string may be empty, in which case
+            # the rest of the longer one is a single gap
+            if len(string1) == 0 or len(string2) == 0:
+                gap_len = max(len(string1), len(string2))
+                if gap_len == 0:
+                    return float(affix_score)
+                return (affix_score + gap_start +
+                        (gap_len - 1) * gap_continuation)
+        # the identity similarity is computed without calling sim_ident
+        sim_func = None if self.sim_func is sim_ident else self.sim_func
+        band, adaptive = utils.get_band_arguments(self.band)
+        return affix_score + affine(string1, string2, self.gap_start,
+                                    self.gap_continuation, sim_func, band,
+                                    adaptive)
+
+    def get_raw_scores(self, strings1, strings2, n_jobs=1):
+        """
+        Computes the affine gap score between the pairs of strings of two lists, or between a string and each string
+        of a list.
+
+        The strings are turned into arrays of codes once, and the pairs are scored by the compiled kernel without
+        holding the GIL, so the work is spread over n_jobs threads of the current process. A similarity function that
+        is neither the identity nor a SubstitutionMatrix is called with the GIL held, and a band of fixed width is
+        computed pair by pair.
+
+        Args:
+            strings1 (str or list): Input string, or list of input strings
+            strings2 (list): List of input strings, as long as strings1 if it is a list
+            n_jobs (int): Number of threads to use (defaults to 1). If -1 all CPUs are used, if -2 all CPUs but one,
+                          and so on.
+
+        Returns:
+            Affine gap scores in the order of the pairs (NumPy array of floats)
+
+        Raises:
+            TypeError : If the inputs are not strings or lists of strings, or if one of the inputs is None.
+            ValueError : If the lists do not have the same length, or if n_jobs is zero.
+
+        Examples:
+            >>> aff = Affine()
+            >>> aff.get_raw_scores(['dva', 'AAAGAATTCA'], ['deeva', 'AAATCA'])
+            array([1.5, 3.5])
+            >>> aff.get_raw_scores('dva', ['deeva', 'dva', ''], n_jobs=-1)
+            array([1.5, 3. , 0. ])
+        """
+        strings1, strings2 = utils.get_string_pairs(strings1, strings2)
+        num_threads = utils.get_num_threads(n_jobs)
+        if self.band is not None and self.band != 'adaptive':
+            if not isinstance(strings1, list):
+                strings1 = [strings1] * len(strings2)
+            return np.array([self.get_raw_score(string1, string2)
+                             for string1, string2 in zip(strings1, strings2)], dtype=np.float64)
+
+        # with the identity similarity, the common affixes are trimmed as
+        # in get_raw_score
+        trim_affixes = (self.sim_func is sim_ident and
+                        0 <= self.gap_continuation <= self.gap_start and
+                        utils.has_exact_sums([self.gap_start, self.gap_continuation],
+                                             utils.get_max_pair_length(strings1, strings2) + 2))
+        sim_func = None if self.sim_func is sim_ident else self.sim_func
+        return affine_batch(strings1, strings2, self.gap_start,
+                            self.gap_continuation, sim_func, trim_affixes,
+                            num_threads)
 
     def get_gap_start(self):
         """
@@ -128,6 +183,15 @@ class Affine(SequenceSimilarityMeasure):
         """
         return self.sim_func
 
+    def get_band(self):
+        """
+        Get band
+
+        Returns:
+            band (int or str)
+        """
+        return self.band
+
     def set_gap_start(self, gap_start):
         """
         Set gap start cost
@@ -153,7 +217,20 @@ class Affine(SequenceSimilarityMeasure):
         Set similarity function
 
         Args:
-            sim_func (function): Function computing similarity score between two chars, represented as strings.
+            sim_func (function or SubstitutionMatrix): Function computing similarity score between two chars,
+                represented as strings.
         """
         self.sim_func = sim_func
         return True
+
+    def set_band(self, band):
+        """
+        Set band
+
+        Args:
+            band (int or str): Number of diagonals the alignments can stray from those joining the corners of the DP
+                tables, 'adaptive' or None.
+        """
+        utils.sim_check_for_band(band)
+        self.band = band
+        return True
@@ -0,0 +1,1675 @@
+# cython: boundscheck=False
+
+from __future__ import division
+cimport cython
+from cython.parallel cimport parallel, prange
+
+from libc.stdlib cimport malloc, realloc, free
+
+import numpy as np
+
+from py_stringmatching.similarity_measure.cython_utils cimport (
+    ustr_t, as_unicode, init_ustr, char_at)
+from py_stringmatching.similarity_measure.substitution_matrix import \
+                                                    SubstitutionMatrix
+
+
+cdef double INF = float('inf')
+cdef double NEG_INF = -INF
+
+cdef enum:
+    # where _SimRows takes the similarity scores from
+    IDENT_SIMS = 0
+    TABLE_SIMS = 1
+    FUNC_SIMS = 2
+    # strings whose shorter one has fewer characters are aligned row by
+    # row, as the anti-diagonals are too short to pay off
+    WAVEFRONT_MIN_LEN = 16
+    # alignments of at most this many cells are traced back from a full DP
+    # table, larger ones are split in two by Hirschberg's algorithm
+    HIRSCHBERG_BASE_CELLS = 4096
+    # first band tried by the adaptive banded DP, which is then doubled
+    ADAPTIVE_MIN_BAND = 8
+    # largest number of scores kept in the profile of SmithWatermanScanner
+    MAX_PROFILE_SIZE = 1 << 20
+
+cdef enum:
+    # measures computed by _alignment_batch
+    NEEDLEMAN_WUNSCH = 0
+    SMITH_WATERMAN = 1
+    AFFINE = 2
+
+cdef enum:
+    # operations of an alignment, one per column of the alignment
+    OP_ALIGN = 0
+    OP_DELETE = 1
+    OP_INSERT = 2
+
+
+# The max helpers keep the first of equal values, as Python's max does, so
+# that the kernels return the same scores as the original pure Python DP,
+# down to the sign of zero. Written as Python's max compares, the second
+# value is taken only if it is larger, which compiles to a max instruction
+# rather than a branch.
+cdef inline double max2(double a, double b) nogil:
+    return b if b > a else a
+
+
+cdef inline double max3(double a, double b, double c) nogil:
+    return max2(max2(a, b), c)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _ident_sims(const ustr_t *outer, Py_ssize_t i, const ustr_t *inner,
+                      Py_ssize_t start, Py_ssize_t end, double *sims) nogil:
+    # scores of the identity similarity between the i-th character of outer
+    # and the characters start to end - 1 of inner
+    cdef Py_UCS4 lchar = char_at(outer, i)
+    cdef Py_ssize_t j = 0
+    for j in range(start, end):
+        sims[j - start] = 1 if char_at(inner, j) == lchar else 0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _table_sims(const double *table_row, const Py_ssize_t *inner_index,
+                      Py_ssize_t len_inner, double *sims) nogil:
+    # scores of a character of the alphabet against every character of a
+    # string made only of characters of the alphabet
+    cdef Py_ssize_t j = 0
+    for j in range(len_inner):
+        sims[j] = table_row[inner_index[j]]
+
+
+cdef struct _Diagonals:
+    # What _fill_diagonal reads: the codes of the outer string, reversed,
+    # then those of the inner one, and the table of a substitution matrix
+    # indexed by the codes, or NULL for the identity similarity.
+    int *codes
+    Py_ssize_t len_outer
+    Py_ssize_t len_inner
+    const double *table
+    Py_ssize_t alphabet_size
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fill_diagonal(const _Diagonals *diagonals, Py_ssize_t k,
+                         Py_ssize_t low, Py_ssize_t high,
+                         double *sims) nogil:
+    # Scores of the cells (k - j, j) of the k-th anti-diagonal of the DP
+    # table, for low <= j <= high, in sims[j]. There are no data
+    # dependencies between the cells, so that the compiler vectorizes the
+    # loops.
+    cdef const int *outer_codes = (diagonals.codes + diagonals.len_outer -
+                                   k)
+    cdef const int *inner_codes = diagonals.codes + diagonals.len_outer - 1
+    cdef const double *table = diagonals.table
+    cdef Py_ssize_t alphabet_size = diagonals.alphabet_size
+    cdef Py_ssize_t j = 0
+    if table == NULL:
+        for j in range(low, high + 1):
+            sims[j] = outer_codes[j] == inner_codes[j]
+    else:
+        for j in range(low, high + 1):
+            sims[j] = table[outer_codes[j] * alphabet_size + inner_codes[j]]
+
+
+cdef class _SimRows:
+    # Similarity scores between the characters of two strings, given one
+    # character of the outer string against all of the inner one at a time.
+    # Unless swap is False, the inner string is the shorter one, so that
+    # the DP rows laid along it take the least memory. The scores come from the identity similarity
+    # if sim_func is None, from the table of a SubstitutionMatrix, or from
+    # sim_func, which always gets the characters in the order of the
+    # original strings.
+    cdef unicode outer_str
+    cdef unicode inner_str
+    cdef ustr_t outer
+    cdef ustr_t inner
+    cdef bint swapped
+    cdef int mode
+    cdef object sim_func
+    cdef list outer_chars
+    cdef list inner_chars
+    cdef double[:, ::1] table
+    cdef Py_ssize_t[::1] outer_index
+    cdef Py_ssize_t[::1] inner_index
+    cdef bint inner_in_table
+    cdef bint has_diagonals
+    cdef _Diagonals diagonals
+
+    def __cinit__(self, object string1, object string2, object sim_func,
+                  bint swap=True):
+        cdef unicode unicode_s1 = as_unicode(string1)
+        cdef unicode unicode_s2 = as_unicode(string2)
+        cdef bint outer_in_table = False
+
+        # the DPs are the same once transposed
+        self.swapped = swap and len(unicode_s2) > len(unicode_s1)
+        if self.swapped:
+            string1, string2 = string2, string1
+            unicode_s1, unicode_s2 = unicode_s2, unicode_s1
+        self.outer_str = unicode_s1
+        self.inner_str = unicode_s2
+        init_ustr(&self.outer, self.outer_str)
+        init_ustr(&self.inner, self.inner_str)
+
+        if sim_func is None:
+            self.mode = IDENT_SIMS
+            self.has_diagonals = True
+            return
+
+        if isinstance(sim_func, SubstitutionMatrix):
+            self.mode = TABLE_SIMS
+            # the rows of the table are indexed by the characters of string1,
+            # those of the outer string are needed
+            if self.swapped:
+                self.table = np.ascontiguousarray(sim_func.get_table().T)
+            else:
+                self.table = sim_func.get_table()
+            self.outer_index = self._index(sim_func, self.outer_str,
+                                           &outer_in_table)
+            self.inner_index = self._index(sim_func, self.inner_str,
+                                           &self.inner_in_table)
+            self.has_diagonals = outer_in_table and self.inner_in_table
+            sim_func = sim_func.get_sim_func()
+        else:
+            self.mode = FUNC_SIMS
+        self.sim_func = sim_func
+        # characters outside of a substitution matrix are rare, but they
+        # are passed to sim_func as the original strings hold them
+        self.outer_chars = list(string1)
+        self.inner_chars = list(string2)
+
+    def __dealloc__(self):
+        free(self.diagonals.codes)
+
+    cdef int prepare_diagonals(self) except -1:
+        # Codes of the characters read by _fill_diagonal: codepoints for the
+        # identity similarity, positions in the alphabet for a substitution
+        # matrix. The outer string comes first and reversed, so that the
+        # characters of both strings along an anti-diagonal are read in
+        # increasing order.
+        cdef Py_ssize_t len_outer = self.outer.length
+        cdef Py_ssize_t i = 0
+        cdef int *codes = <int *> malloc((len_outer + self.inner.length + 1) *
+                                         sizeof(int))
+        if codes == NULL:
+            raise MemoryError()
+        self.diagonals.codes = codes
+        self.diagonals.len_outer = len_outer
+        self.diagonals.len_inner = self.inner.length
+        self.diagonals.table = NULL
+        if self.mode == IDENT_SIMS:
+            for i in range(len_outer):
+                codes[len_outer - 1 - i] = char_at(&self.outer, i)
+            for i in range(self.inner.length):
+                codes[len_outer + i] = char_at(&self.inner, i)
+        else:
+            for i in range(len_outer):
+                codes[len_outer - 1 - i] = self.outer_index[i]
+            for i in range(self.inner.length):
+                codes[len_outer + i] = self.inner_index[i]
+            self.diagonals.table = &self.table[0, 0]
+            self.diagonals.alphabet_size = self.table.shape[1]
+        return 0
+
+    cdef object _index(self, object matrix, unicode string,
+                       bint *in_table):
+        # position in the alphabet of every character of string, or -1, and
+        # whether they all are in the alphabet
+        cdef dict char_index = matrix._char_index
+        cdef Py_ssize_t[::1] index = np.empty(len(string), dtype=np.intp)
+        cdef Py_ssize_t i = 0
+        cdef object position
+        in_table[0] = True
+        for i in range(len(string)):
+            position = char_index.get(string[i])
+            if position is None:
+                index[i] = -1
+                in_table[0] = False
+            else:
+                index[i] = position
+        return index
+
+    cdef double _call(self, Py_ssize_t i, Py_ssize_t j) except? -1:
+        if self.swapped:
+            return self.sim_func(self.inner_chars[j], self.outer_chars[i])
+        return self.sim_func(self.outer_chars[i], self.inner_chars[j])
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef int fill(self, Py_ssize_t i, double *sims) except -1:
+        # scores of the i-th character of the outer string against every
+        # character of the inner one
+        return self.fill_span(i, 0, self.inner.length, False, sims)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef int fill_span(self, Py_ssize_t i, Py_ssize_t start, Py_ssize_t end,
+                       bint reverse, double *sims) except -1:
+        # scores of the i-th character of the outer string against the
+        # characters start to end - 1 of the inner one, in sims[0] to
+        # sims[end - start - 1], or in the reverse order
+        cdef Py_ssize_t j = 0
+        cdef Py_ssize_t row_index = -1
+        cdef double swap
+        if end <= start:
+            return 0
+
+        if self.mode == IDENT_SIMS:
+            with nogil:
+                _ident_sims(&self.outer, i, &self.inner, start, end, sims)
+        elif self.mode == TABLE_SIMS:
+            row_index = self.outer_index[i]
+            if row_index >= 0 and self.inner_in_table:
+                with nogil:
+                    _table_sims(&self.table[row_index, 0],
+                                &self.inner_index[start], end - start, sims)
+            else:
+                for j in range(start, end):
+                    if row_index >= 0 and self.inner_index[j] >= 0:
+                        sims[j - start] = self.table[row_index,
+                                                     self.inner_index[j]]
+                    else:
+                        sims[j - start] = self._call(i, j)
+        else:
+            for j in range(start, end):
+                sims[j - start] = self._call(i, j)
+
+        if reverse:
+            for j in range((end - start) // 2):
+                swap = sims[j]
+                sims[j] = sims[end - start - 1 - j]
+                sims[end - start - 1 - j] = swap
+        return 0
+
+    cdef double max_sim(self) except? -1:
+        # Largest score of a character of the outer string against one of
+        # the inner string, found by scoring every pair of distinct
+        # characters once. The identity similarity is bounded by 1.
+        cdef dict outer_first = {}
+        cdef dict inner_first = {}
+        cdef Py_ssize_t i = 0
+        cdef Py_ssize_t j = 0
+        cdef double best = NEG_INF
+        cdef double score = 0
+        if self.mode == IDENT_SIMS:
+            return 1
+        for i in range(self.outer.length):
+            outer_first.setdefault(self.outer_str[i], i)
+        for j in range(self.inner.length):
+            inner_first.setdefault(self.inner_str[j], j)
+        for i in outer_first.values():
+            for j in inner_first.values():
+                if (self.mode == TABLE_SIMS and self.outer_index[i] >= 0 and
+                        self.inner_index[j] >= 0):
+                    score = self.table[self.outer_index[i],
+                                       self.inner_index[j]]
+                else:
+                    score = self._call(i, j)
+                best = max2(best, score)
+        return best
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _needleman_wunsch_row(const double *sims, Py_ssize_t len_inner,
+                                Py_ssize_t i, double gap_cost,
+                                double *row) nogil:
+    # turns row i - 1 of the Needleman-Wunsch DP into row i, in place
+    cdef Py_ssize_t j = 0
+    cdef double diag = row[0]
+    cdef double above = 0
+    cdef double value = 0
+
+    row[0] = -(i * gap_cost)
+    for j in range(1, len_inner + 1):
+        above = row[j]
+        value = max3(diag + sims[j - 1], above - gap_cost,
+                     row[j - 1] - gap_cost)
+        row[j] = value
+        diag = above
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _smith_waterman_row(const double *sims, Py_ssize_t len_inner,
+                                double gap_cost, double *row) nogil:
+    # turns row i - 1 of the Smith-Waterman DP into row i, in place, and
+    # returns the largest value of row i
+    cdef Py_ssize_t j = 0
+    cdef double diag = row[0]
+    cdef double above = 0
+    cdef double value = 0
+    cdef double max_value = 0
+
+    for j in range(1, len_inner + 1):
+        above = row[j]
+        value = max2(0, max3(diag + sims[j - 1], above - gap_cost,
+                             row[j - 1] - gap_cost))
+        row[j] = value
+        diag = above
+        if value > max_value:
+            max_value = value
+    return max_value
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _needleman_wunsch_wavefront(const _Diagonals *diagonals,
+                                        double gap_cost,
+                                        double *buffer) nogil:
+    # Needleman-Wunsch DP computed one anti-diagonal at a time, along which
+    # the cells do not depend on each other. Anti-diagonal k holds the cells
+    # (k - j, j) at index j, its cells above (k - j - 1, j) and to the left
+    # (k - j, j - 1) are on anti-diagonal k - 1, at index j and j - 1, and
+    # its diagonal neighbour on anti-diagonal k - 2, at index j - 1. buffer
+    # has to hold 4 * (len_inner + 1) values.
+    cdef Py_ssize_t len_outer = diagonals.len_outer
+    cdef Py_ssize_t len_inner = diagonals.len_inner
+    cdef double *prev2 = buffer
+    cdef double *prev1 = prev2 + len_inner + 1
+    cdef double *current = prev1 + len_inner + 1
+    cdef double *sims = current + len_inner + 1
+    cdef double *swap
+    cdef Py_ssize_t k = 0
+    cdef Py_ssize_t j = 0
+    cdef Py_ssize_t low = 0
+    cdef Py_ssize_t high = 0
+
+    prev1[0] = 0
+    for k in range(1, len_outer + len_inner + 1):
+        low = k - len_outer if k > len_outer else 1
+        high = k - 1 if k <= len_inner else len_inner
+        if k <= len_outer:
+            current[0] = -(k * gap_cost)
+        if k <= len_inner:
+            current[k] = -(k * gap_cost)
+        _fill_diagonal(diagonals, k, low, high, sims)
+        for j in range(low, high + 1):
+            current[j] = max3(prev2[j - 1] + sims[j], prev1[j] - gap_cost,
+                              prev1[j - 1] - gap_cost)
+        swap = prev2
+        prev2 = prev1
+        prev1 = current
+        current = swap
+    return prev1[len_inner]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _smith_waterman_wavefront(const _Diagonals *diagonals,
+                                      double gap_cost, double *buffer) nogil:
+    # Smith-Waterman DP computed one anti-diagonal at a time, as in
+    # _needleman_wunsch_wavefront. The largest value of every column is
+    # kept in best, rather than a running maximum which would chain the
+    # cells again. buffer has to hold 5 * (len_inner + 1) values.
+    cdef Py_ssize_t len_outer = diagonals.len_outer
+    cdef Py_ssize_t len_inner = diagonals.len_inner
+    cdef double *prev2 = buffer
+    cdef double *prev1 = prev2 + len_inner + 1
+    cdef double *current = prev1 + len_inner + 1
+    cdef double *sims = current + len_inner + 1
+    cdef double *best = sims + len_inner + 1
+    cdef double *swap
+    cdef double value = 0
+    cdef double max_value = 0
+    cdef Py_ssize_t k = 0
+    cdef Py_ssize_t j = 0
+    cdef Py_ssize_t low = 0
+    cdef Py_ssize_t high = 0
+
+    for j in range(len_inner + 1):
+        prev2[j] = 0
+        prev1[j] = 0
+        current[j] = 0
+        best[j] = 0
+    for k in range(2, len_outer + len_inner + 1):
+        low = k - len_outer if k > len_outer else 1
+        high = k - 1 if k <= len_inner else len_inner
+        # the cells of row and column 0 stay 0
+        current[0] = 0
+        if k <= len_inner:
+            current[k] = 0
+        _fill_diagonal(diagonals, k, low, high, sims)
+        for j in range(low, high + 1):
+            value = max2(0, max3(prev2[j - 1] + sims[j], prev1[j] - gap_cost,
+                                 prev1[j - 1] - gap_cost))
+            current[j] = value
+            best[j] = max2(best[j], value)
+        swap = prev2
+        prev2 = prev1
+        prev1 = current
+        current = swap
+    for j in range(1, len_inner + 1):
+        if best[j] > max_value:
+            max_value = best[j]
+    return max_value
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _affine_init(Py_ssize_t len_inner, double gap_start,
+                       double gap_continuation, double *m, double *x,
+                       double *y) nogil:
+    # row 0 of the three Gotoh matrices, along the inner string
+    cdef Py_ssize_t j = 0
+    m[0] = 0
+    x[0] = 0
+    y[0] = 0
+    for j in range(1, len_inner + 1):
+        m[j] = NEG_INF
+        x[j] = NEG_INF
+        y[j] = gap_start + (j - 1) * gap_continuation
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _affine_row(const double *sims, Py_ssize_t len_inner, Py_ssize_t i,
+                      double gap_start, double gap_continuation, double *m,
+                      double *x, double *y) nogil:
+    # Turns row i - 1 of the three Gotoh matrices into row i, in place.
+    # m is the best score of the alignments ending with both characters
+    # aligned, x (y) of those ending with a character of the outer (inner)
+    # string aligned to a gap.
+    cdef Py_ssize_t j = 0
+    cdef double diag = max3(m[0], x[0], y[0])
+    cdef double above = 0
+
+    m[0] = NEG_INF
+    x[0] = gap_start + (i - 1) * gap_continuation
+    y[0] = NEG_INF
+    for j in range(1, len_inner + 1):
+        above = max3(m[j], x[j], y[j])
+        x[j] = max2(gap_start + m[j], gap_continuation + x[j])
+        m[j] = sims[j - 1] + diag
+        y[j] = max2(gap_start + m[j - 1], gap_continuation + y[j - 1])
+        diag = above
+
+
+# The banded DPs only compute the cells (i, j) of the DP table such that
+# len_inner - len_outer - band <= j - i <= band, that is the diagonals
+# between the one starting at the top left corner and the one ending at the
+# bottom right corner, widened by band on each side. The cells outside of
+# the band are -inf, so that their values are those of the best alignments
+# staying in the band. Row i of the band spans the columns start to end,
+# the cell to the left of start and the one below end + 1 are set to -inf
+# before being read by the next row.
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _needleman_wunsch_band(_SimRows sim_rows, double gap_cost,
+                                   Py_ssize_t band, double *row,
+                                   double *sims) except? -1:
+    cdef Py_ssize_t len_inner = sim_rows.inner.length
+    cdef Py_ssize_t low = len_inner - sim_rows.outer.length - band
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef Py_ssize_t start = 0
+    cdef Py_ssize_t end = 0
+    cdef double diag = 0
+    cdef double above = 0
+
+    for j in range(len_inner + 1):
+        row[j] = -(j * gap_cost) if j <= band else NEG_INF
+    for i in range(1, sim_rows.outer.length + 1):
+        start = max(i + low, 0)
+        end = min(i + band, len_inner)
+        if start == 0:
+            diag = row[0]
+            row[0] = -(i * gap_cost)
+            start = 1
+        else:
+            diag = row[start - 1]
+            row[start - 1] = NEG_INF
+        sim_rows.fill_span(i - 1, start - 1, end, False, sims)
+        for j in range(start, end + 1):
+            above = row[j]
+            row[j] = max3(diag + sims[j - start], above - gap_cost,
+                          row[j - 1] - gap_cost)
+            diag = above
+        if end < len_inner:
+            row[end + 1] = NEG_INF
+    return row[len_inner]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _affine_band(_SimRows sim_rows, double gap_start,
+                         double gap_continuation, Py_ssize_t band, double *m,
+                         double *x, double *y, double *sims) except? -1:
+    cdef Py_ssize_t len_inner = sim_rows.inner.length
+    cdef Py_ssize_t low = len_inner - sim_rows.outer.length - band
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef Py_ssize_t start = 0
+    cdef Py_ssize_t end = 0
+    cdef double diag = 0
+    cdef double above = 0
+
+    _affine_init(len_inner, gap_start, gap_continuation, m, x, y)
+    for j in range(band + 1, len_inner + 1):
+        y[j] = NEG_INF
+    for i in range(1, sim_rows.outer.length + 1):
+        start = max(i + low, 0)
+        end = min(i + band, len_inner)
+        if start == 0:
+            diag = max3(m[0], x[0], y[0])
+            m[0] = NEG_INF
+            x[0] = gap_start + (i - 1) * gap_continuation
+            y[0] = NEG_INF
+            start = 1
+        else:
+            diag = max3(m[start - 1], x[start - 1], y[start - 1])
+            m[start - 1] = NEG_INF
+            x[start - 1] = NEG_INF
+            y[start - 1] = NEG_INF
+        sim_rows.fill_span(i - 1, start - 1, end, False, sims)
+        for j in range(start, end + 1):
+            above = max3(m[j], x[j], y[j])
+            x[j] = max2(gap_start + m[j], gap_continuation + x[j])
+            m[j] = sims[j - start] + diag
+            y[j] = max2(gap_start + m[j - 1], gap_continuation + y[j - 1])
+            diag = above
+        if end < len_inner:
+            m[end + 1] = NEG_INF
+            x[end + 1] = NEG_INF
+            y[end + 1] = NEG_INF
+    return max3(m[len_inner], x[len_inner], y[len_inner])
+
+
+cdef double _out_of_band_bound(Py_ssize_t len_outer, Py_ssize_t len_inner,
+                               Py_ssize_t band, double max_sim,
+                               double gap_start, double gap_continuation):
+    # Upper bound of the score of the alignments leaving the band, with
+    # gaps costing gap_start, plus gap_continuation per character after the
+    # first one. Such an alignment reaches a diagonal band + 1 away from
+    # the band, so that it has at least num_gaps characters aligned to
+    # gaps, and (len_outer + len_inner - num_gaps) / 2 pairs of aligned
+    # characters. The cost of its gaps is at least that of one gap of
+    # num_gaps characters or of num_gaps gaps of one character. Both bounds
+    # are linear in num_gaps, so that they are largest at its least or
+    # largest value.
+    cdef double max_gaps = len_outer + len_inner
+    cdef double num_gaps = len_outer - len_inner + 2 * (band + 1)
+    cdef double bound = NEG_INF
+    cdef int k = 0
+    for k in range(2):
+        bound = max2(bound, (max_gaps - num_gaps) / 2 * max_sim -
+                     min(gap_start + (num_gaps - 1) * gap_continuation,
+                         num_gaps * gap_start))
+        num_gaps = max_gaps
+    return bound
+
+
+cdef double _banded_score(_SimRows sim_rows, double gap_start,
+                          double gap_continuation, Py_ssize_t band,
+                          bint adaptive, bint affine) except? -1:
+    # Needleman-Wunsch (with gap_start equal to gap_continuation) or affine
+    # gap score of the alignments staying in the band. If adaptive, the
+    # band is doubled until the score is larger than the bound of the
+    # alignments leaving it, by a margin covering the rounding errors, so
+    # that it is the score of the full DP. None is left once the band
+    # spans the whole DP table, which is then computed as usual.
+    cdef Py_ssize_t len_outer = sim_rows.outer.length
+    cdef Py_ssize_t len_inner = sim_rows.inner.length
+    cdef double max_sim = 0
+    cdef double margin = 0
+    cdef double score = 0
+    cdef double *rows = NULL
+
+    if adaptive:
+        band = max(band, ADAPTIVE_MIN_BAND)
+        if band < len_inner:
+            max_sim = sim_rows.max_sim()
+            margin = 1e-9 * (len_outer + len_inner) * max(
+                1, abs(max_sim), abs(gap_start), abs(gap_continuation))
+    if band >= len_inner:
+        if affine:
+            return _affine_full(sim_rows, gap_start, gap_continuation)
+        return _needleman_wunsch_full(sim_rows, gap_start)
+
+    rows = <double *> malloc(4 * (len_inner + 1) * sizeof(double))
+    if rows == NULL:
+        raise MemoryError()
+    try:
+        while True:
+            if affine:
+                score = _affine_band(sim_rows, -gap_start, -gap_continuation,
+                                     band, rows, rows + len_inner + 1,
+                                     rows + 2 * (len_inner + 1),
+                                     rows + 3 * (len_inner + 1))
+            else:
+                score = _needleman_wunsch_band(sim_rows, gap_start, band,
+                                               rows, rows + len_inner + 1)
+            if not adaptive or score >= margin + _out_of_band_bound(
+                    len_outer, len_inner, band, max_sim, gap_start,
+                    gap_continuation):
+                return score
+            band *= 2
+            if band >= len_inner:
+                break
+    finally:
+        free(rows)
+    if affine:
+        return _affine_full(sim_rows, gap_start, gap_continuation)
+    return _needleman_wunsch_full(sim_rows, gap_start)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _needleman_wunsch_last_row(_SimRows sim_rows, Py_ssize_t start1,
+                                    Py_ssize_t end1, Py_ssize_t start2,
+                                    Py_ssize_t end2, bint reverse,
+                                    double gap_cost, double *row,
+                                    double *sims) except -1:
+    # last row of the Needleman-Wunsch DP between the characters start1 to
+    # end1 - 1 of the outer string and start2 to end2 - 1 of the inner one,
+    # or between both substrings reversed
+    cdef Py_ssize_t len_inner = end2 - start2
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    for j in range(len_inner + 1):
+        row[j] = -(j * gap_cost)
+    for i in range(1, end1 - start1 + 1):
+        sim_rows.fill_span(end1 - i if reverse else start1 + i - 1, start2,
+                           end2, reverse, sims)
+        _needleman_wunsch_row(sims, len_inner, i, gap_cost, row)
+    return 0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _needleman_wunsch_traceback(_SimRows sim_rows,
+                                            Py_ssize_t start1,
+                                            Py_ssize_t end1,
+                                            Py_ssize_t start2,
+                                            Py_ssize_t end2, double gap_cost,
+                                            char *ops) except -1:
+    # Writes the operations of an optimal alignment of the characters start1
+    # to end1 - 1 of the outer string and start2 to end2 - 1 of the inner
+    # one in ops, from the full DP table, and returns their number. The
+    # moves are told apart by recomputing the values the cells were the max
+    # of, so that the comparisons are exact.
+    cdef Py_ssize_t len1 = end1 - start1
+    cdef Py_ssize_t len2 = end2 - start2
+    cdef Py_ssize_t width = len2 + 1
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef Py_ssize_t num_ops = 0
+    cdef double *table = NULL
+    cdef double *sims = NULL
+    cdef double value = 0
+    cdef char op
+
+    table = <double *> malloc((len1 + 1) * width * sizeof(double))
+    sims = <double *> malloc((len1 * len2 + 1) * sizeof(double))
+    if table == NULL or sims == NULL:
+        free(table)
+        free(sims)
+        raise MemoryError()
+
+    try:
+        for j in range(width):
+            table[j] = -(j * gap_cost)
+        for i in range(1, len1 + 1):
+            sim_rows.fill_span(start1 + i - 1, start2, end2, False,
+                               sims + (i - 1) * len2)
+            table[i * width] = -(i * gap_cost)
+            for j in range(1, width):
+                table[i * width + j] = max3(
+                    table[(i - 1) * width + j - 1] + sims[(i - 1) * len2 + j - 1],
+                    table[(i - 1) * width + j] - gap_cost,
+                    table[i * width + j - 1] - gap_cost)
+
+        # the operations are found from the end, and reversed afterwards.
+        # Cells of the first row and column are only reached by gaps.
+        i = len1
+        j = len2
+        while i > 0 or j > 0:
+            value = table[i * width + j]
+            if j == 0:
+                op = OP_DELETE
+            elif i == 0:
+                op = OP_INSERT
+            elif value == (table[(i - 1) * width + j - 1] +
+                           sims[(i - 1) * len2 + j - 1]):
+                op = OP_ALIGN
+            elif value == table[(i - 1) * width + j] - gap_cost:
+                op = OP_DELETE
+            else:
+                op = OP_INSERT
+            if op != OP_INSERT:
+                i -= 1
+            if op != OP_DELETE:
+                j -= 1
+            ops[num_ops] = op
+            num_ops += 1
+        for i in range(num_ops // 2):
+            op = ops[i]
+            ops[i] = ops[num_ops - 1 - i]
+            ops[num_ops - 1 - i] = op
+        return num_ops
+    finally:
+        free(table)
+        free(sims)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _hirschberg(_SimRows sim_rows, Py_ssize_t start1,
+                            Py_ssize_t end1, Py_ssize_t start2,
+                            Py_ssize_t end2, double gap_cost, char *ops,
+                            double *forward, double *backward,
+                            double *sims) except -1:
+    # Writes the operations of an optimal Needleman-Wunsch alignment of the
+    # characters start1 to end1 - 1 of the outer string and start2 to
+    # end2 - 1 of the inner one in ops, and returns their number. The outer
+    # substring is cut in half, and the inner one where the best alignment
+    # crosses that cut: the score of the best alignment going through each
+    # cut of the inner substring is the sum of the last rows of the DP of
+    # the first halves and of the reversed second halves. Both halves are
+    # then aligned on their own, so that only a few rows are ever kept.
+    # forward, backward and sims have to hold one more value than the
+    # inner substring has characters.
+    cdef Py_ssize_t len1 = end1 - start1
+    cdef Py_ssize_t len2 = end2 - start2
+    cdef Py_ssize_t middle = start1 + len1 // 2
+    cdef Py_ssize_t cut = 0
+    cdef Py_ssize_t j = 0
+    cdef Py_ssize_t num_ops = 0
+    cdef double best = 0
+
+    if len1 == 0 or len2 == 0:
+        for j in range(len1):
+            ops[j] = OP_DELETE
+        for j in range(len2):
+            ops[j] = OP_INSERT
+        return len1 + len2
+    if len1 == 1 or len1 * len2 <= HIRSCHBERG_BASE_CELLS:
+        return _needleman_wunsch_traceback(sim_rows, start1, end1, start2,
+                                           end2, gap_cost, ops)
+
+    _needleman_wunsch_last_row(sim_rows, start1, middle, start2, end2, False,
+                               gap_cost, forward, sims)
+    _needleman_wunsch_last_row(sim_rows, middle, end1, start2, end2, True,
+                               gap_cost, backward, sims)
+    best = forward[0] + backward[len2]
+    for j in range(1, len2 + 1):
+        if forward[j] + backward[len2 - j] > best:
+            best = forward[j] + backward[len2 - j]
+            cut = j
+
+    num_ops = _hirschberg(sim_rows, start1, middle, start2, start2 + cut,
+                          gap_cost, ops, forward, backward, sims)
+    return num_ops + _hirschberg(sim_rows, middle, end1, start2 + cut, end2,
+                                 gap_cost, ops + num_ops, forward, backward,
+                                 sims)
+
+
+cdef double _needleman_wunsch_full(_SimRows sim_rows,
+                                   double gap_cost) except? -1:
+    cdef Py_ssize_t len_inner = sim_rows.inner.length
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef double score = 0
+    cdef double *row = NULL
+    cdef double *sims
+
+    if sim_rows.has_diagonals and len_inner >= WAVEFRONT_MIN_LEN:
+        sim_rows.prepare_diagonals()
+        row = <double *> malloc(4 * (len_inner + 1) * sizeof(double))
+        if row == NULL:
+            raise MemoryError()
+        with nogil:
+            score = _needleman_wunsch_wavefront(&sim_rows.diagonals, gap_cost,
+                                                row)
+        free(row)
+        return score
+
+    row = <double *> malloc((2 * len_inner + 1) * sizeof(double))
+    if row == NULL:
+        raise MemoryError()
+    sims = row + len_inner + 1
+
+    try:
+        for j in range(len_inner + 1):
+            row[j] = -(j * gap_cost)
+        for i in range(1, sim_rows.outer.length + 1):
+            sim_rows.fill(i - 1, sims)
+            _needleman_wunsch_row(sims, len_inner, i, gap_cost, row)
+        return row[len_inner]
+    finally:
+        free(row)
+
+
+def needleman_wunsch(object string1, object string2, double gap_cost,
+                     object sim_func=None, Py_ssize_t band=-1,
+                     bint adaptive=False):
+    """Needleman-Wunsch score of two strings, keeping a single DP row along
+    the shorter string. The characters are compared with sim_func, a
+    SubstitutionMatrix, or with the identity similarity if it is None.
+    Unless sim_func has to be called, long strings are aligned one
+    anti-diagonal at a time instead. If band is not negative, only the
+    alignments staying within band diagonals of those joining the corners
+    of the DP table are scored, in O(band * n) time. If adaptive, the band
+    is doubled until it holds an optimal alignment.
+    """
+    cdef _SimRows sim_rows = _SimRows(string1, string2, sim_func)
+    if band < 0:
+        return _needleman_wunsch_full(sim_rows, gap_cost)
+    return _banded_score(sim_rows, gap_cost, gap_cost, band, adaptive,
+                         False)
+
+
+def needleman_wunsch_align(object string1, object string2, double gap_cost,
+                           object sim_func=None):
+    """Opcodes of an optimal Needleman-Wunsch alignment of two strings,
+    found with Hirschberg's algorithm in linear memory, as in difflib's
+    SequenceMatcher.get_opcodes. The characters are compared with sim_func,
+    a SubstitutionMatrix, or with the identity similarity if it is None.
+    """
+    cdef _SimRows sim_rows = _SimRows(string1, string2, sim_func, False)
+    cdef ustr_t *str1 = &sim_rows.outer
+    cdef ustr_t *str2 = &sim_rows.inner
+    cdef Py_ssize_t min_len = (str1.length if str1.length < str2.length
+                               else str2.length)
+    cdef Py_ssize_t prefix_len = 0
+    cdef Py_ssize_t suffix_len = 0
+    cdef Py_ssize_t num_ops = 0
+    cdef Py_ssize_t k = 0
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef char *ops = NULL
+    cdef double *rows = NULL
+    cdef list opcodes = []
+    cdef object tag
+    cdef object last_tag = None
+    cdef Py_ssize_t last_i = 0
+    cdef Py_ssize_t last_j = 0
+
+    # with the identity similarity and a non negative gap cost, the common
+    # prefix and suffix are aligned character by character
+    if sim_func is None and gap_cost >= 0:
+        while (prefix_len < min_len and
+               char_at(str1, prefix_len) == char_at(str2, prefix_len)):
+            prefix_len += 1
+        while (suffix_len < min_len - prefix_len and
+               char_at(str1, str1.length - 1 - suffix_len) ==
+               char_at(str2, str2.length - 1 - suffix_len)):
+            suffix_len += 1
+
+    ops = <char *> malloc((str1.length + str2.length + 1) * sizeof(char))
+    rows = <double *> malloc(3 * (str2.length + 1) * sizeof(double))
+    if ops == NULL or rows == NULL:
+        free(ops)
+        free(rows)
+        raise MemoryError()
+
+    try:
+        for k in range(prefix_len):
+            ops[k] = OP_ALIGN
+        num_ops = prefix_len + _hirschberg(
+            sim_rows, prefix_len, str1.length - suffix_len, prefix_len,
+            str2.length - suffix_len, gap_cost, ops + prefix_len, rows,
+            rows + str2.length + 1, rows + 2 * (str2.length + 1))
+        for k in range(suffix_len):
+            ops[num_ops + k] = OP_ALIGN
+        num_ops += suffix_len
+
+        # consecutive operations of the same kind make one opcode
+        for k in range(num_ops):
+            if ops[k] == OP_ALIGN:
+                if char_at(str1, i) == char_at(str2, j):
+                    tag = 'equal'
+                else:
+                    tag = 'replace'
+            elif ops[k] == OP_DELETE:
+                tag = 'delete'
+            else:
+                tag = 'insert'
+            if tag != last_tag:
+                if last_tag is not None:
+                    opcodes.append((last_tag, last_i, i, last_j, j))
+                last_tag = tag
+                last_i = i
+                last_j = j
+            if ops[k] != OP_INSERT:
+                i += 1
+            if ops[k] != OP_DELETE:
+                j += 1
+        if last_tag is not None:
+            opcodes.append((last_tag, last_i, i, last_j, j))
+        return opcodes
+    finally:
+        free(ops)
+        free(rows)
+
+
+cdef inline double fast_max(double a, double b) nogil:
+    # compiled to a single max instruction, without keeping the first of
+    # equal values as max2 does
+    return a if a > b else b
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _smith_waterman_column(const double *sims, Py_ssize_t length,
+                                   double gap_cost, double *column) nogil:
+    # Rolls a Smith-Waterman DP column along a pattern one character of the
+    # text further, in place, and returns its largest value. The cells get
+    # the values of _smith_waterman_row, but for the sign of zero, so that
+    # the chain of the column is not slowed down by the ties.
+    cdef Py_ssize_t i = 0
+    cdef double diag = 0
+    cdef double above = 0
+    cdef double value = 0
+    cdef double max_value = 0
+    for i in range(1, length + 1):
+        above = column[i]
+        # only the gap from the cell before depends on the previous step
+        value = fast_max(fast_max(0, fast_max(diag + sims[i - 1],
+                                              above - gap_cost)),
+                         value - gap_cost)
+        column[i] = value
+        diag = above
+        max_value = fast_max(max_value, value)
+    return max_value
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _smith_waterman_pruned(_SimRows sim_rows, double gap_cost,
+                                   double min_score, double x_drop,
+                                   double *row, double *sims) except? -1:
+    # Smith-Waterman DP returning as soon as the best score seen reaches
+    # min_score, or once no cell can reach it any more, and pruning the
+    # cells more than x_drop below the best score of the previous rows.
+    # Once that best score is above x_drop, no new alignment can start
+    # from 0, so that only the columns from the first to the last cell left
+    # of the previous row, and those reached from the last one by gaps,
+    # are computed. The pruned cells are -inf.
+    cdef Py_ssize_t len_outer = sim_rows.outer.length
+    cdef Py_ssize_t len_inner = sim_rows.inner.length
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef Py_ssize_t low = 1
+    cdef Py_ssize_t high = len_inner
+    cdef Py_ssize_t end = 0
+    cdef Py_ssize_t next_low = 0
+    cdef Py_ssize_t next_high = 0
+    cdef bint pruning = False
+    cdef bint bounded = min_score < INF and gap_cost >= 0
+    cdef double max_sim = 0
+    cdef double max_value = 0
+    cdef double row_max = 0
+    cdef double threshold = 0
+    cdef double bound = 0
+    cdef double diag = 0
+    cdef double above = 0
+    cdef double value = 0
+
+    # a cell can gain at most max_sim per pair of characters aligned after
+    # it, and the gaps only lower its score, so that the largest value of a
+    # row bounds the scores to come, and the cells of the row bound them
+    # more tightly, as fewer pairs are left after those of the last columns
+    if bounded:
+        max_sim = max2(sim_rows.max_sim(), 0)
+    for j in range(len_inner + 1):
+        row[j] = 0
+    for i in range(1, len_outer + 1):
+        threshold = max_value - x_drop
+        if not pruning and threshold > 0:
+            pruning = True
+            low = len_inner + 1
+            high = 0
+            for j in range(len_inner + 1):
+                if row[j] < threshold:
+                    row[j] = NEG_INF
+                else:
+                    low = min(low, j)
+                    high = j
+            if high == 0:
+                return max_value
+
+        if not pruning:
+            sim_rows.fill(i - 1, sims)
+            row_max = _smith_waterman_column(sims, len_inner, gap_cost, row)
+            max_value = max2(max_value, row_max)
+        else:
+            end = min(high + 1, len_inner)
+            sim_rows.fill_span(i - 1, low - 1, end, False, sims)
+            next_low = 0
+            next_high = 0
+            row_max = 0
+            diag = row[low - 1]
+            for j in range(low, end + 1):
+                above = row[j]
+                value = max2(0, max3(diag + sims[j - low], above - gap_cost,
+                                     row[j - 1] - gap_cost))
+                diag = above
+                if value < threshold:
+                    row[j] = NEG_INF
+                    continue
+                row[j] = value
+                if next_low == 0:
+                    next_low = j
+                next_high = j
+                row_max = fast_max(row_max, value)
+            # past the cells of the previous row, only gaps lead further
+            j = end + 1
+            while j <= len_inner and row[j - 1] - gap_cost >= threshold:
+                row[j] = max2(0, row[j - 1] - gap_cost)
+                if next_low == 0:
+                    next_low = j
+                next_high = j
+                j += 1
+            if next_low == 0:
+                return max_value
+            low = next_low
+            high = next_high
+            max_value = max2(max_value, row_max)
+
+        if max_value >= min_score:
+            return max_value
+        if not bounded:
+            continue
+        if row_max + max_sim * min(len_outer - i, len_inner) < min_score:
+            return max_value
+        if i % 8 == 0:
+            bound = 0 if pruning else max_sim * min(len_outer - i, len_inner)
+            for j in range(low if pruning else 1, high + 1):
+                bound = fast_max(bound, row[j] + max_sim *
+                                 min(len_outer - i, len_inner - j))
+            if bound < min_score:
+                return max_value
+    return max_value
+
+
+def smith_waterman(object string1, object string2, double gap_cost,
+                   object sim_func=None, double min_score=INF,
+                   double x_drop=INF):
+    """Smith-Waterman score of two strings, keeping a single DP row along
+    the shorter string. The characters are compared with sim_func, a
+    SubstitutionMatrix, or with the identity similarity if it is None.
+    Unless sim_func has to be called, long strings are aligned one
+    anti-diagonal at a time instead. If min_score is finite, the score
+    seen when it is reached is returned, and 0 if it cannot be reached.
+    With a finite x_drop, the cells more than x_drop below the best score
+    seen are pruned.
+    """
+    cdef _SimRows sim_rows = _SimRows(string1, string2, sim_func)
+    cdef Py_ssize_t len_inner = sim_rows.inner.length
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef double max_value = 0
+    cdef double row_max = 0
+    cdef double *row = NULL
+    cdef double *sims
+
+    if min_score < INF or x_drop < INF:
+        row = <double *> malloc((2 * len_inner + 1) * sizeof(double))
+        if row == NULL:
+            raise MemoryError()
+        try:
+            max_value = _smith_waterman_pruned(sim_rows, gap_cost, min_score,
+                                               x_drop, row,
+                                               row + len_inner + 1)
+        finally:
+            free(row)
+        if min_score < INF and max_value < min_score:
+            return 0.0
+        return max_value
+
+    if sim_rows.has_diagonals and len_inner >= WAVEFRONT_MIN_LEN:
+        sim_rows.prepare_diagonals()
+        row = <double *> malloc(5 * (len_inner + 1) * sizeof(double))
+        if row == NULL:
+            raise MemoryError()
+        with nogil:
+            max_value = _smith_waterman_wavefront(&sim_rows.diagonals,
+                                                  gap_cost, row)
+        free(row)
+        return max_value
+
+    row = <double *> malloc((2 * len_inner + 1) * sizeof(double))
+    if row == NULL:
+        raise MemoryError()
+    sims = row + len_inner + 1
+
+    try:
+        for j in range(len_inner + 1):
+            row[j] = 0
+        for i in range(1, sim_rows.outer.length + 1):
+            sim_rows.fill(i - 1, sims)
+            row_max = _smith_waterman_row(sims, len_inner, gap_cost, row)
+            if row_max > max_value:
+                max_value = row_max
+        return max_value
+    finally:
+        free(row)
+
+
+cdef double _affine_full(_SimRows sim_rows, double gap_start,
+                         double gap_continuation) except? -1:
+    cdef Py_ssize_t len_inner = sim_rows.inner.length
+    cdef Py_ssize_t i = 0
+    cdef double *rows = NULL
+    cdef double *m
+    cdef double *x
+    cdef double *y
+    cdef double *sims
+
+    gap_start = -gap_start
+    gap_continuation = -gap_continuation
+
+    rows = <double *> malloc((4 * len_inner + 3) * sizeof(double))
+    if rows == NULL:
+        raise MemoryError()
+    m = rows
+    x = m + len_inner + 1
+    y = x + len_inner + 1
+    sims = y + len_inner + 1
+
+    try:
+        _affine_init(len_inner, gap_start, gap_continuation, m, x, y)
+        for i in range(1, sim_rows.outer.length + 1):
+            sim_rows.fill(i - 1, sims)
+            _affine_row(sims, len_inner, i, gap_start, gap_continuation,
+                        m, x, y)
+        return max3(m[len_inner], x[len_inner], y[len_inner])
+    finally:
+        free(rows)
+
+
+def affine(object string1, object string2, double gap_start,
+           double gap_continuation, object sim_func=None,
+           Py_ssize_t band=-1, bint adaptive=False):
+    """Affine gap score of two strings, with Gotoh's three matrix DP keeping
+    one row of each matrix along the shorter string. The characters are
+    compared with sim_func, a SubstitutionMatrix, or with the identity
+    similarity if it is None. band and adaptive restrict the DP to a band
+    as for needleman_wunsch.
+    """
+    cdef _SimRows sim_rows = _SimRows(string1, string2, sim_func)
+    if band < 0:
+        return _affine_full(sim_rows, gap_start, gap_continuation)
+    return _banded_score(sim_rows, gap_start, gap_continuation, band,
+                         adaptive, True)
+
+
+cdef class SmithWatermanScanner:
+    """Smith-Waterman search of patterns in a text fed one chunk at a time.
+
+    Every pattern keeps a single DP column along it, which is rolled over
+    the characters of the text, so that the text is never held whole and
+    its chunks are read once for all the patterns. The scores of the
+    characters of the patterns against a character of the text are
+    computed with sim_func, a SubstitutionMatrix, or with the identity
+    similarity if it is None. They are kept in a profile the first time
+    the character is met, for up to max_profile_size scores: once the
+    profile is full, the scores of the characters that are not in it are
+    computed again each time they are met.
+    """
+    cdef list patterns
+    cdef double gap_cost
+    cdef double min_score
+    cdef object sim_func
+    cdef dict char_columns
+    cdef Py_ssize_t num_patterns
+    cdef Py_ssize_t total_len
+    cdef Py_ssize_t offset
+    cdef Py_ssize_t capacity
+    # number of characters of the text whose scores are in the profile,
+    # at most max_columns
+    cdef readonly Py_ssize_t num_columns
+    cdef Py_ssize_t max_columns
+    # pattern k is made of the characters starts[k] to starts[k + 1] - 1
+    # of the patterns put end to end, its DP column is columns[starts[k] +
+    # k] to columns[starts[k + 1] + k], the first cell being always 0
+    cdef Py_ssize_t *starts
+    cdef double *columns
+    # scores of the characters of the patterns put end to end against the
+    # c-th character of the text kept so far, at profile[c * total_len].
+    # The column after the last one that can be kept holds the scores of a
+    # character that is not kept.
+    cdef double *profile
+
+    def __cinit__(self, list patterns, double gap_cost, double min_score,
+                  object sim_func=None,
+                  Py_ssize_t max_profile_size=MAX_PROFILE_SIZE):
+        cdef Py_ssize_t k = 0
+        self.patterns = [as_unicode(pattern) for pattern in patterns]
+        self.gap_cost = gap_cost
+        self.min_score = min_score
+        self.sim_func = sim_func
+        self.char_columns = {}
+        self.num_patterns = len(self.patterns)
+        self.starts = <Py_ssize_t *> malloc((self.num_patterns + 1) *
+                                            sizeof(Py_ssize_t))
+        if self.starts == NULL:
+            raise MemoryError()
+        self.starts[0] = 0
+        for k in range(self.num_patterns):
+            self.starts[k + 1] = self.starts[k] + len(self.patterns[k])
+        self.total_len = self.starts[self.num_patterns]
+        self.max_columns = max_profile_size // (self.total_len + 1)
+        self.columns = <double *> malloc((self.total_len + self.num_patterns)
+                                         * sizeof(double))
+        if self.columns == NULL:
+            raise MemoryError()
+        for k in range(self.total_len + self.num_patterns):
+            self.columns[k] = 0
+
+    def __dealloc__(self):
+        free(self.starts)
+        free(self.columns)
+        free(self.profile)
+
+    cdef int _fill_column(self, unicode text_char,
+                          Py_ssize_t column) except -1:
+        # scores of the characters of the patterns against text_char, in
+        # the given column of the profile, which is grown if needed
+        cdef Py_ssize_t capacity = min(max(2 * self.capacity, 16),
+                                       self.max_columns + 1)
+        cdef Py_UCS4 code = text_char
+        cdef double *sims
+        cdef double *profile
+        cdef unicode pattern
+        cdef Py_ssize_t k = 0
+        cdef Py_ssize_t i = 0
+        if column >= self.capacity:
+            profile = <double *> realloc(self.profile, capacity *
+                                         (self.total_len + 1) *
+                                         sizeof(double))
+            if profile == NULL:
+                raise MemoryError()
+            self.profile = profile
+            self.capacity = capacity
+        sims = self.profile + column * self.total_len
+        for k in range(self.num_patterns):
+            pattern = self.patterns[k]
+            for i in range(len(pattern)):
+                if self.sim_func is None:
+                    sims[self.starts[k] + i] = 1 if pattern[i] == code else 0
+                else:
+                    sims[self.starts[k] + i] = self.sim_func(pattern[i],
+                                                             text_char)
+        return 0
+
+    cdef int _roll(self, const Py_ssize_t *codes, Py_ssize_t start,
+                   Py_ssize_t stop, list hits) except -1:
+        # Rolls the DP columns over the characters start to stop - 1 of the
+        # chunk, whose scores are in the columns codes[j] of the profile,
+        # and adds the hits to hits.
+        cdef double score = 0
+        cdef double gap_cost = self.gap_cost
+        cdef double min_score = self.min_score
+        cdef const double *sims
+        cdef double *pattern_column
+        cdef Py_ssize_t pattern_len = 0
+        cdef Py_ssize_t j = 0
+        cdef Py_ssize_t k = 0
+        for k in range(self.num_patterns):
+            sims = self.profile + self.starts[k]
+            pattern_column = self.columns + self.starts[k] + k
+            pattern_len = self.starts[k + 1] - self.starts[k]
+            for j in range(start, stop):
+                score = _smith_waterman_column(
+                    sims + codes[j] * self.total_len, pattern_len,
+                    gap_cost, pattern_column)
+                if score >= min_score:
+                    hits.append((k, self.offset + j + 1, score))
+        return 0
+
+    def feed(self, object chunk):
+        """Rolls the DP columns over the characters of chunk, and returns
+        the (pattern index, end, score) tuples of the positions of chunk
+        where the best local alignment of a pattern ending there scores at
+        least min_score, by end and then by pattern. end is the number of
+        characters of the text read up to the position.
+        """
+        cdef unicode text = as_unicode(chunk)
+        cdef Py_ssize_t length = len(text)
+        cdef Py_ssize_t *codes = NULL
+        cdef object column
+        cdef list hits = []
+        cdef Py_ssize_t start = 0
+        cdef Py_ssize_t j = 0
+        cdef unicode text_char
+
+        codes = <Py_ssize_t *> malloc(length * sizeof(Py_ssize_t) + 1)
+        if codes == NULL:
+            raise MemoryError()
+        try:
+            for j in range(length):
+                text_char = text[j]
+                column = self.char_columns.get(text_char)
+                if column is not None:
+                    codes[j] = column
+                elif self.num_columns < self.max_columns:
+                    self._fill_column(text_char, self.num_columns)
+                    self.char_columns[text_char] = self.num_columns
+                    codes[j] = self.num_columns
+                    self.num_columns += 1
+                else:
+                    # the profile is full, the scores of text_char go to
+                    # the spare column and are used right away
+                    self._roll(codes, start, j, hits)
+                    self._fill_column(text_char, self.max_columns)
+                    codes[j] = self.max_columns
+                    self._roll(codes, j, j + 1, hits)
+                    start = j + 1
+            self._roll(codes, start, length, hits)
+        finally:
+            free(codes)
+        self.offset += length
+        if self.num_patterns > 1:
+            hits.sort(key=lambda hit: hit[1])
+        return hits
+
+
+cdef tuple _encode_strings(list strings, object matrix):
+    # The characters of the strings as ints, put end to end, string k being
+    # codes[starts[k]:starts[k + 1]]: the codepoints, or the positions in
+    # the alphabet of matrix if it is not None, -1 for the characters
+    # outside of the alphabet.
+    cdef Py_ssize_t num_strings = len(strings)
+    cdef Py_ssize_t[::1] starts = np.empty(num_strings + 1, dtype=np.intp)
+    cdef int[::1] codes
+    cdef int[::1] char_index
+    cdef Py_ssize_t lookup_size = 0
+    cdef Py_ssize_t k = 0
+    cdef Py_ssize_t i = 0
+    cdef Py_UCS4 code = 0
+    cdef ustr_t string
+
+    starts[0] = 0
+    for k in range(num_strings):
+        starts[k + 1] = starts[k] + len(<unicode> strings[k])
+    codes = np.empty(starts[num_strings] + 1, dtype=np.intc)
+    if matrix is not None:
+        # positions in the alphabet by codepoint
+        lookup_size = max([ord(char) + 1 for char in matrix.get_alphabet()]
+                          or [0])
+        char_index = np.full(lookup_size + 1, -1, dtype=np.intc)
+        for i, char in enumerate(matrix.get_alphabet()):
+            char_index[ord(char)] = i
+
+    for k in range(num_strings):
+        init_ustr(&string, strings[k])
+        for i in range(string.length):
+            code = char_at(&string, i)
+            if matrix is None:
+                codes[starts[k] + i] = code
+            elif code < lookup_size:
+                codes[starts[k] + i] = char_index[code]
+            else:
+                codes[starts[k] + i] = -1
+    return np.asarray(codes), np.asarray(starts)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _align_codes(int measure, const int *codes1, Py_ssize_t len1,
+                         const int *codes2, Py_ssize_t len2, double gap_start,
+                         double gap_continuation, const double *table,
+                         const double *table_t, Py_ssize_t alphabet_size,
+                         bint trim_affixes, double *buffer,
+                         int *diagonal_codes) nogil:
+    # Score of a pair of strings given by their codes, compared with the
+    # identity similarity if table is NULL, or with the table of a
+    # substitution matrix, table_t being its transpose. The affixes are
+    # trimmed as get_raw_score does, and the DP is the one the scalar
+    # functions would pick, so that the scores are the same down to the
+    # bit. buffer has to hold 5 * (min(len1, len2) + 1) values, and
+    # diagonal_codes len1 + len2 + 1 ints.
+    cdef Py_ssize_t min_len = min(len1, len2)
+    cdef Py_ssize_t prefix_len = 0
+    cdef Py_ssize_t suffix_len = 0
+    cdef Py_ssize_t gap_len = 0
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef double affix_score = 0
+    cdef double max_value = 0
+    cdef double row_max = 0
+    cdef _Diagonals diagonals
+    cdef const int *swap_codes
+    cdef const double *table_row
+    cdef double *sims = buffer
+    cdef double *row = buffer + min_len + 1
+
+    if measure == AFFINE and min_len == 0:
+        return 0
+    if trim_affixes:
+        while (prefix_len < min_len and
+               codes1[prefix_len] == codes2[prefix_len]):
+            prefix_len += 1
+        while (suffix_len < min_len - prefix_len and
+               codes1[len1 - suffix_len - 1] == codes2[len2 - suffix_len - 1]):
+            suffix_len += 1
+        affix_score = prefix_len + suffix_len
+        codes1 += prefix_len
+        codes2 += prefix_len
+        len1 -= prefix_len + suffix_len
+        len2 -= prefix_len + suffix_len
+        if measure == AFFINE and (len1 == 0 or len2 == 0):
+            gap_len = max(len1, len2)
+            if gap_len == 0:
+                return affix_score
+            return (affix_score - gap_start) - (gap_len - 1) * gap_continuation
+
+    # the DP rows are laid along the shorter string
+    if len2 > len1:
+        swap_codes = codes1
+        codes1 = codes2
+        codes2 = swap_codes
+        len1, len2 = len2, len1
+        table = table_t
+
+    if measure != AFFINE and len2 >= WAVEFRONT_MIN_LEN:
+        for i in range(len1):
+            diagonal_codes[len1 - 1 - i] = codes1[i]
+        for j in range(len2):
+            diagonal_codes[len1 + j] = codes2[j]
+        diagonals.codes = diagonal_codes
+        diagonals.len_outer = len1
+        diagonals.len_inner = len2
+        diagonals.table = table
+        diagonals.alphabet_size = alphabet_size
+        if measure == NEEDLEMAN_WUNSCH:
+            return affix_score + _needleman_wunsch_wavefront(
+                &diagonals, gap_start, buffer)
+        return _smith_waterman_wavefront(&diagonals, gap_start, buffer)
+
+    if measure == NEEDLEMAN_WUNSCH:
+        for j in range(len2 + 1):
+            row[j] = -(j * gap_start)
+    elif measure == SMITH_WATERMAN:
+        for j in range(len2 + 1):
+            row[j] = 0
+    else:
+        gap_start = -gap_start
+        gap_continuation = -gap_continuation
+        _affine_init(len2, gap_start, gap_continuation, row,
+                     row + len2 + 1, row + 2 * (len2 + 1))
+
+    for i in range(1, len1 + 1):
+        if table == NULL:
+            for j in range(len2):
+                sims[j] = codes1[i - 1] == codes2[j]
+        else:
+            table_row = table + codes1[i - 1] * alphabet_size
+            for j in range(len2):
+                sims[j] = table_row[codes2[j]]
+        if measure == NEEDLEMAN_WUNSCH:
+            _needleman_wunsch_row(sims, len2, i, gap_start, row)
+        elif measure == SMITH_WATERMAN:
+            row_max = _smith_waterman_row(sims, len2, gap_start, row)
+            if row_max > max_value:
+                max_value = row_max
+        else:
+            _affine_row(sims, len2, i, gap_start, gap_continuation, row,
+                        row + len2 + 1, row + 2 * (len2 + 1))
+
+    if measure == NEEDLEMAN_WUNSCH:
+        return affix_score + row[len2]
+    if measure == SMITH_WATERMAN:
+        return max_value
+    return affix_score + max3(row[len2], row[2 * len2 + 1],
+                              row[3 * len2 + 2])
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef _alignment_batch(int measure, object strings1, list strings2,
+                      double gap_start, double gap_continuation,
+                      object sim_func, bint trim_affixes, int num_threads):
+    # Scores of the pairs of strings1 and strings2, or of strings1 against
+    # every string of strings2 if it is a single string, computed without
+    # holding the GIL on up to num_threads threads. Unless the characters
+    # are compared with the identity similarity or a substitution matrix,
+    # and are all in its alphabet, the pairs are scored with the GIL held.
+    cdef bint single = not isinstance(strings1, list)
+    cdef list unicode_s1 = ([as_unicode(strings1)] if single else
+                            [as_unicode(string) for string in strings1])
+    cdef list unicode_s2 = [as_unicode(string) for string in strings2]
+    cdef Py_ssize_t num_pairs = len(unicode_s2)
+    cdef object matrix = None
+    cdef bint call_sim_func = False
+    cdef int[::1] codes1
+    cdef int[::1] codes2
+    cdef Py_ssize_t[::1] starts1
+    cdef Py_ssize_t[::1] starts2
+    cdef double[:, ::1] table
+    cdef double[:, ::1] table_t
+    cdef const double *table_ptr = NULL
+    cdef const double *table_t_ptr = NULL
+    cdef Py_ssize_t alphabet_size = 0
+    cdef Py_ssize_t max_len = 0
+    cdef Py_ssize_t max_total_len = 0
+    cdef Py_ssize_t len1 = 0
+    cdef Py_ssize_t len2 = 0
+    cdef Py_ssize_t k = 0
+    cdef Py_ssize_t first = 0
+    cdef Py_ssize_t i = 0
+    cdef double *buffer = NULL
+    cdef int *diagonal_codes = NULL
+    cdef char[::1] skipped
+
+    scores = np.zeros(num_pairs, dtype=np.float64)
+    cdef double[::1] scores_view = scores
+    skipped = np.zeros(num_pairs, dtype=np.int8)
+
+    if isinstance(sim_func, SubstitutionMatrix):
+        matrix = sim_func
+        table = matrix.get_table()
+        table_t = np.ascontiguousarray(matrix.get_table().T)
+        alphabet_size = table.shape[0]
+        if alphabet_size > 0:
+            table_ptr = &table[0, 0]
+            table_t_ptr = &table_t[0, 0]
+    elif sim_func is not None:
+        call_sim_func = True
+
+    if not call_sim_func:
+        codes1, starts1 = _encode_strings(unicode_s1, matrix)
+        codes2, starts2 = _encode_strings(unicode_s2, matrix)
+        for k in range(num_pairs):
+            first = 0 if single else k
+            len1 = starts1[first + 1] - starts1[first]
+            len2 = starts2[k + 1] - starts2[k]
+            max_len = max(max_len, min(len1, len2))
+            max_total_len = max(max_total_len, len1 + len2)
+            # the pairs with characters outside of the alphabet are
+            # scored with the fallback similarity function
+            if matrix is not None:
+                for i in range(starts1[first], starts1[first + 1]):
+                    if codes1[i] < 0:
+                        skipped[k] = 1
+                for i in range(starts2[k], starts2[k + 1]):
+                    if codes2[i] < 0:
+                        skipped[k] = 1
+
+        with nogil, parallel(num_threads=num_threads):
+            buffer = <double *> malloc(5 * (max_len + 1) * sizeof(double))
+            diagonal_codes = <int *> malloc((max_total_len + 1) *
+                                            sizeof(int))
+            for k in prange(num_pairs, schedule='guided'):
+                if skipped[k]:
+                    continue
+                if buffer == NULL or diagonal_codes == NULL:
+                    skipped[k] = -1
+                    continue
+                first = 0 if single else k
+                scores_view[k] = _align_codes(
+                    measure, &codes1[starts1[first]],
+                    starts1[first + 1] - starts1[first], &codes2[starts2[k]],
+                    starts2[k + 1] - starts2[k], gap_start, gap_continuation,
+                    table_ptr, table_t_ptr, alphabet_size, trim_affixes,
+                    buffer, diagonal_codes)
+            free(buffer)
+            free(diagonal_codes)
+        if (np.asarray(skipped) < 0).any():
+            raise MemoryError()
+    else:
+        skipped[:] = 1
+
+    for k in range(num_pairs):
+        if not skipped[k]:
+            continue
+        first = 0 if single else k
+        if measure == AFFINE and (len(unicode_s1[first]) == 0 or
+                                  len(unicode_s2[k]) == 0):
+            scores_view[k] = 0
+        elif measure == AFFINE:
+            # get_raw_score adds the score of the common affixes, which
+            # are not trimmed here
+            scores_view[k] = 0 + affine(unicode_s1[first], unicode_s2[k],
+                                        gap_start, gap_continuation, sim_func)
+        elif measure == NEEDLEMAN_WUNSCH:
+            scores_view[k] = 0 + needleman_wunsch(
+                unicode_s1[first], unicode_s2[k], gap_start, sim_func)
+        else:
+            scores_view[k] = smith_waterman(unicode_s1[first], unicode_s2[k],
+                                            gap_start, sim_func)
+    return scores
+
+def needleman_wunsch_batch(object strings1, list strings2, double gap_cost,
+                           object sim_func=None, bint trim_affixes=False,
+                           int num_threads=1):
+    """Needleman-Wunsch scores of the pairs of strings1 and strings2, or of
+    strings1 against every string of strings2 if it is a single string, as
+    a NumPy array of floats. If trim_affixes, the common prefix and suffix
+    of each pair are aligned directly, as NeedlemanWunsch does with the
+    identity similarity.
+    """
+    return _alignment_batch(NEEDLEMAN_WUNSCH, strings1, strings2, gap_cost,
+                            gap_cost, sim_func, trim_affixes, num_threads)
+
+
+def smith_waterman_batch(object strings1, list strings2, double gap_cost,
+                         object sim_func=None, int num_threads=1):
+    """Smith-Waterman scores of the pairs of strings1 and strings2, or of
+    strings1 against every string of strings2 if it is a single string, as
+    a NumPy array of floats.
+    """
+    return _alignment_batch(SMITH_WATERMAN, strings1, strings2, gap_cost,
+                            gap_cost, sim_func, False, num_threads)
+
+
+def affine_batch(object strings1, list strings2, double gap_start,
+                 double gap_continuation, object sim_func=None,
+                 bint trim_affixes=False, int num_threads=1):
+    """Affine gap scores of the pairs of strings1 and strings2, or of
+    strings1 against every string of strings2 if it is a single string, as
+    a NumPy array of floats. If trim_affixes, the common prefix and suffix
+    of each pair are aligned directly, as Affine does with the identity
+    similarity.
+    """
+    return _alignment_batch(AFFINE, strings1, strings2, gap_start,
+                            gap_continuation, sim_func, trim_affixes,
+                            num_threads)
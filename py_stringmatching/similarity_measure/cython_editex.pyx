@@ -0,0 +1,141 @@
+# cython: boundscheck=False
+
+from __future__ import division
+cimport cython
+
+from libc.stdlib cimport malloc, free
+from libc.math cimport trunc
+
+from py_stringmatching.similarity_measure.cython_utils cimport (
+    ustr_t, as_unicode, init_ustr, char_at)
+
+
+cdef enum:
+    # group of the characters that are not letters of a letter group
+    NO_GROUP = -1
+
+
+cdef inline double _r_cost(Py_UCS4 char1, int group1, Py_UCS4 char2,
+                           int group2, double match_cost, double group_cost,
+                           double mismatch_cost) nogil:
+    # r(a, b) of Zobel & Dart, as EditexHelper.r_cost
+    if char1 == char2:
+        return match_cost
+    if group1 != NO_GROUP and group1 == group2:
+        return group_cost
+    return mismatch_cost
+
+
+cdef inline double _d_cost(Py_UCS4 char1, int group1, Py_UCS4 char2,
+                           int group2, double match_cost, double group_cost,
+                           double mismatch_cost) nogil:
+    # d(a, b) of Zobel & Dart, as EditexHelper.d_cost
+    if char1 != char2 and (char1 == u'H' or char1 == u'W'):
+        return group_cost
+    return _r_cost(char1, group1, char2, group2, match_cost, group_cost,
+                   mismatch_cost)
+
+
+cdef inline int _letter_group(Py_UCS4 char, const int *letter_groups,
+                              Py_ssize_t num_groups) nogil:
+    # the letters all have small codepoints, the characters past the end
+    # of the table have no group
+    if char < num_groups:
+        return letter_groups[char]
+    return NO_GROUP
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _editex(const ustr_t *str1, const ustr_t *str2,
+                    const int *letter_groups, Py_ssize_t num_groups,
+                    double match_cost, double group_cost,
+                    double mismatch_cost, bint local, double *buffer,
+                    int *codes) nogil:
+    # Editex DP keeping a single row along str2, whose codepoints, letter
+    # groups and deletion costs are computed once. Both strings are read as
+    # if preceded by a space. The cells are truncated to integers as they
+    # were in the integer matrix of the pure Python DP, so that the
+    # distances are the same with costs that are not integers. buffer and
+    # codes have to hold 2 * (len2 + 1) values.
+    cdef Py_ssize_t len2 = str2.length
+    cdef double *row = buffer
+    cdef double *del_costs2 = buffer + len2 + 1
+    cdef int *chars2 = codes
+    cdef int *groups2 = codes + len2 + 1
+    cdef Py_UCS4 space = u' '
+    cdef Py_UCS4 char1 = space
+    cdef Py_UCS4 prev_char1 = space
+    cdef int group1 = NO_GROUP
+    cdef int prev_group1 = NO_GROUP
+    cdef double del_cost1 = 0
+    cdef double r_cost = 0
+    cdef double diag = 0
+    cdef double above = 0
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+
+    chars2[0] = space
+    groups2[0] = _letter_group(space, letter_groups, num_groups)
+    for j in range(1, len2 + 1):
+        chars2[j] = char_at(str2, j - 1)
+        groups2[j] = _letter_group(chars2[j], letter_groups, num_groups)
+        del_costs2[j] = _d_cost(chars2[j - 1], groups2[j - 1], chars2[j],
+                                groups2[j], match_cost, group_cost,
+                                mismatch_cost)
+    row[0] = 0
+    for j in range(1, len2 + 1):
+        row[j] = trunc(row[j - 1] + del_costs2[j])
+
+    prev_group1 = groups2[0]
+    for i in range(1, str1.length + 1):
+        char1 = char_at(str1, i - 1)
+        group1 = _letter_group(char1, letter_groups, num_groups)
+        del_cost1 = _d_cost(prev_char1, prev_group1, char1, group1,
+                            match_cost, group_cost, mismatch_cost)
+        diag = row[0]
+        if not local:
+            row[0] = trunc(row[0] + del_cost1)
+        for j in range(1, len2 + 1):
+            above = row[j]
+            r_cost = _r_cost(char1, group1, chars2[j], groups2[j],
+                             match_cost, group_cost, mismatch_cost)
+            row[j] = trunc(min(above + del_cost1, row[j - 1] + del_costs2[j],
+                               diag + r_cost))
+            diag = above
+        prev_char1 = char1
+        prev_group1 = group1
+    return row[len2]
+
+
+def editex(object string1, object string2, double match_cost,
+           double group_cost, double mismatch_cost, bint local,
+           const int[::1] letter_groups):
+    """Editex distance of two strings, already upper cased and normalized,
+    as an int. letter_groups maps the codepoints to the letter groups, -1
+    for the characters outside of them. In the local variant, deleting the
+    leading characters of string1 is free.
+    """
+    cdef unicode unicode_s1 = as_unicode(string1)
+    cdef unicode unicode_s2 = as_unicode(string2)
+    cdef ustr_t str1
+    cdef ustr_t str2
+    cdef double score = 0
+    cdef double *buffer = NULL
+    cdef int *codes = NULL
+
+    init_ustr(&str1, unicode_s1)
+    init_ustr(&str2, unicode_s2)
+    buffer = <double *> malloc(2 * (str2.length + 1) * sizeof(double))
+    codes = <int *> malloc(2 * (str2.length + 1) * sizeof(int))
+    if buffer == NULL or codes == NULL:
+        free(buffer)
+        free(codes)
+        raise MemoryError()
+    with nogil:
+        score = _editex(&str1, &str2, &letter_groups[0],
+                        letter_groups.shape[0], match_cost, group_cost,
+                        mismatch_cost, local, buffer, codes)
+    free(buffer)
+    free(codes)
+    return int(score)
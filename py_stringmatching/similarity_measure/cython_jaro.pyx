@@ -0,0 +1,570 @@
+# cython: boundscheck=False
+
+from __future__ import division
+cimport cython
+
+from libc.stdlib cimport malloc, free
+from libc.string cimport memset
+
+import numpy as np
+
+from py_stringmatching.similarity_measure.cython_utils cimport (
+    ustr_t, as_unicode, init_ustr, char_at, word_t, WORD_SIZE,
+    pattern_table_t, pattern_table_init, pattern_table_get,
+    pattern_table_free)
+
+
+cdef enum:
+    # the match flags of strings up to STACK_FLAG_WORDS * 64 characters are
+    # kept on the stack, longer strings allocate them.
+    STACK_FLAG_WORDS = 16
+
+
+cdef inline bint _test_flag(const word_t *flags, Py_ssize_t i) nogil:
+    return (flags[i // WORD_SIZE] >> (i % WORD_SIZE)) & 1
+
+
+cdef inline void _set_flag(word_t *flags, Py_ssize_t i) nogil:
+    flags[i // WORD_SIZE] |= (<word_t> 1) << (i % WORD_SIZE)
+
+
+cdef inline double _jaro_weight(Py_ssize_t len_str1, Py_ssize_t len_str2,
+                                Py_ssize_t common_chars,
+                                Py_ssize_t trans_count) nogil:
+    # same operations, in the same order, as the pure Python formula so that
+    # the scores are identical to the last bit
+    cdef double common = common_chars
+    cdef double half_trans = trans_count / 2.0
+    return ((common / len_str1 + common / len_str2 +
+             (common - half_trans) / common)) / 3
+
+
+cdef Py_ssize_t _count_transpositions(const ustr_t *str1, const ustr_t *str2,
+                                      const word_t *flags_s1,
+                                      const word_t *flags_s2) nogil:
+    # the matched characters of both strings, taken in order, are paired up
+    # and every pair of different characters is half a transposition
+    cdef Py_ssize_t trans_count = 0
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t k = 0
+    for i in range(str1.length):
+        if _test_flag(flags_s1, i):
+            while not _test_flag(flags_s2, k):
+                k += 1
+            if char_at(str1, i) != char_at(str2, k):
+                trans_count += 1
+            k += 1
+    return trans_count
+
+
+cdef inline Py_ssize_t _char_slot(const Py_UCS4 *keys,
+                                  const Py_ssize_t *slot_ids,
+                                  Py_ssize_t hash_mask, Py_UCS4 c) nogil:
+    # slot of c in an open addressing table, or of the free slot where it
+    # would go
+    cdef size_t h = <size_t> c * <size_t> 2654435761U
+    cdef Py_ssize_t slot = (h ^ (h >> 15)) & hash_mask
+    while slot_ids[slot] >= 0 and keys[slot] != c:
+        slot = (slot + 1) & hash_mask
+    return slot
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _jaro_positions(const ustr_t *str1, const ustr_t *str2,
+                            word_t *flags_s1, word_t *flags_s2) nogil:
+    # Jaro similarity of two non empty strings, for long strings. The
+    # positions of every distinct character of str2 are listed in increasing
+    # order, with a pointer to the first one that is neither matched yet nor
+    # before the search window. Windows only move right and every character
+    # takes the first free occurrence in its window, so the occurrences a
+    # character matches are consecutive in its list and the pointer only
+    # moves forward: the search is linear instead of scanning a window of
+    # max_len / 2 characters for every character of str1. Returns -1 if the
+    # memory for the lists could not be allocated. flags_s1 and flags_s2 are
+    # zeroed bitsets of the lengths of str1 and str2, where the matched
+    # characters of each string are flagged.
+    cdef Py_ssize_t len_str1 = str1.length
+    cdef Py_ssize_t len_str2 = str2.length
+    cdef Py_ssize_t max_len = len_str1 if len_str1 > len_str2 else len_str2
+    cdef Py_ssize_t search_range = max_len // 2 - 1
+    cdef Py_ssize_t common_chars = 0
+    cdef Py_ssize_t hash_size = 16
+    cdef Py_ssize_t num_ids = 0
+    cdef Py_ssize_t total = 0
+    cdef Py_ssize_t count = 0
+    cdef Py_ssize_t char_id = 0
+    cdef Py_ssize_t slot = 0
+    cdef Py_ssize_t pos = 0
+    cdef Py_ssize_t end = 0
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef Py_ssize_t low = 0
+    cdef Py_ssize_t high = 0
+    cdef Py_UCS4 lchar = 0
+    cdef Py_UCS4 *keys = NULL
+    cdef Py_ssize_t *slot_ids = NULL
+    cdef Py_ssize_t *char_ids = NULL
+    cdef Py_ssize_t *positions = NULL
+    cdef Py_ssize_t *starts = NULL
+    cdef Py_ssize_t *pointers = NULL
+    cdef double score = 0
+
+    if search_range < 0:
+        search_range = 0
+    while hash_size < 2 * len_str2:
+        hash_size *= 2
+
+    keys = <Py_UCS4 *> malloc(hash_size * sizeof(Py_UCS4))
+    slot_ids = <Py_ssize_t *> malloc(hash_size * sizeof(Py_ssize_t))
+    char_ids = <Py_ssize_t *> malloc(len_str2 * sizeof(Py_ssize_t))
+    positions = <Py_ssize_t *> malloc(len_str2 * sizeof(Py_ssize_t))
+    starts = <Py_ssize_t *> malloc((len_str2 + 1) * sizeof(Py_ssize_t))
+    pointers = <Py_ssize_t *> malloc(len_str2 * sizeof(Py_ssize_t))
+    if (keys == NULL or slot_ids == NULL or char_ids == NULL or
+            positions == NULL or starts == NULL or pointers == NULL):
+        score = -1
+    else:
+        # number the distinct characters of str2 and count their occurrences
+        for slot in range(hash_size):
+            slot_ids[slot] = -1
+        for j in range(len_str2):
+            slot = _char_slot(keys, slot_ids, hash_size - 1, char_at(str2, j))
+            if slot_ids[slot] < 0:
+                keys[slot] = char_at(str2, j)
+                slot_ids[slot] = num_ids
+                starts[num_ids] = 0
+                num_ids += 1
+            char_ids[j] = slot_ids[slot]
+            starts[char_ids[j]] += 1
+
+        # list the positions of every character, in increasing order
+        for char_id in range(num_ids):
+            count = starts[char_id]
+            starts[char_id] = total
+            pointers[char_id] = total
+            total += count
+        starts[num_ids] = total
+        for j in range(len_str2):
+            positions[pointers[char_ids[j]]] = j
+            pointers[char_ids[j]] += 1
+        for char_id in range(num_ids):
+            pointers[char_id] = starts[char_id]
+
+        for i in range(len_str1):
+            low = i - search_range if i > search_range else 0
+            high = (i + search_range if i + search_range < len_str2
+                    else len_str2 - 1)
+            if low > high:
+                break
+            lchar = char_at(str1, i)
+            slot = _char_slot(keys, slot_ids, hash_size - 1, lchar)
+            if slot_ids[slot] < 0:
+                continue
+            char_id = slot_ids[slot]
+            pos = pointers[char_id]
+            end = starts[char_id + 1]
+            while pos < end and positions[pos] < low:
+                pos += 1
+            if pos < end and positions[pos] <= high:
+                _set_flag(flags_s1, i)
+                _set_flag(flags_s2, positions[pos])
+                common_chars += 1
+                pos += 1
+            pointers[char_id] = pos
+
+        if common_chars:
+            score = _jaro_weight(len_str1, len_str2, common_chars,
+                                 _count_transpositions(str1, str2, flags_s1,
+                                                       flags_s2))
+
+    free(keys)
+    free(slot_ids)
+    free(char_ids)
+    free(positions)
+    free(starts)
+    free(pointers)
+    return score
+
+
+cdef double _jaro_bit_parallel(const pattern_table_t *peq,
+                               const ustr_t *str1, const ustr_t *str2) nogil:
+    # Jaro similarity of two non empty strings of at most 64 characters,
+    # given the match vectors of str2. For every character of str1, the
+    # unmatched occurrences of the character in its search window of str2
+    # are found with a few word operations, and the first of them is taken
+    # as in the character by character search.
+    cdef Py_ssize_t len_str1 = str1.length
+    cdef Py_ssize_t len_str2 = str2.length
+    cdef Py_ssize_t max_len = len_str1 if len_str1 > len_str2 else len_str2
+    cdef Py_ssize_t search_range = max_len // 2 - 1
+    cdef Py_ssize_t common_chars = 0
+    cdef Py_ssize_t trans_count = 0
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t low = 0
+    cdef Py_ssize_t high = 0
+    cdef word_t flags_s1 = 0
+    cdef word_t flags_s2 = 0
+    cdef word_t candidates = 0
+    cdef word_t window = 0
+
+    if search_range < 0:
+        search_range = 0
+
+    for i in range(len_str1):
+        low = i - search_range if i > search_range else 0
+        high = (i + search_range if i + search_range < len_str2
+                else len_str2 - 1)
+        if low > high:
+            break
+        # bits low to high, 2 << 63 wraps around to 0 as expected
+        window = ((((<word_t> 2) << high) - 1) &
+                  ~(((<word_t> 1) << low) - 1))
+        candidates = (pattern_table_get(peq, char_at(str1, i))[0] &
+                      window & ~flags_s2)
+        if candidates:
+            # lowest set bit
+            flags_s2 |= candidates & (~candidates + 1)
+            flags_s1 |= (<word_t> 1) << i
+            common_chars += 1
+
+    if common_chars == 0:
+        return 0
+
+    # the character of str1 matched at i is compared to the one of str2
+    # matched at the lowest remaining bit of flags_s2 through its match
+    # vector, so that str2 is not read again
+    for i in range(len_str1):
+        if (flags_s1 >> i) & 1:
+            if not (pattern_table_get(peq, char_at(str1, i))[0] &
+                    flags_s2 & (~flags_s2 + 1)):
+                trans_count += 1
+            flags_s2 &= flags_s2 - 1
+
+    return _jaro_weight(len_str1, len_str2, common_chars, trans_count)
+
+
+cdef double _jaro(const ustr_t *str1, const ustr_t *str2) nogil:
+    # Jaro similarity of two strings, or -1 if the memory for the match
+    # flags could not be allocated.
+    cdef word_t stack_flags_s1[STACK_FLAG_WORDS]
+    cdef word_t stack_flags_s2[STACK_FLAG_WORDS]
+    cdef word_t *flags_s1 = stack_flags_s1
+    cdef word_t *flags_s2 = stack_flags_s2
+    cdef Py_ssize_t words_s1 = (str1.length + WORD_SIZE - 1) // WORD_SIZE
+    cdef Py_ssize_t words_s2 = (str2.length + WORD_SIZE - 1) // WORD_SIZE
+    cdef double score = 0
+    cdef pattern_table_t peq
+
+    if str1.length == 0 or str2.length == 0:
+        return 0
+
+    # strings that fit in a word use the bit-parallel kernel, the match
+    # vectors of such a short str2 are stored inline and never allocated
+    if str1.length <= WORD_SIZE and str2.length <= WORD_SIZE:
+        pattern_table_init(&peq, str2)
+        score = _jaro_bit_parallel(&peq, str1, str2)
+        pattern_table_free(&peq)
+        return score
+
+    # longer strings search their matches in the position lists of str2
+    if words_s1 > STACK_FLAG_WORDS:
+        flags_s1 = <word_t *> malloc(words_s1 * sizeof(word_t))
+    if words_s2 > STACK_FLAG_WORDS:
+        flags_s2 = <word_t *> malloc(words_s2 * sizeof(word_t))
+
+    if flags_s1 == NULL or flags_s2 == NULL:
+        score = -1
+    else:
+        memset(flags_s1, 0, words_s1 * sizeof(word_t))
+        memset(flags_s2, 0, words_s2 * sizeof(word_t))
+        score = _jaro_positions(str1, str2, flags_s1, flags_s2)
+
+    if flags_s1 != stack_flags_s1:
+        free(flags_s1)
+    if flags_s2 != stack_flags_s2:
+        free(flags_s2)
+    return score
+
+
+cdef inline double _jaro_upper_bound(Py_ssize_t len_str1,
+                                     Py_ssize_t len_str2) nogil:
+    # Jaro similarity of two strings of these lengths if all the characters
+    # of the shorter one were matched without transpositions. Rounding is
+    # monotonic, so no computed score can exceed it.
+    cdef Py_ssize_t min_len = len_str1 if len_str1 < len_str2 else len_str2
+    if min_len == 0:
+        return 0
+    return _jaro_weight(len_str1, len_str2, min_len, 0)
+
+
+cdef inline Py_ssize_t _common_prefix_len(const ustr_t *str1,
+                                          const ustr_t *str2,
+                                          Py_ssize_t max_prefix) nogil:
+    cdef Py_ssize_t prefix_len = 0
+    if str1.length < max_prefix:
+        max_prefix = str1.length
+    if str2.length < max_prefix:
+        max_prefix = str2.length
+    while (prefix_len < max_prefix and
+           char_at(str1, prefix_len) == char_at(str2, prefix_len)):
+        prefix_len += 1
+    return prefix_len
+
+
+cdef inline double _winkler_boost(double score, Py_ssize_t prefix_len,
+                                  double prefix_weight) nogil:
+    if prefix_len:
+        score += prefix_len * prefix_weight * (1 - score)
+    return score
+
+
+cdef double _jaro_winkler_upper_bound(Py_ssize_t len_str1,
+                                      Py_ssize_t len_str2,
+                                      Py_ssize_t prefix_len,
+                                      double prefix_weight,
+                                      double boost_threshold) nogil:
+    # The boosted score is linear in the Jaro score, so over Jaro scores up
+    # to the Jaro bound it peaks at one of the two ends. Scores that are not
+    # boosted are bounded by the Jaro bound itself.
+    cdef double bound = _jaro_upper_bound(len_str1, len_str2)
+    cdef double boosted = 0
+    if bound <= boost_threshold:
+        return bound
+    boosted = _winkler_boost(bound, prefix_len, prefix_weight)
+    if boosted < bound:
+        boosted = bound
+    if prefix_len * prefix_weight > boosted:
+        boosted = prefix_len * prefix_weight
+    # slack for the rounding of the boost, which is not monotonic
+    return boosted + 1e-9
+
+
+cdef double _jaro_winkler(const ustr_t *str1, const ustr_t *str2,
+                          double prefix_weight, double boost_threshold,
+                          double min_score) nogil:
+    # Jaro-Winkler similarity of two strings, or -1 if the memory for the
+    # match flags could not be allocated. The Jaro score is boosted by the
+    # common prefix, of at most 4 characters, if it is above
+    # boost_threshold. Scores below min_score are returned as 0, and pairs
+    # whose lengths and prefix cannot reach it are not matched at all. With
+    # a prefix_weight of 0 this is the Jaro similarity.
+    cdef Py_ssize_t prefix_len = _common_prefix_len(str1, str2, 4)
+    cdef double score = 0
+
+    if min_score > 0 and _jaro_winkler_upper_bound(
+            str1.length, str2.length, prefix_len, prefix_weight,
+            boost_threshold) < min_score:
+        return 0
+
+    score = _jaro(str1, str2)
+    if score < 0:
+        return score
+    if score > boost_threshold:
+        score = _winkler_boost(score, prefix_len, prefix_weight)
+    if score < min_score:
+        return 0
+    return score
+
+
+def jaro(object string1, object string2, double min_score=-1):
+
+    cdef unicode unicode_s1 = as_unicode(string1)
+    cdef unicode unicode_s2 = as_unicode(string2)
+    cdef ustr_t str1, str2
+    cdef double score = 0
+
+    init_ustr(&str1, unicode_s1)
+    init_ustr(&str2, unicode_s2)
+
+    # pairs whose lengths cannot reach min_score are not matched
+    if _jaro_upper_bound(str1.length, str2.length) < min_score:
+        return 0.0
+
+    score = _jaro(&str1, &str2)
+    if score < 0:
+        raise MemoryError()
+    if score < min_score:
+        return 0.0
+    return score
+
+
+def jaro_winkler(object string1, object string2, double prefix_weight,
+                 double boost_threshold=-1, double min_score=-1):
+
+    cdef unicode unicode_s1 = as_unicode(string1)
+    cdef unicode unicode_s2 = as_unicode(string2)
+    cdef ustr_t str1, str2
+    cdef double score = 0
+
+    init_ustr(&str1, unicode_s1)
+    init_ustr(&str2, unicode_s2)
+
+    score = _jaro_winkler(&str1, &str2, prefix_weight, boost_threshold,
+                          min_score)
+    if score < 0:
+        raise MemoryError()
+    return score
+
+
+cdef inline bint _is_worse(double score1, Py_ssize_t index1,
+                           double score2, Py_ssize_t index2) nogil:
+    # ranking of the top k, by decreasing score and then increasing index
+    return score1 < score2 or (score1 == score2 and index1 > index2)
+
+
+cdef void _heap_sift_down(double *scores, Py_ssize_t *indices,
+                          Py_ssize_t size, Py_ssize_t pos) nogil:
+    # binary heap whose root is the worst of the top k
+    cdef Py_ssize_t child = 0
+    cdef double score = scores[pos]
+    cdef Py_ssize_t index = indices[pos]
+    while 2 * pos + 1 < size:
+        child = 2 * pos + 1
+        if (child + 1 < size and _is_worse(scores[child + 1],
+                                           indices[child + 1],
+                                           scores[child], indices[child])):
+            child += 1
+        if not _is_worse(scores[child], indices[child], score, index):
+            break
+        scores[pos] = scores[child]
+        indices[pos] = indices[child]
+        pos = child
+    scores[pos] = score
+    indices[pos] = index
+
+
+cdef void _heap_push(double *scores, Py_ssize_t *indices, Py_ssize_t size,
+                     double score, Py_ssize_t index) nogil:
+    cdef Py_ssize_t pos = size
+    cdef Py_ssize_t parent = 0
+    while pos > 0:
+        parent = (pos - 1) // 2
+        if not _is_worse(score, index, scores[parent], indices[parent]):
+            break
+        scores[pos] = scores[parent]
+        indices[pos] = indices[parent]
+        pos = parent
+    scores[pos] = score
+    indices[pos] = index
+
+
+def jaro_top_k(object query, list candidates, Py_ssize_t k,
+               double prefix_weight=0, double boost_threshold=-1):
+    # Indices and scores of the k candidates most Jaro-Winkler similar to
+    # query, or most Jaro similar with a prefix_weight of 0. Candidates are
+    # bucketed by their length and common prefix with query, which bound
+    # their score, and the buckets are visited by decreasing bound until no
+    # remaining candidate can enter the top k.
+    cdef unicode unicode_query = as_unicode(query)
+    cdef list unicode_candidates = [as_unicode(candidate)
+                                    for candidate in candidates]
+    cdef Py_ssize_t num_candidates = len(unicode_candidates)
+    cdef Py_ssize_t max_key = 0
+    cdef Py_ssize_t start = 0
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t key = 0
+    cdef Py_ssize_t[:] keys_view
+    cdef Py_ssize_t[:] starts_view
+    cdef Py_ssize_t[:] order_view
+    cdef double[:] bucket_bounds_view
+    cdef ustr_t str1
+    cdef ustr_t *texts = NULL
+
+    init_ustr(&str1, unicode_query)
+    if k > num_candidates:
+        k = num_candidates
+
+    texts = <ustr_t *> malloc((num_candidates + 1) * sizeof(ustr_t))
+    if texts == NULL:
+        raise MemoryError()
+
+    try:
+        # the prefix length is at most 4, so a candidate goes to the bucket
+        # of key length * 5 + prefix length
+        keys = np.empty(num_candidates, dtype=np.intp)
+        keys_view = keys
+        for i in range(num_candidates):
+            init_ustr(&texts[i], <unicode> unicode_candidates[i])
+            keys_view[i] = texts[i].length * 5
+            if prefix_weight != 0:
+                keys_view[i] += _common_prefix_len(&str1, &texts[i], 4)
+            if keys_view[i] > max_key:
+                max_key = keys_view[i]
+
+        sizes = np.bincount(keys, minlength=max_key + 1)
+        buckets = np.flatnonzero(sizes)
+        bucket_bounds = np.zeros(max_key + 1, dtype=np.float64)
+        bucket_bounds_view = bucket_bounds
+        for key in buckets:
+            bucket_bounds_view[key] = _jaro_winkler_upper_bound(
+                                        str1.length, key // 5, key % 5,
+                                        prefix_weight, boost_threshold)
+
+        # counting sort of the candidates by bucket, taking the buckets by
+        # decreasing bound
+        starts = np.zeros(max_key + 1, dtype=np.intp)
+        starts_view = starts
+        for key in buckets[np.argsort(-bucket_bounds[buckets],
+                                      kind='mergesort')]:
+            starts_view[key] = start
+            start += sizes[key]
+        order = np.empty(num_candidates, dtype=np.intp)
+        order_view = order
+        for i in range(num_candidates):
+            order_view[starts_view[keys_view[i]]] = i
+            starts_view[keys_view[i]] += 1
+
+        top_scores = np.empty(k, dtype=np.float64)
+        top_indices = np.empty(k, dtype=np.intp)
+        if k > 0:
+            _jaro_top_k(&str1, texts, order, keys, bucket_bounds, k,
+                        prefix_weight, boost_threshold, top_scores,
+                        top_indices)
+    finally:
+        free(texts)
+
+    if (top_scores < 0).any():
+        raise MemoryError()
+    ranking = np.lexsort((top_indices, -top_scores))
+    return top_indices[ranking], top_scores[ranking]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _jaro_top_k(const ustr_t *query, const ustr_t *texts,
+                      Py_ssize_t[:] order, Py_ssize_t[:] keys,
+                      double[:] bucket_bounds, Py_ssize_t k,
+                      double prefix_weight, double boost_threshold,
+                      double[:] top_scores, Py_ssize_t[:] top_indices):
+    # Fills top_scores and top_indices, in heap order, with the k best
+    # candidates. A negative score is left in top_scores if the memory for
+    # the match flags could not be allocated.
+    cdef Py_ssize_t size = 0
+    cdef Py_ssize_t pos = 0
+    cdef Py_ssize_t i = 0
+    cdef double score = 0
+    cdef double min_score = -1
+
+    with nogil:
+        for pos in range(order.shape[0]):
+            i = order[pos]
+            if size == k:
+                # candidates are visited by decreasing bound, so none of the
+                # remaining ones can do better than the worst of the top k
+                if bucket_bounds[keys[i]] < top_scores[0]:
+                    break
+                min_score = top_scores[0]
+            score = _jaro_winkler(query, &texts[i], prefix_weight,
+                                  boost_threshold, min_score)
+            if score < 0:
+                top_scores[0] = score
+                break
+            if size < k:
+                _heap_push(&top_scores[0], &top_indices[0], size, score, i)
+                size += 1
+            elif _is_worse(top_scores[0], top_indices[0], score, i):
+                top_scores[0] = score
+                top_indices[0] = i
+                _heap_sift_down(&top_scores[0], &top_indices[0], size, 0)
+
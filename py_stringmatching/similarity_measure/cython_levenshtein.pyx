@@ -2,21 +2,20 @@
 
 from __future__ import division
 cimport cython
+from cython.parallel cimport parallel, prange
 
-import numpy as np
-cimport numpy as np
-
-from numpy import int32
-from numpy cimport int32_t
+from libc.stdlib cimport malloc, free
 
-DTYPE = np.int
-ctypedef np.int_t DTYPE_t
+import numpy as np
 
-@cython.boundscheck(False)
-@cython.wraparound(False)
+from py_stringmatching.similarity_measure.cython_utils cimport (
+    ustr_t, as_unicode, init_ustr, char_at, trim_common_affixes,
+    has_exact_sums, word_t, WORD_SIZE,
+    pattern_table_t, pattern_table_init, pattern_table_get,
+    pattern_table_free)
 
 
-cdef inline int int_min(int a, int b, int c):
+cdef inline int int_min(int a, int b, int c) nogil:
     if (a<=b) and (a<= c):
         return a
     elif (b<=c):
@@ -25,21 +24,317 @@ cdef inline int int_min(int a, int b, int c):
         return c
 
 
-def levenshtein(object string1, object string2):
+cdef inline int _advance_block(word_t *vp, word_t *vn, word_t eq, int hin,
+                               word_t last_bit) nogil:
+    # Advances one 64 row block of the bit-parallel DP by one column, as in
+    # Hyyro, "A bit-vector algorithm for computing Levenshtein and Damerau
+    # edit distances" (2003). hin is the horizontal delta entering the top
+    # of the block and the returned value is the delta leaving the row
+    # selected by last_bit.
+    cdef word_t pv = vp[0]
+    cdef word_t mv = vn[0]
+    cdef word_t hin_neg = 1 if hin < 0 else 0
+    cdef word_t xv = eq | mv
+    cdef word_t xh, ph, mh
+    cdef int hout = 0
+
+    eq |= hin_neg
+    xh = (((eq & pv) + pv) ^ pv) | eq
+    ph = mv | ~(xh | pv)
+    mh = pv & xh
+
+    if ph & last_bit:
+        hout = 1
+    elif mh & last_bit:
+        hout = -1
+
+    ph <<= 1
+    mh <<= 1
+    mh |= hin_neg
+    if hin > 0:
+        ph |= 1
+
+    vp[0] = mh | ~(xv | ph)
+    vn[0] = ph & xv
+    return hout
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _levenshtein_bit_parallel(const pattern_table_t *peq,
+                                   int len_pattern, const ustr_t *text) nogil:
+    # Myers' single word algorithm, usable when the pattern fits in one
+    # machine word (len_pattern <= 64).
+    cdef word_t vp = ~(<word_t> 0)
+    cdef word_t vn = 0
+    cdef word_t last_bit = (<word_t> 1) << (len_pattern - 1)
+    cdef int score = len_pattern
+    cdef Py_ssize_t i = 0
+
+    for i in range(text.length):
+        score += _advance_block(&vp, &vn,
+                                pattern_table_get(peq, char_at(text, i))[0],
+                                1, last_bit)
+
+    return score
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _levenshtein_bit_parallel_blocks(const pattern_table_t *peq,
+                                          int len_pattern, const ustr_t *text,
+                                          word_t *vp, word_t *vn) nogil:
+    # Multi word variant of the bit-parallel algorithm for patterns longer
+    # than 64 characters. The pattern is split in blocks of 64 rows and the
+    # horizontal delta is carried from one block to the next. vp and vn
+    # have to hold one word per block.
+    cdef int num_blocks = peq.num_blocks
+    cdef word_t high_bit = (<word_t> 1) << (WORD_SIZE - 1)
+    cdef word_t last_bit = (<word_t> 1) << ((len_pattern - 1) % WORD_SIZE)
+    cdef int score = len_pattern
+    cdef Py_ssize_t i = 0
+    cdef int b = 0
+    cdef int hin = 0
+    cdef const word_t *eq_row
+
+    for b in range(num_blocks):
+        vp[b] = ~(<word_t> 0)
+        vn[b] = 0
+
+    for i in range(text.length):
+        eq_row = pattern_table_get(peq, char_at(text, i))
+        hin = 1
+        for b in range(num_blocks - 1):
+            hin = _advance_block(&vp[b], &vn[b], eq_row[b], hin, high_bit)
+        score += _advance_block(&vp[num_blocks - 1], &vn[num_blocks - 1],
+                                eq_row[num_blocks - 1], hin, last_bit)
+
+    return score
+
+
+cdef int _levenshtein_with_table(const pattern_table_t *peq, int len_pattern,
+                                const ustr_t *text, word_t *vp) nogil:
+    # Distance between the pattern described by peq and text, using the
+    # single word kernel when possible. vp has to hold two words per block
+    # of the pattern for the multi word kernel.
+    if len_pattern == 0:
+        return <int> text.length
+    if text.length == 0:
+        return len_pattern
+    if len_pattern <= WORD_SIZE:
+        return _levenshtein_bit_parallel(peq, len_pattern, text)
+    return _levenshtein_bit_parallel_blocks(peq, len_pattern, text,
+                                            vp, vp + peq.num_blocks)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _levenshtein_banded(const ustr_t *str1, const ustr_t *str2,
+                             int max_distance, int *row) nogil:
+    # Threshold bounded Levenshtein DP. Only the diagonal band of width
+    # 2 * max_distance + 1 is computed, as any cell outside of it is
+    # already further than max_distance away, and the computation stops
+    # as soon as a whole row of the band exceeds max_distance. Cell values
+    # are capped at max_distance + 1, which is also what is returned for
+    # pairs that are too far apart.
+    cdef int len_str1 = <int> str1.length
+    cdef int len_str2 = <int> str2.length
+    cdef int too_far = max_distance + 1
+    cdef int i = 0
+    cdef int j = 0
+    cdef int low = 0
+    cdef int high = 0
+    cdef int diag = 0
+    cdef int above = 0
+    cdef int left = 0
+    cdef int row_min = 0
+    cdef Py_UCS4 lchar = 0
+
+    for j in range(len_str2 + 1):
+        row[j] = j if j <= max_distance else too_far
+
+    for i in range(1, len_str1 + 1):
+        lchar = char_at(str1, i - 1)
+        low = i - max_distance if i > max_distance else 1
+        high = i + max_distance if i + max_distance < len_str2 else len_str2
+
+        diag = row[low - 1]
+        left = i if low == 1 and i <= max_distance else too_far
+        row[low - 1] = left
+        row_min = left
+
+        for j in range(low, high + 1):
+            above = row[j]
+            left = int_min(left + 1, above + 1,
+                           diag + (1 if lchar != char_at(str2, j - 1) else 0))
+            if left > too_far:
+                left = too_far
+            row[j] = left
+            diag = above
+            if left < row_min:
+                row_min = left
+
+        if row_min > max_distance:
+            return too_far
+
+    return row[len_str2]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _levenshtein_weighted(const ustr_t *str1, const ustr_t *str2,
+                                  double ins_cost, double del_cost,
+                                  double sub_cost, double max_distance,
+                                  double *row) nogil:
+    # Levenshtein DP with arbitrary non negative operation costs, keeping
+    # a single row of len_str2 + 1 cells. If max_distance is non negative,
+    # the computation stops with max_distance + 1 as soon as a whole row
+    # exceeds max_distance, as costs can only grow from there. The common
+    # prefix and suffix of the strings are matched at no cost, so they are
+    # trimmed first when the costs add up exactly, as otherwise the
+    # distance of the rest can differ from the whole one in the last bits.
+    cdef ustr_t view1 = str1[0]
+    cdef ustr_t view2 = str2[0]
+    if has_exact_sums(ins_cost, del_cost, sub_cost,
+                      view1.length + view2.length + 2):
+        trim_common_affixes(&view1, &view2)
+    str1 = &view1
+    str2 = &view2
+
+    cdef Py_ssize_t len_str1 = str1.length
+    cdef Py_ssize_t len_str2 = str2.length
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t j = 0
+    cdef double diag = 0
+    cdef double above = 0
+    cdef double value = 0
+    cdef double row_min = 0
+    cdef Py_UCS4 lchar = 0
+
+    for j in range(len_str2 + 1):
+        row[j] = j * ins_cost
+
+    for i in range(1, len_str1 + 1):
+        lchar = char_at(str1, i - 1)
+        diag = row[0]
+        row[0] = i * del_cost
+        row_min = row[0]
+        for j in range(1, len_str2 + 1):
+            above = row[j]
+            value = diag
+            if lchar != char_at(str2, j - 1):
+                value += sub_cost
+            if row[j - 1] + ins_cost < value:
+                value = row[j - 1] + ins_cost
+            if above + del_cost < value:
+                value = above + del_cost
+            row[j] = value
+            diag = above
+            if value < row_min:
+                row_min = value
+
+        if max_distance >= 0 and row_min > max_distance:
+            return max_distance + 1
+
+    if max_distance >= 0 and row[len_str2] > max_distance:
+        return max_distance + 1
+    return row[len_str2]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _damerau_levenshtein(const ustr_t *str1, const ustr_t *str2,
+                              int ins_cost, int del_cost, int sub_cost,
+                              int trans_cost, int *rows) nogil:
+    # Optimal string alignment DP: Levenshtein plus the transposition of
+    # two adjacent characters, where no substring is edited more than once.
+    # A transposition looks two rows back, so three rows of len_str2 + 1
+    # cells are kept in rows and rotated.
+    cdef int len_str1 = <int> str1.length
+    cdef int len_str2 = <int> str2.length
+    cdef int *two_back = rows
+    cdef int *prev = rows + (len_str2 + 1)
+    cdef int *curr = rows + 2 * (len_str2 + 1)
+    cdef int *tmp
+    cdef int i = 0
+    cdef int j = 0
+    cdef Py_UCS4 lchar = 0
+    cdef Py_UCS4 prev_lchar = 0
+    cdef Py_UCS4 rchar = 0
+
+    for j in range(len_str2 + 1):
+        curr[j] = j * ins_cost
+
+    for i in range(1, len_str1 + 1):
+        tmp = two_back
+        two_back = prev
+        prev = curr
+        curr = tmp
+
+        prev_lchar = lchar
+        lchar = char_at(str1, i - 1)
+        curr[0] = i * del_cost
+        for j in range(1, len_str2 + 1):
+            rchar = char_at(str2, j - 1)
+            curr[j] = int_min(curr[j - 1] + ins_cost, prev[j] + del_cost,
+                              prev[j - 1] + (sub_cost if lchar != rchar else 0))
+            if (i > 1 and j > 1 and lchar == char_at(str2, j - 2) and
+                    prev_lchar == rchar and lchar != rchar and
+                    two_back[j - 2] + trans_cost < curr[j]):
+                curr[j] = two_back[j - 2] + trans_cost
+
+    return curr[len_str2]
+
+
+cdef int _levenshtein_unit_cost(const ustr_t *str1,
+                                const ustr_t *str2) except -1:
+    # Unbounded unit cost distance of two non empty strings, computed by the
+    # bit-parallel kernels. The distance is symmetric, so the shorter string
+    # is used as the pattern to keep the number of blocks as low as
+    # possible.
+    cdef word_t *vp = NULL
+    cdef pattern_table_t peq
+
+    if str1.length > str2.length:
+        str1, str2 = str2, str1
 
-    cdef bytes bytes_s1 = string1.encode("UTF-8")
-    cdef bytes bytes_s2 = string2.encode("UTF-8")
+    if pattern_table_init(&peq, str1) < 0:
+        raise MemoryError()
 
-    cdef int len_str1 = len(bytes_s1)
-    cdef int len_str2 = len(bytes_s2)
+    try:
+        vp = <word_t *> malloc(2 * peq.num_blocks * sizeof(word_t))
+        if vp == NULL:
+            raise MemoryError()
+        return _levenshtein_with_table(&peq, <int> str1.length, str2, vp)
+    finally:
+        free(vp)
+        pattern_table_free(&peq)
+
+
+def levenshtein(object string1, object string2, int max_distance=-1):
+
+    cdef unicode unicode_s1 = as_unicode(string1)
+    cdef unicode unicode_s2 = as_unicode(string2)
+    cdef ustr_t str1, str2
+
+    init_ustr(&str1, unicode_s1)
+    init_ustr(&str2, unicode_s2)
+    # the common prefix and suffix are matched at no cost
+    trim_common_affixes(&str1, &str2)
+
+    cdef int len_str1 = <int> str1.length
+    cdef int len_str2 = <int> str2.length
 
     cdef int ins_cost = 1
     cdef int del_cost = 1
     cdef int sub_cost = 1
-    cdef int trans_cost = 1
 
-    cdef int i = 0
-    cdef int j = 0
+    cdef int *row = NULL
+
+    # pairs whose lengths differ by more than max_distance can never be
+    # within max_distance of each other.
+    if max_distance >= 0 and abs(len_str1 - len_str2) > max_distance:
+        return max_distance + 1
 
     if len_str1 == 0:
         return len_str2 * ins_cost
@@ -47,22 +342,274 @@ def levenshtein(object string1, object string2):
     if len_str2 == 0:
         return len_str1 * del_cost
 
-    cdef int[:,:] d_mat = np.zeros((len_str1 + 1, len_str2 + 1), dtype=np.int32)
+    if max_distance >= 0:
+        row = <int *> malloc((len_str2 + 1) * sizeof(int))
+        if row == NULL:
+            raise MemoryError()
+        try:
+            return _levenshtein_banded(&str1, &str2, max_distance, row)
+        finally:
+            free(row)
+
+    return _levenshtein_unit_cost(&str1, &str2)
+
+
+def weighted_levenshtein(object string1, object string2, double ins_cost,
+                         double del_cost, double sub_cost,
+                         double max_distance=-1):
+
+    cdef unicode unicode_s1 = as_unicode(string1)
+    cdef unicode unicode_s2 = as_unicode(string2)
+    cdef ustr_t str1, str2
+
+    init_ustr(&str1, unicode_s1)
+    init_ustr(&str2, unicode_s2)
+    # the common prefix and suffix are matched at no cost, and are trimmed
+    # when the costs add up exactly
+    if has_exact_sums(ins_cost, del_cost, sub_cost,
+                      str1.length + str2.length + 2):
+        trim_common_affixes(&str1, &str2)
+
+    cdef double min_distance = 0
+    cdef double *row = NULL
+
+    # every character of the longer string that is left over has to be
+    # inserted or deleted
+    if str1.length > str2.length:
+        min_distance = (str1.length - str2.length) * del_cost
+    else:
+        min_distance = (str2.length - str1.length) * ins_cost
+    if max_distance >= 0 and min_distance > max_distance:
+        return max_distance + 1
+
+    if str1.length == 0 or str2.length == 0:
+        return min_distance
+
+    # with a single cost the distance is a multiple of the unit cost one
+    if ins_cost == del_cost == sub_cost and max_distance < 0:
+        return ins_cost * _levenshtein_unit_cost(&str1, &str2)
+
+    row = <double *> malloc((str2.length + 1) * sizeof(double))
+    if row == NULL:
+        raise MemoryError()
+
+    try:
+        return _levenshtein_weighted(&str1, &str2, ins_cost, del_cost,
+                                     sub_cost, max_distance, row)
+    finally:
+        free(row)
+
+
+def damerau_levenshtein(object string1, object string2):
+
+    cdef unicode unicode_s1 = as_unicode(string1)
+    cdef unicode unicode_s2 = as_unicode(string2)
+    cdef ustr_t str1, str2
+
+    init_ustr(&str1, unicode_s1)
+    init_ustr(&str2, unicode_s2)
+
+    cdef int ins_cost = 1
+    cdef int del_cost = 1
+    cdef int sub_cost = 1
+    cdef int trans_cost = 1
+
+    cdef int *rows = NULL
+
+    if str1.length == 0:
+        return str2.length * ins_cost
+
+    if str2.length == 0:
+        return str1.length * del_cost
+
+    rows = <int *> malloc(3 * (str2.length + 1) * sizeof(int))
+    if rows == NULL:
+        raise MemoryError()
+
+    try:
+        return _damerau_levenshtein(&str1, &str2, ins_cost, del_cost, sub_cost,
+                                    trans_cost, rows)
+    finally:
+        free(rows)
+
+
+def levenshtein_batch(object query, list candidates, int num_threads=1,
+                      double ins_cost=1, double del_cost=1,
+                      double sub_cost=1):
+    """Levenshtein distances between query and every string in candidates.
+
+    The distances are computed without holding the GIL, on up to
+    num_threads threads, and returned as a NumPy array of ints, or of
+    floats if the costs are not all equal to 1.
+    """
+    cdef unicode unicode_query = as_unicode(query)
+    cdef list unicode_candidates = [as_unicode(candidate)
+                                    for candidate in candidates]
+    cdef Py_ssize_t num_candidates = len(unicode_candidates)
+    cdef ustr_t str_query
+    cdef ustr_t *texts = NULL
+    cdef Py_ssize_t i = 0
+    cdef bint single_cost = ins_cost == del_cost == sub_cost
+
+    init_ustr(&str_query, unicode_query)
+
+    texts = <ustr_t *> malloc((num_candidates + 1) * sizeof(ustr_t))
+    if texts == NULL:
+        raise MemoryError()
+
+    try:
+        for i in range(num_candidates):
+            init_ustr(&texts[i], unicode_candidates[i])
+
+        if single_cost:
+            # with a single cost the distances are multiples of the unit
+            # cost ones
+            scores = _levenshtein_batch_unit_cost(&str_query, texts,
+                                                  num_candidates, num_threads)
+            if ins_cost != 1:
+                scores = scores * ins_cost
+            return scores
+
+        return _levenshtein_batch_weighted(&str_query, texts, num_candidates,
+                                           num_threads, ins_cost, del_cost,
+                                           sub_cost)
+    finally:
+        free(texts)
+
+
+cdef _levenshtein_batch_unit_cost(const ustr_t *query, const ustr_t *texts,
+                                  Py_ssize_t num_texts, int num_threads):
+    cdef word_t *vp = NULL
+    cdef pattern_table_t peq
+    cdef Py_ssize_t i = 0
+    cdef int len_query = <int> query.length
+
+    scores = np.zeros(num_texts, dtype=np.intc)
+    cdef int[:] scores_view = scores
+
+    # the query is the pattern of every pair, so that its match vectors are
+    # built once and shared by all threads.
+    if pattern_table_init(&peq, query) < 0:
+        raise MemoryError()
+
+    try:
+        with nogil, parallel(num_threads=num_threads):
+            # one extra word pair keeps the size non zero for an empty query
+            vp = <word_t *> malloc(2 * (peq.num_blocks + 1) * sizeof(word_t))
+            for i in prange(num_texts, schedule='guided'):
+                if vp == NULL:
+                    scores_view[i] = -1
+                else:
+                    scores_view[i] = _levenshtein_with_table(
+                                        &peq, len_query, &texts[i], vp)
+            free(vp)
+    finally:
+        pattern_table_free(&peq)
+
+    if (scores < 0).any():
+        raise MemoryError()
+    return scores
+
+
+cdef _levenshtein_batch_weighted(const ustr_t *query, const ustr_t *texts,
+                                 Py_ssize_t num_texts, int num_threads,
+                                 double ins_cost, double del_cost,
+                                 double sub_cost):
+    cdef double *row = NULL
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t max_len = 0
+
+    scores = np.zeros(num_texts, dtype=np.float64)
+    cdef double[:] scores_view = scores
+
+    for i in range(num_texts):
+        if texts[i].length > max_len:
+            max_len = texts[i].length
+
+    with nogil, parallel(num_threads=num_threads):
+        row = <double *> malloc((max_len + 1) * sizeof(double))
+        for i in prange(num_texts, schedule='guided'):
+            if row == NULL:
+                scores_view[i] = -1
+            else:
+                scores_view[i] = _levenshtein_weighted(
+                                    query, &texts[i], ins_cost, del_cost,
+                                    sub_cost, -1, row)
+        free(row)
+
+    if (scores < 0).any():
+        raise MemoryError()
+    return scores
+
+
+def levenshtein_trie_query(list root, object query, int max_depth,
+                           double max_distance, double ins_cost,
+                           double del_cost, double sub_cost):
+    # Walks a trie made of [children, word] nodes, where children maps a
+    # character to a child node and word is the string ending at the node
+    # or None, and returns the (word, distance) pairs of the words within
+    # max_distance of query. A DP row is computed per node from the row of
+    # its parent. The walk is depth first, so the row of every ancestor of
+    # a node is still in rows[depth * width] when the node is reached. The
+    # rows add the costs in another order than weighted_levenshtein, so
+    # with costs whose sums are not exact, the distances can differ from
+    # those of weighted_levenshtein in the last bits.
+    cdef unicode unicode_query = as_unicode(query)
+    cdef ustr_t str1
+    init_ustr(&str1, unicode_query)
+
+    cdef Py_ssize_t width = str1.length + 1
+    cdef Py_ssize_t j = 0
+    cdef int depth = 0
+    cdef double *rows = NULL
+    cdef double *prev_row = NULL
+    cdef double *row = NULL
+    cdef double value = 0
+    cdef double row_min = 0
+    cdef Py_UCS4 rchar = 0
+    cdef list matches = []
+    cdef list nodes = []
+    cdef list node
+    cdef object child_char
 
-    for i from 0 <= i < (len_str1 + 1):
-        d_mat[i, 0] = i * del_cost
+    rows = <double *> malloc((max_depth + 1) * width * sizeof(double))
+    if rows == NULL:
+        raise MemoryError()
 
-    for j from 0 <= j < (len_str2 + 1):
-        d_mat[0, j] = j * ins_cost
+    try:
+        for j in range(width):
+            rows[j] = j * del_cost
+        if root[1] is not None and rows[width - 1] <= max_distance:
+            matches.append((root[1], rows[width - 1]))
+        for child_char, child in (<dict> root[0]).items():
+            nodes.append((child, child_char, 1))
 
-    cdef unsigned char lchar = 0
-    cdef unsigned char rchar = 0
+        while nodes:
+            node, child_char, depth = nodes.pop()
+            rchar = ord(child_char)
+            prev_row = rows + (depth - 1) * width
+            row = prev_row + width
+            row[0] = prev_row[0] + ins_cost
+            row_min = row[0]
+            for j in range(1, width):
+                value = prev_row[j - 1]
+                if char_at(&str1, j - 1) != rchar:
+                    value += sub_cost
+                if prev_row[j] + ins_cost < value:
+                    value = prev_row[j] + ins_cost
+                if row[j - 1] + del_cost < value:
+                    value = row[j - 1] + del_cost
+                row[j] = value
+                if value < row_min:
+                    row_min = value
 
-    for i from 0 <= i < (len_str1):
-        lchar = bytes_s1[i]
-        for j from 0 <= j < (len_str2):
-            rchar = bytes_s2[j]
+            if node[1] is not None and row[width - 1] <= max_distance:
+                matches.append((node[1], row[width - 1]))
+            # the values of a row never decrease further down the trie
+            if row_min <= max_distance:
+                for child_char, child in (<dict> node[0]).items():
+                    nodes.append((child, child_char, depth + 1))
+    finally:
+        free(rows)
 
-            d_mat[i+1,j+1] = int_min(d_mat[i + 1, j] + ins_cost,d_mat[i, j + 1] + del_cost,d_mat[i, j]
-                                        + (sub_cost if lchar != rchar else 0))
-    return d_mat[len_str1,len_str2]
+    return matches
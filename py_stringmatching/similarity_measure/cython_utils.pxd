@@ -0,0 +1,221 @@
+# Helpers shared by the Cython kernels of the similarity measures.
+#
+# Strings are read through their internal 1, 2 or 4 byte per character
+# representation (PEP 393), so the kernels work on codepoints without
+# encoding or copying their inputs.
+
+from libc.stdlib cimport malloc, calloc, free
+from libc.math cimport fabs, floor
+from libc.string cimport memset
+
+cdef extern from *:
+    """
+    #if PY_MAJOR_VERSION >= 3
+    #if PY_VERSION_HEX >= 0x030C0000
+    #define __pysm_unicode_ready(o) 0
+    #else
+    #define __pysm_unicode_ready(o) PyUnicode_READY(o)
+    #endif
+    #define __pysm_unicode_kind(o) ((int) PyUnicode_KIND(o))
+    #define __pysm_unicode_data(o) PyUnicode_DATA(o)
+    #define __pysm_unicode_read(kind, data, i) PyUnicode_READ(kind, data, i)
+    #else
+    #define __pysm_unicode_ready(o) 0
+    #define __pysm_unicode_kind(o) ((int) sizeof(Py_UNICODE))
+    #define __pysm_unicode_data(o) ((void *) PyUnicode_AS_UNICODE(o))
+    #define __pysm_unicode_read(kind, data, i) \\
+        ((Py_UCS4) ((Py_UNICODE *) (data))[i])
+    #endif
+    """
+    int __pysm_unicode_ready(object o) except -1
+    int __pysm_unicode_kind(object o)
+    void *__pysm_unicode_data(object o)
+    Py_UCS4 __pysm_unicode_read(int kind, const void *data,
+                                Py_ssize_t index) nogil
+
+# A machine word for the bit-parallel kernels. unsigned long long is used
+# instead of uint64_t as older MSVC compilers do not ship stdint.h.
+ctypedef unsigned long long word_t
+
+cdef enum:
+    WORD_SIZE = 64
+    # codepoints below this get a direct row in a pattern_table_t, others
+    # are looked up in its hash table.
+    DIRECT_CHARS = 256
+    # patterns up to this length use the storage inlined in the
+    # pattern_table_t, so that no allocation is needed.
+    SMALL_PATTERN = 64
+    SMALL_HASH_SIZE = 128
+
+
+# A read-only view on the characters of a unicode object. The view does not
+# own a reference, the object has to be kept alive by the caller.
+ctypedef struct ustr_t:
+    int kind
+    const void *data
+    Py_ssize_t length
+
+
+cdef inline unicode as_unicode(object string):
+    # byte strings (str on Python 2) are decoded as UTF-8
+    if isinstance(string, unicode):
+        return string
+    return string.decode('UTF-8')
+
+
+cdef inline int init_ustr(ustr_t *view, unicode string) except -1:
+    __pysm_unicode_ready(string)
+    view.kind = __pysm_unicode_kind(string)
+    view.data = __pysm_unicode_data(string)
+    view.length = len(string)
+    return 0
+
+
+cdef inline Py_UCS4 char_at(const ustr_t *view, Py_ssize_t index) nogil:
+    return __pysm_unicode_read(view.kind, view.data, index)
+
+
+cdef inline Py_ssize_t trim_common_affixes(ustr_t *str1, ustr_t *str2) nogil:
+    # Narrows both views to what is left once their common prefix and
+    # suffix are removed, and returns the number of characters removed
+    # from each of them.
+    cdef Py_ssize_t min_len = (str1.length if str1.length < str2.length
+                               else str2.length)
+    cdef Py_ssize_t prefix = 0
+    cdef Py_ssize_t suffix = 0
+
+    while prefix < min_len and char_at(str1, prefix) == char_at(str2, prefix):
+        prefix += 1
+    while (suffix < min_len - prefix and
+           char_at(str1, str1.length - suffix - 1) ==
+           char_at(str2, str2.length - suffix - 1)):
+        suffix += 1
+
+    str1.data = <const char *> str1.data + prefix * str1.kind
+    str2.data = <const char *> str2.data + prefix * str2.kind
+    str1.length -= prefix + suffix
+    str2.length -= prefix + suffix
+    return prefix + suffix
+
+
+cdef inline bint has_exact_sums(double cost1, double cost2, double cost3,
+                                Py_ssize_t num_terms) nogil:
+    # True if the sums of at most num_terms values among the costs, 0 and
+    # 1 are exact in floating point, so that they do not depend on the
+    # order of the additions: the costs are multiples of 1 / 1024 and the
+    # sums stay below 2 ** 43. Mirrors utils.has_exact_sums.
+    cdef double largest = max(1.0, fabs(cost1), fabs(cost2), fabs(cost3))
+    if (floor(cost1 * 1024) != cost1 * 1024 or
+            floor(cost2 * 1024) != cost2 * 1024 or
+            floor(cost3 * 1024) != cost3 * 1024):
+        return False
+    return num_terms * largest < 8796093022208.0
+
+
+# Pattern match vectors of a pattern: for every character c, bit i of block
+# b of the row of c is set iff pattern[b * 64 + i] == c. Codepoints below
+# DIRECT_CHARS index their row directly, the others are mapped to a row
+# through an open addressing hash table. The last row is all zeros and is
+# shared by all characters that do not occur in the pattern.
+ctypedef struct pattern_table_t:
+    int num_blocks
+    int num_rows
+    Py_ssize_t hash_mask
+    Py_UCS4 *keys
+    int *rows
+    word_t *peq
+    Py_UCS4 small_keys[SMALL_HASH_SIZE]
+    int small_rows[SMALL_HASH_SIZE]
+    word_t small_peq[DIRECT_CHARS + SMALL_PATTERN + 1]
+
+
+cdef inline Py_ssize_t _hash_slot(const pattern_table_t *table,
+                                  Py_UCS4 c) nogil:
+    cdef size_t h = <size_t> c * <size_t> 2654435761U
+    cdef Py_ssize_t slot = (h ^ (h >> 15)) & table.hash_mask
+    while table.rows[slot] >= 0 and table.keys[slot] != c:
+        slot = (slot + 1) & table.hash_mask
+    return slot
+
+
+cdef inline int pattern_table_init(pattern_table_t *table,
+                                   const ustr_t *pattern) nogil:
+    # Returns -1 if the memory for the table could not be allocated.
+    cdef Py_ssize_t hash_size = SMALL_HASH_SIZE
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t slot = 0
+    cdef Py_UCS4 c = 0
+    cdef int row = 0
+
+    table.num_blocks = <int> ((pattern.length + WORD_SIZE - 1) // WORD_SIZE)
+    table.keys = table.small_keys
+    table.rows = table.small_rows
+    table.peq = table.small_peq
+    if pattern.length > SMALL_PATTERN:
+        while hash_size < 2 * pattern.length:
+            hash_size *= 2
+        table.keys = <Py_UCS4 *> malloc(hash_size * sizeof(Py_UCS4))
+        table.rows = <int *> malloc(hash_size * sizeof(int))
+        if table.keys == NULL or table.rows == NULL:
+            pattern_table_free(table)
+            return -1
+    table.hash_mask = hash_size - 1
+    for i in range(hash_size):
+        table.rows[i] = -1
+
+    # assign a row to every distinct codepoint outside the direct range
+    table.num_rows = DIRECT_CHARS
+    for i in range(pattern.length):
+        c = char_at(pattern, i)
+        if c >= DIRECT_CHARS:
+            slot = _hash_slot(table, c)
+            if table.rows[slot] < 0:
+                table.keys[slot] = c
+                table.rows[slot] = table.num_rows
+                table.num_rows += 1
+    # the shared row of characters not in the pattern
+    table.num_rows += 1
+
+    if pattern.length > SMALL_PATTERN:
+        table.peq = <word_t *> calloc(table.num_rows * table.num_blocks,
+                                      sizeof(word_t))
+        if table.peq == NULL:
+            pattern_table_free(table)
+            return -1
+    else:
+        memset(table.peq, 0, table.num_rows * table.num_blocks * sizeof(word_t))
+
+    for i in range(pattern.length):
+        row = pattern_table_row(table, char_at(pattern, i))
+        table.peq[row * table.num_blocks + i // WORD_SIZE] |= (
+            (<word_t> 1) << (i % WORD_SIZE))
+    return 0
+
+
+cdef inline int pattern_table_row(const pattern_table_t *table,
+                                  Py_UCS4 c) nogil:
+    cdef Py_ssize_t slot = 0
+    if c < DIRECT_CHARS:
+        return <int> c
+    slot = _hash_slot(table, c)
+    if table.rows[slot] < 0:
+        return table.num_rows - 1
+    return table.rows[slot]
+
+
+cdef inline const word_t *pattern_table_get(const pattern_table_t *table,
+                                            Py_UCS4 c) nogil:
+    # the num_blocks match vectors of c
+    return table.peq + pattern_table_row(table, c) * table.num_blocks
+
+
+cdef inline void pattern_table_free(pattern_table_t *table) nogil:
+    if table.keys != table.small_keys:
+        free(table.keys)
+    if table.rows != table.small_rows:
+        free(table.rows)
+    if table.peq != table.small_peq:
+        free(table.peq)
+    table.keys = table.small_keys
+    table.rows = table.small_rows
+    table.peq = table.small_peq
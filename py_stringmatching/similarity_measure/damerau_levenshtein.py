@@ -0,0 +1,85 @@
+"""Damerau-Levenshtein distance measure"""
+
+from __future__ import division
+
+from py_stringmatching import utils
+from py_stringmatching.similarity_measure.cython_levenshtein import \
+                                                    damerau_levenshtein
+from py_stringmatching.similarity_measure.sequence_similarity_measure import \
+                                                    SequenceSimilarityMeasure
+
+
+class DamerauLevenshtein(SequenceSimilarityMeasure):
+    """Damerau-Levenshtein distance measure class.
+
+    This class computes the optimal string alignment variant of the Damerau-Levenshtein distance, in which no substring
+    is edited more than once.
+    """
+    def __init__(self):
+        super(DamerauLevenshtein, self).__init__()
+
+    def get_raw_score(self, string1, string2):
+        """
+        Computes the Damerau-Levenshtein distance between two strings.
+
+        The Damerau-Levenshtein distance extends the Levenshtein distance with the transposition of two adjacent
+        characters, so that swapped characters such as 'ab' vs 'ba' cost a single operation instead of two
+        substitutions. Transforming a string is carried out using a sequence of the following operators: delete a
+        character, insert a character, substitute one character for another, and transpose two adjacent characters.
+
+        Args:
+            string1,string2 (str): Input strings
+
+        Returns:
+            Damerau-Levenshtein distance (int)
+
+        Raises:
+            TypeError : If the inputs are not strings
+
+        Examples:
+            >>> dl = DamerauLevenshtein()
+            >>> dl.get_raw_score('a', '')
+            1
+            >>> dl.get_raw_score('abcd', 'acbd')
+            1
+            >>> dl.get_raw_score('MARTHA', 'MARHTA')
+            1
+            >>> dl.get_raw_score('ca', 'abc')
+            3
+
+        """
+        # input validations
+        utils.sim_check_for_none(string1, string2)
+        utils.sim_check_for_string_inputs(string1, string2)
+        if utils.sim_check_for_exact_match(string1, string2):
+            return 0
+        return damerau_levenshtein(string1, string2)
+
+    def get_sim_score(self, string1, string2):
+        """
+        Computes the normalized Damerau-Levenshtein similarity between two strings.
+
+        Args:
+            string1,string2 (str): Input strings
+
+        Returns:
+            Normalized Damerau-Levenshtein similarity (float)
+
+        Raises:
+            TypeError : If the inputs are not strings
+
+        Examples:
+            >>> dl = DamerauLevenshtein()
+            >>> dl.get_sim_score('a', '')
+            0.0
+            >>> dl.get_sim_score('abcd', 'acbd')
+            0.75
+            >>> dl.get_sim_score('MARTHA', 'MARHTA')
+            0.8333333333333334
+
+        """
+        raw_score = self.get_raw_score(string1, string2)
+        max_len = max(len(string1), len(string2))
+        if max_len == 0:
+            return 1.0
+        return 1 - (raw_score / max_len)
@@ -9,8 +9,8 @@ import six
 import numpy as np
 
 from py_stringmatching import utils
-from six.moves import xrange
 from six import text_type
+from py_stringmatching.similarity_measure.cython_editex import editex
 from py_stringmatching.similarity_measure.sequence_similarity_measure import \
                                                     SequenceSimilarityMeasure
 
@@ -86,38 +86,21 @@ class Editex(SequenceSimilarityMeasure):
         string1 = string1.replace('ß', 'SS')
         string2 = string2.replace('ß', 'SS')
 
+        # strings that only differ by case or accents are at distance zero
+        # when matches are free, as no cost is negative. The common prefix
+        # and suffix of other strings cannot be trimmed, since the cost of
+        # deleting a character depends on the one before it.
+        if (string1 == string2 and self.match_cost == 0 and
+                self.group_cost >= 0 and self.mismatch_cost >= 0):
+            return 0
+
         if len(string1) == 0:
             return len(string2) * self.mismatch_cost
         if len(string2) == 0:
             return len(string1) * self.mismatch_cost
 
-        d_mat = np.zeros((len(string1) + 1, len(string2) + 1), dtype=np.int)
-        len1 = len(string1)
-        len2 = len(string2)
-        string1 = ' ' + string1
-        string2 = ' ' + string2
-        editex_helper = EditexHelper(self.match_cost, self.mismatch_cost,
-                                     self.group_cost)
-
-        if not self.local:
-            for i in xrange(1, len1 + 1):
-                d_mat[i, 0] = d_mat[i - 1, 0] + editex_helper.d_cost(
-                                                    string1[i - 1], string1[i])
-
-        for j in xrange(1, len2 + 1):
-            d_mat[0, j] = d_mat[0, j - 1] + editex_helper.d_cost(string2[j - 1],
-                                                                 string2[j])
-
-        for i in xrange(1, len1 + 1):
-            for j in xrange(1, len2 + 1):
-                d_mat[i, j] = min(d_mat[i - 1, j] + editex_helper.d_cost(
-                                                    string1[i - 1], string1[i]),
-                                  d_mat[i, j - 1] + editex_helper.d_cost(
-                                                    string2[j - 1], string2[j]),
-                                  d_mat[i - 1, j - 1] + editex_helper.r_cost(
-                                                        string1[i], string2[j]))
-
-        return d_mat[len1, len2]
+        return editex(string1, string2, self.match_cost, self.group_cost,
+                      self.mismatch_cost, self.local, _LETTER_GROUPS)
 
     def get_sim_score(self, string1, string2):
         """
@@ -268,3 +251,11 @@ class EditexHelper:
         if ch1 != ch2 and (ch1 == 'H' or ch1 == 'W'):
             return self.group_cost
         return self.r_cost(ch1, ch2)
+
+
+# letter groups of the characters, indexed by codepoint, as read by the
+# compiled DP. -1 marks the characters outside of the letter groups, as are
+# all the characters past the end of the table.
+_LETTER_GROUPS = np.full(256, -1, dtype=np.intc)
+for _letter, _group in EditexHelper.letter_groups.items():
+    _LETTER_GROUPS[ord(_letter)] = _group
@@ -74,9 +74,13 @@ class GeneralizedJaccard(HybridSimilarityMeasure):
         match_score = 0.0
         match_count = 0
         list_matches = []
+        # scores at or below the threshold are discarded, so the similarity
+        # function may skip the pairs that cannot reach it
+        sim_func = utils.get_sim_func_with_min_score(self.sim_func,
+                                                     self.threshold)
         for element in set1:
             for item in set2:
-                score = self.sim_func(element, item)
+                score = sim_func(element, item)
                 if score > 1 or score < 0:
                     raise ValueError('Similarity measure should' + \
                                      ' return value in the range [0,1]')
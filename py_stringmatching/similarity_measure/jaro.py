@@ -1,7 +1,7 @@
 """Jaro similarity measure"""
 
 from py_stringmatching import utils
-from six.moves import xrange
+from py_stringmatching.similarity_measure.cython_jaro import jaro, jaro_top_k
 from py_stringmatching.similarity_measure.sequence_similarity_measure import \
                                                     SequenceSimilarityMeasure
 
@@ -12,18 +12,23 @@ class Jaro(SequenceSimilarityMeasure):
     def __init__(self):
         super(Jaro, self).__init__()
 
-    def get_raw_score(self, string1, string2):
+    def get_raw_score(self, string1, string2, min_score=None):
         """
         Computes the jaro measure between two strings.
 
         The Jaro measure is a type of edit distance, This was developed mainly to compare short strings,
         such as first and last names.
 
+        If min_score is given, 0 is returned for pairs whose score is below it. The score of a pair can be no higher
+        than if all the characters of the shorter string were matched, so pairs whose lengths are too different to
+        reach min_score are rejected without matching their characters.
+
         Args:
             string1,string2 (str): Input strings
+            min_score (float): Lowest score of interest (optional, defaults to None)
 
         Returns:
-            Jaro measure (float)
+            Jaro measure (float), or 0 if it is below min_score
 
         Raises:
             TypeError : If the inputs are not strings or if one of the inputs is None.
@@ -36,6 +41,8 @@ class Jaro(SequenceSimilarityMeasure):
             0.8222222222222223
             >>> jaro.get_raw_score('DIXON', 'DICKSONX')
             0.7666666666666666
+            >>> jaro.get_raw_score('DIXON', 'DICKSONX', min_score=0.8)
+            0.0
 
         """
         # input validations
@@ -46,45 +53,9 @@ class Jaro(SequenceSimilarityMeasure):
         if utils.sim_check_for_empty(string1, string2):
             return 0
 
-        len_s1 = len(string1)
-        len_s2 = len(string2)
-
-        max_len = max(len_s1, len_s2)
-        search_range = (max_len // 2) - 1
-        if search_range < 0:
-            search_range = 0
-
-        flags_s1 = [False] * len_s1
-        flags_s2 = [False] * len_s2
-
-        common_chars = 0
-        for i, ch_s1 in enumerate(string1):
-            low = i - search_range if i > search_range else 0
-            high = i + search_range if i + search_range < len_s2 else len_s2 - 1
-            for j in xrange(low, high + 1):
-                if not flags_s2[j] and string2[j] == ch_s1:
-                    flags_s1[i] = flags_s2[j] = True
-                    common_chars += 1
-                    break
-
-        if not common_chars:
-            return 0
-
-        k = trans_count = 0
-        for i, f_s1 in enumerate(flags_s1):
-            if f_s1:
-                for j in xrange(k, len_s2):
-                    if flags_s2[j]:
-                        k = j + 1
-                        break
-                if string1[i] != string2[j]:
-                    trans_count += 1
-
-        trans_count /= 2
-        common_chars = float(common_chars)
-        weight = ((common_chars / len_s1 + common_chars / len_s2 +
-                   (common_chars - trans_count) / common_chars)) / 3
-        return weight
+        if min_score is None:
+            return jaro(string1, string2)
+        return jaro(string1, string2, min_score)
 
     def get_sim_score(self, string1, string2):
         """
@@ -110,3 +81,40 @@ class Jaro(SequenceSimilarityMeasure):
 
         """
         return self.get_raw_score(string1, string2)
+
+    def top_k(self, query, candidates, k):
+        """
+        Finds the k candidate strings with the highest jaro measure to a query string.
+
+        The jaro measure of a pair is bounded by the lengths of its strings, so the candidates are bucketed by length
+        and the buckets are visited by decreasing bound. The search stops as soon as no remaining candidate can score
+        above the k-th best score found so far.
+
+        Args:
+            query (str): Input string
+            candidates (list): List of input strings
+            k (int): Number of candidates to return
+
+        Returns:
+            Indices of the k best candidates and their jaro measures, by decreasing measure and then increasing index
+            (pair of NumPy arrays, of at most k ints and floats)
+
+        Raises:
+            TypeError : If the query or one of the candidates is not a string
+            ValueError : If k is not positive
+
+        Examples:
+            >>> jaro = Jaro()
+            >>> indices, scores = jaro.top_k('MARTHA', ['MARHTA', 'MARTA', 'ARTHUR', 'MARTHA'], 2)
+            >>> indices
+            array([3, 0])
+            >>> scores
+            array([1.        , 0.94444444])
+
+        """
+        # input validations
+        utils.sim_check_for_none(query, candidates)
+        utils.tok_check_for_string_input(query, *candidates)
+        if k < 1:
+            raise ValueError('k should be greater than zero')
+        return jaro_top_k(query, list(candidates), k)
@@ -1,7 +1,8 @@
 """Jaro-Winkler similarity measure"""
 
 from py_stringmatching import utils
-from py_stringmatching.similarity_measure.jaro import Jaro
+from py_stringmatching.similarity_measure.cython_jaro import jaro_top_k, \
+                                                    jaro_winkler
 from py_stringmatching.similarity_measure.sequence_similarity_measure import \
                                                     SequenceSimilarityMeasure
 
@@ -11,23 +12,30 @@ class JaroWinkler(SequenceSimilarityMeasure):
 
     Parameters:
         prefix_weight (float): Weight to give the prefix (defaults to 0.1)
+        boost_threshold (float): Jaro score above which the prefix bonus is given (defaults to None, in which case the
+                                 bonus is always given). Winkler's original definition uses 0.7.
     """
-    def __init__(self, prefix_weight=0.1):
+    def __init__(self, prefix_weight=0.1, boost_threshold=None):
         self.prefix_weight = prefix_weight
+        self.boost_threshold = boost_threshold
         super(JaroWinkler, self).__init__()
 
-    def get_raw_score(self, string1, string2):
+    def get_raw_score(self, string1, string2, min_score=None):
         """
         Computes the Jaro-Winkler measure between two strings.
 
         The Jaro-Winkler measure is designed to capture cases where two strings have a low Jaro score, but share a prefix
         and thus are likely to match.
 
+        If min_score is given, 0 is returned for pairs whose score is below it. Pairs whose lengths and common prefix
+        bound their score below min_score are rejected without matching their characters.
+
         Args:
             string1,string2 (str): Input strings
+            min_score (float): Lowest score of interest (optional, defaults to None)
 
         Returns:
-            Jaro-Winkler measure (float)
+            Jaro-Winkler measure (float), or 0 if it is below min_score
 
         Raises:
             TypeError : If the inputs are not strings or if one of the inputs is None.
@@ -40,6 +48,11 @@ class JaroWinkler(SequenceSimilarityMeasure):
             0.84
             >>> jw.get_raw_score('DIXON', 'DICKSONX')
             0.8133333333333332
+            >>> jw = JaroWinkler(boost_threshold=0.7)
+            >>> jw.get_raw_score('ABCD', 'ABXY')
+            0.6666666666666666
+            >>> jw.get_raw_score('MARTHA', 'MARHTAXYZ', min_score=0.9)
+            0.0
 
         """
         # input validations
@@ -50,19 +63,16 @@ class JaroWinkler(SequenceSimilarityMeasure):
         if utils.sim_check_for_empty(string1, string2):
             return 0
 
-        jw_score = Jaro().get_raw_score(string1, string2)
-        min_len = min(len(string1), len(string2))
-
-        # prefix length can be at max 4
-        j = min(min_len, 4)
-        i = 0
-        while i < j and string1[i] == string2[i] and string1[i]:
-            i += 1
-
-        if i:
-            jw_score += i * self.prefix_weight * (1 - jw_score)
-
-        return jw_score
+        # the Jaro score and its prefix bonus are computed together by the
+        # compiled kernel, negative thresholds disable the boost threshold
+        # and min_score
+        boost_threshold = self.boost_threshold
+        if boost_threshold is None:
+            boost_threshold = -1
+        if min_score is None:
+            min_score = -1
+        return jaro_winkler(string1, string2, self.prefix_weight,
+                            boost_threshold, min_score)
 
     def get_sim_score(self, string1, string2):
         """
@@ -89,6 +99,47 @@ class JaroWinkler(SequenceSimilarityMeasure):
         """
         return self.get_raw_score(string1, string2)
 
+    def top_k(self, query, candidates, k):
+        """
+        Finds the k candidate strings with the highest Jaro-Winkler measure to a query string.
+
+        The Jaro-Winkler measure of a pair is bounded by the lengths of its strings and their common prefix, so the
+        candidates are bucketed by both and the buckets are visited by decreasing bound. The search stops as soon as no
+        remaining candidate can score above the k-th best score found so far.
+
+        Args:
+            query (str): Input string
+            candidates (list): List of input strings
+            k (int): Number of candidates to return
+
+        Returns:
+            Indices of the k best candidates and their Jaro-Winkler measures, by decreasing measure and then increasing
+            index (pair of NumPy arrays, of at most k ints and floats)
+
+        Raises:
+            TypeError : If the query or one of the candidates is not a string
+            ValueError : If k is not positive
+
+        Examples:
+            >>> jw = JaroWinkler()
+            >>> indices, scores = jw.top_k('MARTHA', ['MARHTA', 'MARTA', 'ARTHUR', 'MARTHA'], 2)
+            >>> indices
+            array([3, 1])
+            >>> scores
+            array([1.        , 0.96666667])
+
+        """
+        # input validations
+        utils.sim_check_for_none(query, candidates)
+        utils.tok_check_for_string_input(query, *candidates)
+        if k < 1:
+            raise ValueError('k should be greater than zero')
+        boost_threshold = self.boost_threshold
+        if boost_threshold is None:
+            boost_threshold = -1
+        return jaro_top_k(query, list(candidates), k, self.prefix_weight,
+                          boost_threshold)
+
     def get_prefix_weight(self):
         """
         Get prefix weight
@@ -107,3 +158,22 @@ class JaroWinkler(SequenceSimilarityMeasure):
         """
         self.prefix_weight = prefix_weight
         return True
+
+    def get_boost_threshold(self):
+        """
+        Get boost threshold
+
+        Returns:
+            boost threshold (float)
+        """
+        return self.boost_threshold
+
+    def set_boost_threshold(self, boost_threshold):
+        """
+        Set boost threshold
+
+        Args:
+            boost_threshold (float): Jaro score above which the prefix bonus is given
+        """
+        self.boost_threshold = boost_threshold
+        return True
@@ -3,33 +3,50 @@
 from __future__ import division
 
 from py_stringmatching import utils
-from py_stringmatching.similarity_measure.cython_levenshtein import levenshtein
+from py_stringmatching.similarity_measure.cython_levenshtein import levenshtein, \
+                                                levenshtein_batch, weighted_levenshtein
 from py_stringmatching.similarity_measure.sequence_similarity_measure import \
                                                     SequenceSimilarityMeasure
 
 
 class Levenshtein(SequenceSimilarityMeasure):
     """Levenshtein distance measure class.
+
+    Parameters:
+        ins_cost (float): Cost of inserting a character (defaults to 1)
+        del_cost (float): Cost of deleting a character (defaults to 1)
+        sub_cost (float): Cost of substituting one character for another (defaults to 1)
     """
-    def __init__(self):
+    def __init__(self, ins_cost=1, del_cost=1, sub_cost=1):
+        utils.sim_check_for_non_negative_costs(ins_cost, del_cost, sub_cost)
+        self.ins_cost = ins_cost
+        self.del_cost = del_cost
+        self.sub_cost = sub_cost
         super(Levenshtein, self).__init__()
 
-    def get_raw_score(self, string1, string2):
+    def get_raw_score(self, string1, string2, max_distance=None):
         """
         Computes the Levenshtein distance between two strings.
 
         Levenshtein distance computes the minimum cost of transforming one string into the other. Transforming a string
         is carried out using a sequence of the following operators: delete a character, insert a character, and
-        substitute one character for another.
+        substitute one character for another. Each operator costs 1 unless other costs are given to the constructor.
+
+        If max_distance is given, only the diagonal band of the DP table that can hold distances up to max_distance is
+        computed and the computation stops as soon as the distance is known to exceed it. In that case max_distance + 1
+        is returned instead of the exact distance.
 
         Args:
             string1,string2 (str): Input strings
+            max_distance (int): Largest distance of interest (optional, defaults to None)
 
         Returns:
-            Levenshtein distance (int)
+            Levenshtein distance (int, or float if the costs are not all 1), or max_distance + 1 if the distance is
+            larger than max_distance
 
         Raises:
             TypeError : If the inputs are not strings
+            ValueError : If max_distance is negative
 
         Examples:
             >>> lev = Levenshtein()
@@ -39,24 +56,84 @@ class Levenshtein(SequenceSimilarityMeasure):
             3
             >>> lev.get_raw_score('levenshtein', 'frankenstein')
             6
+            >>> lev.get_raw_score('levenshtein', 'frankenstein', max_distance=3)
+            4
+            >>> lev = Levenshtein(ins_cost=1, del_cost=1, sub_cost=1.5)
+            >>> lev.get_raw_score('example', 'samples')
+            3.5
 
         """
         # input validations
         utils.sim_check_for_none(string1, string2)
         utils.sim_check_for_string_inputs(string1, string2)
+        if max_distance is None:
+            max_distance = -1
+        elif max_distance < 0:
+            raise ValueError('max_distance should be greater than or equal to zero')
         if utils.sim_check_for_exact_match(string1, string2):
             return 0.0
-        return levenshtein(string1, string2)
+        if self._has_unit_costs():
+            # unit cost distances are integers, so a fractional bound can be
+            # rounded down for the kernel
+            raw_score = levenshtein(string1, string2, int(max_distance))
+            if max_distance >= 0 and raw_score > max_distance:
+                return max_distance + 1
+            return raw_score
+        return weighted_levenshtein(string1, string2, self.ins_cost,
+                                    self.del_cost, self.sub_cost, max_distance)
+
+    def get_raw_scores(self, query, candidates, n_jobs=1):
+        """
+        Computes the Levenshtein distance between a query string and each of the candidate strings.
+
+        The distances are computed by the compiled kernel over the whole candidate list at once, without holding the
+        GIL, so the work is spread over n_jobs threads of the current process.
+
+        Args:
+            query (str): Input string
+            candidates (list): List of input strings
+            n_jobs (int): Number of threads to use (defaults to 1). If -1 all CPUs are used, if -2 all CPUs but one,
+                          and so on.
+
+        Returns:
+            Levenshtein distances in the order of the candidates (NumPy array of ints, or of floats if the costs are
+            not all 1)
+
+        Raises:
+            TypeError : If the query or one of the candidates is not a string
+            ValueError : If n_jobs is zero
+
+        Examples:
+            >>> lev = Levenshtein()
+            >>> lev.get_raw_scores('example', ['samples', 'example', ''])
+            array([3, 0, 7], dtype=int32)
+            >>> lev.get_raw_scores('levenshtein', ['frankenstein', 'a'], n_jobs=-1)
+            array([ 6, 11], dtype=int32)
 
-    def get_sim_score(self, string1, string2):
+        """
+        # input validations
+        utils.sim_check_for_none(query, candidates)
+        utils.tok_check_for_string_input(query, *candidates)
+        return levenshtein_batch(query, list(candidates),
+                                 utils.get_num_threads(n_jobs), self.ins_cost,
+                                 self.del_cost, self.sub_cost)
+
+    def get_sim_score(self, string1, string2, min_sim=None):
         """
         Computes the normalized levenshtein similarity between two strings.
 
+        The distance is normalized by the cost of the most expensive transformation between strings of these lengths,
+        which is the length of the longer string for unit costs.
+
+        If min_sim is given, the underlying distance is computed with the corresponding max_distance bound (see
+        get_raw_score) and pairs whose similarity is below min_sim are rejected early.
+
         Args:
             string1,string2 (str): Input strings
+            min_sim (float): Smallest similarity of interest (optional, defaults to None)
 
         Returns:
-            Normalized levenshtein similarity (float)
+            Normalized levenshtein similarity (float), or 0.0 if the similarity is below min_sim
 
         Raises:
             TypeError : If the inputs are not strings
@@ -69,10 +146,119 @@ class Levenshtein(SequenceSimilarityMeasure):
             0.5714285714285714
             >>> lev.get_sim_score('levenshtein', 'frankenstein')
             0.5
+            >>> lev.get_sim_score('levenshtein', 'frankenstein', min_sim=0.6)
+            0.0
 
         """
-        raw_score = self.get_raw_score(string1, string2)
-        max_len = max(len(string1), len(string2))
-        if max_len == 0:
+        if min_sim is None:
+            raw_score = self.get_raw_score(string1, string2)
+            max_cost = self._get_max_cost(len(string1), len(string2))
+        else:
+            # input validations
+            utils.sim_check_for_none(string1, string2)
+            utils.sim_check_for_string_inputs(string1, string2)
+            max_cost = self._get_max_cost(len(string1), len(string2))
+            if self._has_unit_costs():
+                max_distance = self._get_max_distance(max_cost, min_sim)
+            else:
+                # small slack so that rounding cannot reject a pair sitting
+                # exactly at min_sim, the similarity is checked below anyway
+                max_distance = (1 - min_sim) * max_cost * (1 + 1e-9)
+            if max_distance < 0:
+                return 0.0
+            raw_score = self.get_raw_score(string1, string2, max_distance)
+            if raw_score > max_distance:
+                return 0.0
+        if max_cost == 0:
             return 1.0
-        return 1 - (raw_score / max_len)
+        sim_score = 1 - (raw_score / max_cost)
+        if min_sim is not None and sim_score < min_sim:
+            return 0.0
+        return sim_score
+
+    def get_ins_cost(self):
+        """
+        Get insertion cost
+
+        Returns:
+            insertion cost (float)
+        """
+        return self.ins_cost
+
+    def get_del_cost(self):
+        """
+        Get deletion cost
+
+        Returns:
+            deletion cost (float)
+        """
+        return self.del_cost
+
+    def get_sub_cost(self):
+        """
+        Get substitution cost
+
+        Returns:
+            substitution cost (float)
+        """
+        return self.sub_cost
+
+    def set_ins_cost(self, ins_cost):
+        """
+        Set insertion cost
+
+        Args:
+            ins_cost (float): Cost of inserting a character
+        """
+        utils.sim_check_for_non_negative_costs(ins_cost)
+        self.ins_cost = ins_cost
+        return True
+
+    def set_del_cost(self, del_cost):
+        """
+        Set deletion cost
+
+        Args:
+            del_cost (float): Cost of deleting a character
+        """
+        utils.sim_check_for_non_negative_costs(del_cost)
+        self.del_cost = del_cost
+        return True
+
+    def set_sub_cost(self, sub_cost):
+        """
+        Set substitution cost
+
+        Args:
+            sub_cost (float): Cost of substituting one character for another
+        """
+        utils.sim_check_for_non_negative_costs(sub_cost)
+        self.sub_cost = sub_cost
+        return True
+
+    def _has_unit_costs(self):
+        return self.ins_cost == 1 and self.del_cost == 1 and self.sub_cost == 1
+
+    def _get_max_cost(self, len1, len2):
+        # cost of substituting the aligned characters (or deleting and
+        # inserting them if cheaper) and inserting or deleting the rest,
+        # which bounds the distance between any strings of these lengths.
+        aligned_cost = min(len1, len2) * min(self.sub_cost,
+                                             self.ins_cost + self.del_cost)
+        if len1 > len2:
+            return aligned_cost + (len1 - len2) * self.del_cost
+        return aligned_cost + (len2 - len1) * self.ins_cost
+
+    def _get_max_distance(self, max_len, min_sim):
+        # largest distance d such that 1 - d / max_len >= min_sim, or -1 if
+        # there is none. The estimate is corrected upwards to be robust
+        # against rounding in (1 - min_sim) * max_len.
+        if max_len == 0:
+            return 0 if min_sim <= 1 else -1
+        max_distance = int(min(max((1 - min_sim) * max_len, -1), max_len))
+        while max_distance >= 0 and 1 - (max_distance / max_len) < min_sim:
+            max_distance -= 1
+        while (max_distance < max_len and
+               1 - ((max_distance + 1) / max_len) >= min_sim):
+            max_distance += 1
+        return max_distance
@@ -3,7 +3,8 @@
 import numpy as np
 
 from py_stringmatching import utils
-from six.moves import xrange
+from py_stringmatching.similarity_measure.cython_alignment import \
+            needleman_wunsch, needleman_wunsch_align, needleman_wunsch_batch
 from py_stringmatching.similarity_measure.sequence_similarity_measure import \
                                                     SequenceSimilarityMeasure
 
@@ -12,17 +13,48 @@ def sim_ident(char1, char2):
     return int(char1 == char2)
 
 
+def _needleman_wunsch_score(string1, string2, gap_cost, sim_func, band):
+    # With the identity similarity and non negative gap costs, the common
+    # prefix and suffix of the strings are always aligned with each other,
+    # so they only add their length to the score of the rest. They are only
+    # trimmed when the scores add up exactly, as otherwise the score of the
+    # rest plus their length can differ from the whole DP in the last bits.
+    affix_score = 0
+    if (sim_func is sim_ident and gap_cost >= 0 and
+            utils.has_exact_sums([gap_cost], len(string1) + len(string2) + 2)):
+        prefix_len, suffix_len = utils.get_common_affix_lengths(string1,
+                                                                string2)
+        affix_score = prefix_len + suffix_len
+        string1 = string1[prefix_len:len(string1) - suffix_len]
+        string2 = string2[prefix_len:len(string2) - suffix_len]
+
+    # the identity similarity is computed without calling sim_ident
+    if sim_func is sim_ident:
+        sim_func = None
+    band, adaptive = utils.get_band_arguments(band)
+    return affix_score + needleman_wunsch(string1, string2, gap_cost,
+                                          sim_func, band, adaptive)
+
+
 class NeedlemanWunsch(SequenceSimilarityMeasure):
     """Needleman-Wunsch similarity measure class.
 
     Parameters:
         gap_cost (float): Cost of gap (defaults to 1.0)
-        sim_func (function): Similarity function to give a score for the correspondence between characters. Defaults
-                              to an identity function, where if two characters are same it returns 1.0 else returns 0.
+        sim_func (function or SubstitutionMatrix): Similarity function to give a score for the correspondence between
+                              characters. Defaults to an identity function, where if two characters are same it returns
+                              1.0 else returns 0. A SubstitutionMatrix is looked up without calling a Python function
+                              per pair of characters.
+        band (int or str): If an integer, only the alignments staying within band diagonals of the diagonals joining
+                           the corners of the DP table are scored, which takes O(band * n) time instead of O(n * m),
+                           and gives a lower bound of the measure. If 'adaptive', the band is doubled until the score
+                           is provably the measure. Defaults to None, where the whole DP table is computed.
     """
-    def __init__(self, gap_cost=1.0, sim_func=sim_ident):
+    def __init__(self, gap_cost=1.0, sim_func=sim_ident, band=None):
+        utils.sim_check_for_band(band)
         self.gap_cost = gap_cost
         self.sim_func = sim_func
+        self.band = band
         super(NeedlemanWunsch, self).__init__()
 
     def get_raw_score(self, string1, string2):
@@ -58,33 +90,110 @@ class NeedlemanWunsch(SequenceSimilarityMeasure):
             >>> nw = NeedlemanWunsch(gap_cost=0.5, sim_func=lambda s1, s2 : (1.0 if s1 == s2 else -1.0))
             >>> nw.get_raw_score('GCATGCUA', 'GATTACA')
             2.5
+            >>> nw = NeedlemanWunsch(band=0)
+            >>> nw.get_raw_score('abcdef', 'bcdefa')
+            0.0
+            >>> nw = NeedlemanWunsch(band='adaptive')
+            >>> nw.get_raw_score('abcdef', 'bcdefa')
+            3.0
 
         """
         # input validations
         utils.sim_check_for_none(string1, string2)
         utils.sim_check_for_string_inputs(string1, string2)
 
-        dist_mat = np.zeros((len(string1) + 1, len(string2) + 1),
-                            dtype=np.float)
+        return _needleman_wunsch_score(string1, string2, self.gap_cost,
+                                       self.sim_func, self.band)
+
+    def get_raw_scores(self, strings1, strings2, n_jobs=1):
+        """
+        Computes the Needleman-Wunsch measure between the pairs of strings of two lists, or between a string and each
+        string of a list.
+
+        The strings are turned into arrays of codes once, and the pairs are scored by the compiled kernel without
+        holding the GIL, so the work is spread over n_jobs threads of the current process. A similarity function that
+        is neither the identity nor a SubstitutionMatrix is called with the GIL held, and a band of fixed width is
+        computed pair by pair.
 
-        # DP initialization
-        for i in xrange(len(string1) + 1):
-            dist_mat[i, 0] = -(i * self.gap_cost)
+        Args:
+            strings1 (str or list): Input string, or list of input strings
+            strings2 (list): List of input strings, as long as strings1 if it is a list
+            n_jobs (int): Number of threads to use (defaults to 1). If -1 all CPUs are used, if -2 all CPUs but one,
+                          and so on.
 
-        # DP initialization
-        for j in xrange(len(string2) + 1):
-            dist_mat[0, j] = -(j * self.gap_cost)
+        Returns:
+            Needleman-Wunsch measures in the order of the pairs (NumPy array of floats)
 
-        # Needleman-Wunsch DP calculation
-        for i in xrange(1, len(string1) + 1):
-            for j in xrange(1, len(string2) + 1):
-                match = dist_mat[i - 1, j - 1] + self.sim_func(string1[i - 1],
-                                                               string2[j - 1])
-                delete = dist_mat[i - 1, j] - self.gap_cost
-                insert = dist_mat[i, j - 1] - self.gap_cost
-                dist_mat[i, j] = max(match, delete, insert)
+        Raises:
+            TypeError : If the inputs are not strings or lists of strings, or if one of the inputs is None.
+            ValueError : If the lists do not have the same length, or if n_jobs is zero.
 
-        return dist_mat[dist_mat.shape[0] - 1, dist_mat.shape[1] - 1]
+        Examples:
+            >>> nw = NeedlemanWunsch()
+            >>> nw.get_raw_scores(['dva', 'GCATGCUA'], ['deeva', 'GATTACA'])
+            array([1., 3.])
+            >>> nw.get_raw_scores('dva', ['deeva', 'dva', ''], n_jobs=-1)
+            array([ 1.,  3., -3.])
+        """
+        strings1, strings2 = utils.get_string_pairs(strings1, strings2)
+        num_threads = utils.get_num_threads(n_jobs)
+        if self.band is not None and self.band != 'adaptive':
+            if not isinstance(strings1, list):
+                strings1 = [strings1] * len(strings2)
+            return np.array([self.get_raw_score(string1, string2)
+                             for string1, string2 in zip(strings1, strings2)], dtype=np.float64)
+
+        # with the identity similarity, the common affixes are trimmed as
+        # in get_raw_score
+        trim_affixes = (self.sim_func is sim_ident and self.gap_cost >= 0 and
+                        utils.has_exact_sums([self.gap_cost],
+                                             utils.get_max_pair_length(strings1, strings2) + 2))
+        sim_func = None if self.sim_func is sim_ident else self.sim_func
+        return needleman_wunsch_batch(strings1, strings2, self.gap_cost,
+                                      sim_func, trim_affixes, num_threads)
+
+    def align(self, string1, string2):
+        """
+        Computes the Needleman-Wunsch measure between two strings, along with an alignment of the strings having that
+        score.
+
+        The alignment is found with Hirschberg's divide and conquer algorithm, which only keeps a few rows of the DP
+        table at a time instead of the whole table, so that long strings can be aligned in linear memory.
+        The band is not used: the alignment and its score are always the optimal ones over the whole DP table.
+
+        Args:
+            string1,string2 (str) : Input strings
+
+        Returns:
+            Needleman-Wunsch measure (float) and alignment (list), as a tuple. The alignment is given as opcodes, as
+            returned by difflib.SequenceMatcher.get_opcodes: (tag, i1, i2, j1, j2) tuples where tag is 'equal' or
+            'replace' if string1[i1:i2] is aligned character by character with string2[j1:j2], 'delete' if
+            string1[i1:i2] is aligned with gaps and 'insert' if string2[j1:j2] is.
+
+        Raises:
+            TypeError : If the inputs are not strings or if one of the inputs is None.
+
+        Examples:
+            >>> nw = NeedlemanWunsch()
+            >>> nw.align('dva', 'deeva')
+            (1.0, [('equal', 0, 1, 0, 1), ('insert', 1, 1, 1, 3), ('equal', 1, 3, 3, 5)])
+            >>> nw = NeedlemanWunsch(gap_cost=0.5, sim_func=lambda s1, s2 : (1.0 if s1 == s2 else -1.0))
+            >>> nw.align('GCATGCUA', 'GATTACA')
+            (2.5, [('equal', 0, 1, 0, 1), ('delete', 1, 2, 1, 1), ('equal', 2, 3, 1, 2), ('insert', 3, 3, 2, 3), ('equal', 3, 4, 3, 4), ('replace', 4, 5, 4, 5), ('equal', 5, 6, 5, 6), ('delete', 6, 7, 6, 6), ('equal', 7, 8, 6, 7)])
+        """
+        # input validations
+        utils.sim_check_for_none(string1, string2)
+        utils.sim_check_for_string_inputs(string1, string2)
+
+        # the alignment is found over the whole DP table, so its score is
+        # too, whatever the band
+        score = _needleman_wunsch_score(string1, string2, self.gap_cost,
+                                        self.sim_func, None)
+
+        # the identity similarity is computed without calling sim_ident
+        sim_func = None if self.sim_func is sim_ident else self.sim_func
+        return score, needleman_wunsch_align(string1, string2, self.gap_cost,
+                                             sim_func)
 
     def get_gap_cost(self):
         """
@@ -104,6 +213,15 @@ class NeedlemanWunsch(SequenceSimilarityMeasure):
         """
         return self.sim_func
 
+    def get_band(self):
+        """
+        Get band
+
+        Returns:
+            band (int or str)
+        """
+        return self.band
+
     def set_gap_cost(self, gap_cost):
         """
         Set gap cost
@@ -119,7 +237,20 @@ class NeedlemanWunsch(SequenceSimilarityMeasure):
         Set similarity function
 
         Args:
-            sim_func (function): Similarity function to give a score for the correspondence between characters.
+            sim_func (function or SubstitutionMatrix): Similarity function to give a score for the correspondence
+                between characters.
         """
         self.sim_func = sim_func
         return True
+
+    def set_band(self, band):
+        """
+        Set band
+
+        Args:
+            band (int or str): Number of diagonals the alignments can stray from those joining the corners of the DP
+                table, 'adaptive' or None.
+        """
+        utils.sim_check_for_band(band)
+        self.band = band
+        return True
@@ -1,10 +1,11 @@
 # coding=utf-8
 """Smith-Waterman measure"""
 
-import numpy as np
+import six
 
 from py_stringmatching import utils
-from six.moves import xrange
+from py_stringmatching.similarity_measure.cython_alignment import \
+            smith_waterman, smith_waterman_batch, SmithWatermanScanner
 from py_stringmatching.similarity_measure.sequence_similarity_measure import \
                                                     SequenceSimilarityMeasure
 
@@ -18,15 +19,17 @@ class SmithWaterman(SequenceSimilarityMeasure):
 
     Parameters:
         gap_cost (float): Cost of gap (defaults to 1.0)
-        sim_func (function): Similarity function to give a score for the correspondence between characters. Defaults
-                              to an identity function, where if two characters are same it returns 1 else returns 0.
+        sim_func (function or SubstitutionMatrix): Similarity function to give a score for the correspondence between
+                              characters. Defaults to an identity function, where if two characters are same it returns
+                              1 else returns 0. A SubstitutionMatrix is looked up without calling a Python function per
+                              pair of characters.
     """
     def __init__(self, gap_cost=1.0, sim_func=sim_ident):
         self.gap_cost = gap_cost
         self.sim_func = sim_func
         super(SmithWaterman, self).__init__()
 
-    def get_raw_score(self, string1, string2):
+    def get_raw_score(self, string1, string2, min_score=None, x_drop=None):
         """
         Computes the Smith-Waterman measure between two strings.
 
@@ -34,15 +37,24 @@ class SmithWaterman(SequenceSimilarityMeasure):
         between two strings. Instead of looking at the total sequence, the Smith–Waterman algorithm compares segments of
         all possible lengths and optimizes the similarity measure.
 
+        If min_score is given, the computation stops as soon as the best score seen reaches min_score, which is then
+        returned even if the measure is higher, or as soon as no alignment can reach min_score any more, in which case
+        0 is returned. If x_drop is given, the alignments are not extended through cells scoring more than x_drop below
+        the best score seen, and the parts of the DP table left with no such cell are skipped. The score is then a
+        lower bound of the measure, as alignments starting after one has scored more than x_drop are not looked for.
 
         Args:
             string1,string2 (str) : Input strings
+            min_score (float): Lowest score of interest (optional, defaults to None)
+            x_drop (float): Largest drop below the best score seen along an alignment (optional, defaults to None)
 
         Returns:
-            Smith-Waterman measure (float)
+            Smith-Waterman measure (float), a score of at least min_score if the measure reaches it, or 0 if it is
+            below min_score
 
         Raises:
             TypeError : If the inputs are not strings or if one of the inputs is None.
+            ValueError : If x_drop is negative.
 
         Examples:
             >>> sw = SmithWaterman()
@@ -57,25 +69,114 @@ class SmithWaterman(SequenceSimilarityMeasure):
             >>> sw = SmithWaterman(gap_cost=1.4, sim_func=lambda s1, s2 : (1.5 if s1 == s2 else 0.5))
             >>> sw.get_raw_score('GCATAGCU', 'GATTACA')
             6.5
+            >>> sw.get_raw_score('GCATAGCU', 'GATTACA', min_score=6)
+            6.0
+            >>> sw.get_raw_score('GCATAGCU', 'GATTACA', min_score=7)
+            0.0
         """
         # input validations
         utils.sim_check_for_none(string1, string2)
         utils.sim_check_for_string_inputs(string1, string2)
+        if x_drop is not None and x_drop < 0:
+            raise ValueError('x_drop should be greater than or equal to zero')
+
+        # the identity similarity is computed without calling sim_ident
+        sim_func = None if self.sim_func is sim_ident else self.sim_func
+        if min_score is None and x_drop is None:
+            return smith_waterman(string1, string2, self.gap_cost, sim_func)
+        return smith_waterman(string1, string2, self.gap_cost, sim_func,
+                              float('inf') if min_score is None else min_score,
+                              float('inf') if x_drop is None else x_drop)
+
+    def get_raw_scores(self, strings1, strings2, n_jobs=1):
+        """
+        Computes the Smith-Waterman measure between the pairs of strings of two lists, or between a string and each
+        string of a list.
+
+        The strings are turned into arrays of codes once, and the pairs are scored by the compiled kernel without
+        holding the GIL, so the work is spread over n_jobs threads of the current process. A similarity function that
+        is neither the identity nor a SubstitutionMatrix is called with the GIL held.
+
+        Args:
+            strings1 (str or list): Input string, or list of input strings
+            strings2 (list): List of input strings, as long as strings1 if it is a list
+            n_jobs (int): Number of threads to use (defaults to 1). If -1 all CPUs are used, if -2 all CPUs but one,
+                          and so on.
 
-        dist_mat = np.zeros((len(string1) + 1, len(string2) + 1),
-                            dtype=np.float)
-        max_value = 0
-        # Smith Waterman DP calculations
-        for i in xrange(1, len(string1) + 1):
-            for j in xrange(1, len(string2) + 1):
-                match = dist_mat[i - 1, j - 1] + self.sim_func(string1[i - 1],
-                                                               string2[j - 1])
-                delete = dist_mat[i - 1, j] - self.gap_cost
-                insert = dist_mat[i, j - 1] - self.gap_cost
-                dist_mat[i, j] = max(0, match, delete, insert)
-                max_value = max(max_value, dist_mat[i, j])
-
-        return max_value
+        Returns:
+            Smith-Waterman measures in the order of the pairs (NumPy array of floats)
+
+        Raises:
+            TypeError : If the inputs are not strings or lists of strings, or if one of the inputs is None.
+            ValueError : If the lists do not have the same length, or if n_jobs is zero.
+
+        Examples:
+            >>> sw = SmithWaterman()
+            >>> sw.get_raw_scores(['cat', 'dva'], ['hat', 'deeve'])
+            array([2., 1.])
+            >>> sw.get_raw_scores('cat', ['hat', 'cat', ''], n_jobs=-1)
+            array([2., 3., 0.])
+        """
+        strings1, strings2 = utils.get_string_pairs(strings1, strings2)
+        sim_func = None if self.sim_func is sim_ident else self.sim_func
+        return smith_waterman_batch(strings1, strings2, self.gap_cost,
+                                    sim_func, utils.get_num_threads(n_jobs))
+
+    def scan(self, pattern, text, min_score):
+        """
+        Finds where a pattern approximately occurs in a long text, by Smith-Waterman local alignment.
+
+        The text is read one chunk at a time, and a single column of the DP table along the pattern is kept, instead of
+        the whole table, so that texts of any length can be scanned, for instance from a file. Many patterns can be
+        searched in one pass over the text.
+
+        Args:
+            pattern (str or list): Pattern, or list of patterns
+            text (str or iterable): Text, or iterable of the successive chunks of the text (such as a file)
+            min_score (float): Least score of the reported alignments
+
+        Returns:
+            Generator of the (end, score) tuples of the positions of the text where the best local alignment of the
+            pattern ending there has a score of at least min_score, in the order of the text. end is the number of
+            characters of the text up to the end of the alignment, so that the alignment ends text[:end]. If a list of
+            patterns is given, (pattern index, end, score) tuples are generated, by end and then by pattern. The
+            largest score of a pattern is its Smith-Waterman measure against the text.
+
+        Raises:
+            TypeError : If the patterns or the chunks of the text are not strings or if one of the inputs is None.
+            ValueError : If min_score is not greater than zero.
+
+        Examples:
+            >>> sw = SmithWaterman()
+            >>> list(sw.scan('cat', 'the cat and the hat', 2))
+            [(6, 2.0), (7, 3.0), (8, 2.0), (19, 2.0)]
+            >>> list(sw.scan(['cat', 'and'], ['the cat ', 'and the hat'], 3))
+            [(0, 7, 3.0), (1, 11, 3.0)]
+        """
+        # input validations
+        utils.sim_check_for_none(pattern, text)
+        if isinstance(pattern, six.string_types):
+            patterns = [pattern]
+        else:
+            patterns = list(pattern)
+            utils.tok_check_for_string_input(*patterns)
+        if min_score <= 0:
+            raise ValueError('min_score should be greater than zero')
+        if isinstance(text, six.string_types):
+            text = [text]
+
+        # the identity similarity is computed without calling sim_ident
+        sim_func = None if self.sim_func is sim_ident else self.sim_func
+        scanner = SmithWatermanScanner(patterns, self.gap_cost, min_score,
+                                       sim_func)
+        return self._scan(scanner, text,
+                          isinstance(pattern, six.string_types))
+
+    def _scan(self, scanner, text, single_pattern):
+        for chunk in text:
+            utils.tok_check_for_string_input(chunk)
+            for index, end, score in scanner.feed(chunk):
+                yield (end, score) if single_pattern else (index, end, score)
 
     def get_gap_cost(self):
         """
@@ -110,7 +211,8 @@ class SmithWaterman(SequenceSimilarityMeasure):
         Set similarity function
 
         Args:
-            sim_func (function): Similarity function to give a score for the correspondence between characters.
+            sim_func (function or SubstitutionMatrix): Similarity function to give a score for the correspondence
+                between characters.
         """
         self.sim_func = sim_func
         return True
@@ -91,10 +91,14 @@ class SoftTfIdf(HybridSimilarityMeasure):
         # calculating the term sim score against the input string 2,
         # construct similarity map
         similarity_map = {}
+        # scores at or below the threshold are discarded, so the secondary
+        # function may skip the pairs that cannot reach it
+        sim_func = utils.get_sim_func_with_min_score(self.sim_func,
+                                                     self.threshold)
         for term_x in tf_x:
             max_score = 0.0
             for term_y in tf_y:
-                score = self.sim_func(term_x, term_y)
+                score = sim_func(term_x, term_y)
                 # adding sim only if it is above threshold and
                 # highest for this element
                 if score > self.threshold and score > max_score:
@@ -0,0 +1,159 @@
+"""Substitution matrix"""
+
+import functools
+
+import numpy as np
+import six
+
+
+def sim_ident(char1, char2):
+    return int(char1 == char2)
+
+
+def _identity_score(match_score, mismatch_score, char1, char2):
+    return match_score if char1 == char2 else mismatch_score
+
+
+class SubstitutionMatrix(object):
+    """Dense table of the similarity scores between the characters of an alphabet.
+
+    A substitution matrix can be given as sim_func to NeedlemanWunsch, SmithWaterman and Affine. The scores of the
+    characters of the alphabet are then read from the table by the compiled alignment loops, instead of calling a Python
+    function for every cell of the DP table. The scores of the characters outside of the alphabet are computed by a
+    fallback similarity function. A substitution matrix can also be called like a similarity function.
+
+    Parameters:
+        alphabet (str or iterable): Characters of the alphabet, without duplicates
+        table (array-like): Square table whose (i, j) entry is the score of the i-th character of the alphabet
+                            against the j-th one
+        sim_func (function): Similarity function used for the characters outside of the alphabet (defaults to an
+                             identity function, where if two characters are same it returns 1 else returns 0)
+
+    Raises:
+        TypeError : If a character of the alphabet is not a string of length one
+        ValueError : If the alphabet has duplicates or the table does not match the alphabet
+    """
+    def __init__(self, alphabet, table, sim_func=sim_ident):
+        alphabet = list(alphabet)
+        for char in alphabet:
+            if not isinstance(char, six.string_types) or len(char) != 1:
+                raise TypeError('Alphabet should only contain single characters')
+        alphabet = ''.join(alphabet)
+        char_index = dict((char, i) for i, char in enumerate(alphabet))
+        if len(char_index) != len(alphabet):
+            raise ValueError('Alphabet should not have duplicate characters')
+        table = np.ascontiguousarray(table, dtype=np.float64)
+        if table.shape != (len(alphabet), len(alphabet)):
+            raise ValueError('Table should be a square matrix with one row per character of the alphabet')
+
+        self.alphabet = alphabet
+        self.table = table
+        self.sim_func = sim_func
+        self._char_index = char_index
+
+    @classmethod
+    def from_dict(cls, scores, sim_func=sim_ident):
+        """
+        Builds a substitution matrix from a dictionary of scores.
+
+        The alphabet is made of the characters appearing in the keys of the dictionary, in sorted order. The pairs of
+        characters of the alphabet that are missing from the dictionary are scored with sim_func.
+
+        Args:
+            scores (dict): Scores keyed by (char1, char2) tuples
+            sim_func (function): Similarity function used for the missing pairs and for the characters outside of
+                                 the alphabet (defaults to identity)
+
+        Returns:
+            Substitution matrix (SubstitutionMatrix)
+
+        Examples:
+            >>> sm = SubstitutionMatrix.from_dict({('a', 'a'): 2, ('a', 'e'): 1, ('e', 'a'): 1, ('e', 'e'): 2})
+            >>> sm('a', 'e')
+            1.0
+            >>> sm('b', 'b')
+            1
+        """
+        alphabet = sorted(set(char for pair in scores for char in pair))
+        table = [[scores[(char1, char2)] if (char1, char2) in scores else sim_func(char1, char2)
+                  for char2 in alphabet]
+                 for char1 in alphabet]
+        return cls(alphabet, table, sim_func)
+
+    @classmethod
+    def from_function(cls, alphabet, sim_func):
+        """
+        Builds a substitution matrix by evaluating a similarity function once on every pair of characters of an
+        alphabet.
+
+        Args:
+            alphabet (str or iterable): Characters of the alphabet
+            sim_func (function): Similarity function, also used for the characters outside of the alphabet
+
+        Returns:
+            Substitution matrix (SubstitutionMatrix)
+
+        Examples:
+            >>> sm = SubstitutionMatrix.from_function('ACGT', lambda s1, s2: (2 if s1 == s2 else -1))
+            >>> sm('A', 'C')
+            -1.0
+        """
+        alphabet = list(alphabet)
+        table = [[sim_func(char1, char2) for char2 in alphabet]
+                 for char1 in alphabet]
+        return cls(alphabet, table, sim_func)
+
+    @classmethod
+    def identity(cls, alphabet, match_score=1, mismatch_score=0):
+        """
+        Builds a substitution matrix scoring equal characters with match_score and different ones with
+        mismatch_score, inside and outside of the alphabet.
+
+        Args:
+            alphabet (str or iterable): Characters of the alphabet
+            match_score (float): Score of two equal characters (defaults to 1)
+            mismatch_score (float): Score of two different characters (defaults to 0)
+
+        Returns:
+            Substitution matrix (SubstitutionMatrix)
+
+        Examples:
+            >>> sm = SubstitutionMatrix.identity('ACGT', 2, -1)
+            >>> sm('A', 'A'), sm('A', 'N')
+            (2.0, -1)
+        """
+        return cls.from_function(alphabet, functools.partial(_identity_score, match_score, mismatch_score))
+
+    def __call__(self, char1, char2):
+        index1 = self._char_index.get(char1)
+        index2 = self._char_index.get(char2)
+        if index1 is None or index2 is None:
+            return self.sim_func(char1, char2)
+        return float(self.table[index1, index2])
+
+    def get_alphabet(self):
+        """
+        Get alphabet
+
+        Returns:
+            alphabet (str)
+        """
+        return self.alphabet
+
+    def get_table(self):
+        """
+        Get table of scores
+
+        Returns:
+            table of scores (numpy array)
+        """
+        return self.table
+
+    def get_sim_func(self):
+        """
+        Get fallback similarity function
+
+        Returns:
+            similarity function (function)
+        """
+        return self.sim_func
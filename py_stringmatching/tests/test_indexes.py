@@ -0,0 +1,254 @@
+from __future__ import unicode_literals
+
+import pickle
+import random
+import unittest
+from nose.tools import *
+
+from py_stringmatching.index.bk_tree import BKTree
+from py_stringmatching.index.trie import Trie
+from py_stringmatching.similarity_measure.levenshtein import Levenshtein
+
+
+class BKTreeTestCases(unittest.TestCase):
+    def setUp(self):
+        self.words = ['book', 'books', 'cake', 'boo', 'cape', 'boon', 'cook',
+                      'cart', '', 'b', 'boék']
+        self.tree = BKTree().build(self.words)
+        self.lev = Levenshtein()
+
+    def brute_force(self, string, max_distance, measure=None):
+        measure = self.lev if measure is None else measure
+        matches = [(word, measure.get_raw_score(string, word))
+                   for word in set(self.words)]
+        matches = [match for match in matches if match[1] <= max_distance]
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+    def test_build_and_insert(self):
+        self.assertEqual(len(self.tree), len(self.words))
+        self.assertEqual(self.tree.insert('book'), False)
+        self.assertEqual(self.tree.insert('bookie'), True)
+        self.assertEqual(len(self.tree), len(self.words) + 1)
+        self.assertEqual(len(BKTree()), 0)
+        self.assertEqual(len(BKTree().build(['a', 'a', 'b'])), 2)
+
+    def test_query(self):
+        self.assertEqual(self.tree.query('bo', 2)[:3],
+                         [('b', 1), ('boo', 1), ('', 2)])
+        self.assertEqual(self.tree.query('cope', 1), [('cape', 1)])
+        self.assertEqual(self.tree.query('book', 0), [('book', 0)])
+        self.assertEqual(self.tree.query('xyz', 1), [])
+        self.assertEqual(BKTree().query('book', 2), [])
+        for string in ['bo', 'cook', 'xyz', '', 'boeks', 'carts']:
+            for max_distance in [0, 1, 2, 3, 10]:
+                self.assertEqual(self.tree.query(string, max_distance),
+                                 self.brute_force(string, max_distance))
+
+    def test_query_random(self):
+        rand = random.Random(7)
+        self.words = [''.join(rand.choice('abc')
+                              for _ in range(rand.randint(0, 8)))
+                      for _ in range(200)]
+        tree = BKTree().build(self.words)
+        for _ in range(50):
+            string = ''.join(rand.choice('abcd')
+                             for _ in range(rand.randint(0, 8)))
+            max_distance = rand.randint(0, 4)
+            self.assertEqual(tree.query(string, max_distance),
+                             self.brute_force(string, max_distance))
+
+    def test_query_weighted(self):
+        measure = Levenshtein(ins_cost=2, del_cost=2, sub_cost=3)
+        tree = BKTree(measure).build(self.words)
+        for string in ['bo', 'cook', 'boeks']:
+            for max_distance in [0, 2, 3.5, 6]:
+                self.assertEqual(tree.query(string, max_distance),
+                                 self.brute_force(string, max_distance,
+                                                  measure))
+
+    def test_query_inexact_costs(self):
+        # the sums of these costs are not exact, so the distances of the
+        # tree are only a triangle inequality up to their last bits
+        for measure in [Levenshtein(0.3, 0.3, 0.7), Levenshtein(0.1, 0.1, 0.3), Levenshtein(0.3, 0.3, 0.3)]:
+            rand = random.Random(3)
+            self.words = list(set(''.join(rand.choice('abc') for _ in range(rand.randint(0, 9)))
+                                  for _ in range(200)))
+            tree = BKTree(measure).build(self.words)
+            for _ in range(30):
+                string = ''.join(rand.choice('abcd') for _ in range(rand.randint(0, 9)))
+                for word in rand.sample(self.words, 10):
+                    max_distance = measure.get_raw_score(string, word)
+                    self.assertEqual(tree.query(string, max_distance),
+                                     self.brute_force(string, max_distance, measure))
+                self.assertEqual([match[1] for match in tree.nearest(string, 3)],
+                                 [match[1] for match in self.brute_force(string, float('inf'), measure)[:3]])
+        tree = BKTree(Levenshtein(0.3, 0.3, 0.7)).build(['a', 'cacaab', 'acaaba'])
+        self.assertIn(('a', 1.7999999999999998), tree.query('cacaaba', 1.7999999999999998))
+
+    def test_query_zero_cost(self):
+        # different strings at distance zero are all kept
+        measure = Levenshtein(sub_cost=0)
+        tree = BKTree(measure).build(['a', 'b', 'c', 'b'])
+        self.assertEqual(len(tree), 3)
+        self.assertEqual(tree.insert('c'), False)
+        self.assertEqual(tree.query('b', 0), [('a', 0), ('b', 0), ('c', 0)])
+        tree = BKTree(measure).build(self.words)
+        for string in ['bo', 'cook', 'boeks']:
+            for max_distance in [0, 1, 2]:
+                self.assertEqual(tree.query(string, max_distance),
+                                 self.brute_force(string, max_distance,
+                                                  measure))
+            self.assertEqual([match[1] for match in tree.nearest(string, 3)],
+                             [match[1] for match in
+                              self.brute_force(string, 100, measure)[:3]])
+
+    def test_nearest(self):
+        self.assertEqual(self.tree.nearest('bool'), [('book', 1)])
+        self.assertEqual(self.tree.nearest('cakes', 2),
+                         [('cake', 1), ('cape', 2)])
+        self.assertEqual(len(self.tree.nearest('bo', 100)), len(self.words))
+        self.assertEqual(BKTree().nearest('book', 3), [])
+        for string in ['bo', 'cook', 'xyz', '', 'boeks', 'carts']:
+            for k in [1, 2, 5]:
+                distances = [match[1] for match in self.tree.nearest(string, k)]
+                expected = [match[1]
+                            for match in self.brute_force(string, 100)[:k]]
+                self.assertEqual(distances, expected)
+
+    def test_pickle(self):
+        tree = pickle.loads(pickle.dumps(self.tree))
+        self.assertEqual(len(tree), len(self.tree))
+        self.assertEqual(tree.query('bo', 2), self.tree.query('bo', 2))
+        self.assertEqual(tree.insert('bookie'), True)
+
+    def test_get_measure(self):
+        self.assertIsInstance(self.tree.get_measure(), Levenshtein)
+
+    @raises(ValueError)
+    def test_invalid_measure(self):
+        BKTree(Levenshtein(ins_cost=1, del_cost=2))
+
+    @raises(TypeError)
+    def test_insert_invalid1(self):
+        self.tree.insert(None)
+
+    @raises(TypeError)
+    def test_insert_invalid2(self):
+        self.tree.build(['book', 1])
+
+    @raises(TypeError)
+    def test_query_invalid1(self):
+        self.tree.query(None, 1)
+
+    @raises(ValueError)
+    def test_query_invalid2(self):
+        self.tree.query('book', -1)
+
+    @raises(ValueError)
+    def test_nearest_invalid(self):
+        self.tree.nearest('book', 0)
+
+
+class TrieTestCases(unittest.TestCase):
+    def setUp(self):
+        self.words = ['book', 'books', 'cake', 'boo', 'cape', 'boon', 'cook',
+                      'cart', '', 'b', 'boék', 'bo\U0001F600k']
+        self.trie = Trie().build(self.words)
+        self.lev = Levenshtein()
+
+    def brute_force(self, string, max_distance, measure=None):
+        measure = self.lev if measure is None else measure
+        matches = [(word, measure.get_raw_score(string, word))
+                   for word in set(self.words)]
+        matches = [match for match in matches if match[1] <= max_distance]
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+    def test_build_and_insert(self):
+        self.assertEqual(len(self.trie), len(self.words))
+        self.assertEqual(self.trie.insert('book'), False)
+        self.assertEqual(self.trie.insert('bookie'), True)
+        self.assertEqual(len(self.trie), len(self.words) + 1)
+        self.assertEqual(len(Trie()), 0)
+        self.assertEqual(len(Trie().build(['a', 'a', 'b'])), 2)
+
+    def test_contains(self):
+        self.assertTrue('book' in self.trie)
+        self.assertTrue('' in self.trie)
+        self.assertFalse('bo' in self.trie)
+        self.assertFalse('bookie' in self.trie)
+        self.assertFalse('' in Trie())
+
+    def test_query(self):
+        self.assertEqual(self.trie.query('bo', 1), [('b', 1), ('boo', 1)])
+        self.assertEqual(self.trie.query('cope', 1), [('cape', 1)])
+        self.assertEqual(self.trie.query('book', 0), [('book', 0)])
+        self.assertEqual(self.trie.query('xyz', 1), [])
+        self.assertEqual(Trie().query('book', 2), [])
+        for string in ['bo', 'cook', 'xyz', '', 'boeks', 'carts', 'bo\U0001F600']:
+            for max_distance in [0, 1, 2, 3, 10]:
+                self.assertEqual(self.trie.query(string, max_distance),
+                                 self.brute_force(string, max_distance))
+
+    def test_query_random(self):
+        rand = random.Random(7)
+        self.words = [''.join(rand.choice('abc')
+                              for _ in range(rand.randint(0, 8)))
+                      for _ in range(200)]
+        trie = Trie().build(self.words)
+        for _ in range(50):
+            string = ''.join(rand.choice('abcd')
+                             for _ in range(rand.randint(0, 8)))
+            max_distance = rand.randint(0, 4)
+            self.assertEqual(trie.query(string, max_distance),
+                             self.brute_force(string, max_distance))
+
+    def test_query_weighted(self):
+        measure = Levenshtein(ins_cost=1, del_cost=2, sub_cost=1.5)
+        trie = Trie(measure).build(self.words)
+        for string in ['bo', 'cook', 'boeks', '']:
+            for max_distance in [0, 2, 3.5, 6]:
+                self.assertEqual(trie.query(string, max_distance),
+                                 self.brute_force(string, max_distance,
+                                                  measure))
+
+    def test_query_inexact_costs(self):
+        # the rows of the trie add the costs in another order than
+        # get_raw_score, whose distances are the ones of the matches
+        for measure in [Levenshtein(0.3, 0.3, 0.7), Levenshtein(0.1, 0.1, 0.3), Levenshtein(0.3, 0.3, 0.3)]:
+            rand = random.Random(3)
+            self.words = list(set(''.join(rand.choice('abc') for _ in range(rand.randint(0, 9)))
+                                  for _ in range(200)))
+            trie = Trie(measure).build(self.words)
+            for _ in range(30):
+                string = ''.join(rand.choice('abcd') for _ in range(rand.randint(0, 9)))
+                for word in rand.sample(self.words, 10):
+                    max_distance = measure.get_raw_score(string, word)
+                    self.assertEqual(trie.query(string, max_distance),
+                                     self.brute_force(string, max_distance, measure))
+        trie = Trie(Levenshtein(0.3, 0.3, 0.7)).build(['a', 'cacaab', 'acaaba'])
+        self.assertIn(('a', 1.7999999999999998), trie.query('cacaaba', 1.7999999999999998))
+
+    def test_pickle(self):
+        trie = pickle.loads(pickle.dumps(self.trie))
+        self.assertEqual(len(trie), len(self.trie))
+        self.assertEqual(trie.query('bo', 2), self.trie.query('bo', 2))
+        self.assertEqual(trie.insert('bookie'), True)
+
+    def test_get_measure(self):
+        self.assertIsInstance(self.trie.get_measure(), Levenshtein)
+
+    @raises(TypeError)
+    def test_insert_invalid1(self):
+        self.trie.insert(None)
+
+    @raises(TypeError)
+    def test_insert_invalid2(self):
+        self.trie.build(['book', 1])
+
+    @raises(TypeError)
+    def test_query_invalid1(self):
+        self.trie.query(None, 1)
+
+    @raises(ValueError)
+    def test_query_invalid2(self):
+        self.trie.query('book', -1)
@@ -3,12 +3,15 @@ from __future__ import unicode_literals
 import math
 import unittest
 
+import six
+
 from nose.tools import *
 
 
 # sequence based similarity measures
 from py_stringmatching.similarity_measure.affine import Affine
 from py_stringmatching.similarity_measure.bag_distance import BagDistance
+from py_stringmatching.similarity_measure.damerau_levenshtein import DamerauLevenshtein
 from py_stringmatching.similarity_measure.editex import Editex
 from py_stringmatching.similarity_measure.hamming_distance import HammingDistance
 from py_stringmatching.similarity_measure.jaro import Jaro
@@ -16,6 +19,8 @@ from py_stringmatching.similarity_measure.jaro_winkler import JaroWinkler
 from py_stringmatching.similarity_measure.levenshtein import Levenshtein
 from py_stringmatching.similarity_measure.needleman_wunsch import NeedlemanWunsch
 from py_stringmatching.similarity_measure.smith_waterman import SmithWaterman
+from py_stringmatching.similarity_measure.cython_alignment import SmithWatermanScanner
+from py_stringmatching.similarity_measure.substitution_matrix import SubstitutionMatrix
 # token based similarity measures
 from py_stringmatching.similarity_measure.cosine import Cosine
 from py_stringmatching.similarity_measure.dice import Dice
@@ -49,6 +54,78 @@ class AffineTestCases(unittest.TestCase):
         self.assertAlmostEqual(self.affine_with_params2.get_raw_score(' ', ' '), 1)
         self.assertEqual(self.affine.get_raw_score('', 'deeva'), 0)
 
+    def test_valid_input_common_affixes(self):
+        self.assertAlmostEqual(self.affine.get_raw_score('Acme Corporation Ltd', 'Acme Corporation Ltd.'), 19.0)
+        self.assertAlmostEqual(self.affine.get_raw_score('prefix-dva-suffix', 'prefix-deeva-suffix'), 15.5)
+        self.assertAlmostEqual(self.affine.get_raw_score('abcabc', 'abc'), 1.0)
+        self.assertAlmostEqual(self.affine.get_raw_score('abc', 'abc'), 3.0)
+        self.assertAlmostEqual(self.affine_with_params1.get_raw_score('abcabc', 'abc'), 0.0)
+        # a gap continuation costlier than a gap start can make it worth
+        # splitting a gap around a common prefix
+        self.assertAlmostEqual(Affine(gap_start=0.5, gap_continuation=1).get_raw_score('babh', 'b'), -1.0)
+        # costs whose sums are not exact are scored over the whole DP
+        # tables, as the identity given as a lambda function is
+        aff = Affine(gap_start=2.2, gap_continuation=0.3)
+        aff_lambda = Affine(gap_start=2.2, gap_continuation=0.3, sim_func=lambda s1, s2: int(s1 == s2))
+        for string1, string2 in [('aabbbaaab', 'a'), ('a', 'aabaabaababbabaa'), ('aa', 'aabaaabaaabaaaaaa')]:
+            self.assertEqual(aff.get_raw_score(string1, string2), aff_lambda.get_raw_score(string1, string2))
+            self.assertEqual(list(aff.get_raw_scores([string1], [string2])),
+                             [aff_lambda.get_raw_score(string1, string2)])
+
+    def test_valid_input_compiled(self):
+        self.assertAlmostEqual(self.affine.get_raw_score('d𝄞a', 'de𝄞𝄞va'), 0.5)
+        self.assertAlmostEqual(self.affine.get_raw_score('GATTACA' * 20, 'GCATGCU' * 25), 47.5)
+        # the characters are passed to sim_func in the order of the strings,
+        # whichever is the longer one
+        af = Affine(gap_continuation=0.25,
+                    sim_func=lambda s1, s2: 2 if s1 == s2 else (1 if s1 < s2 else -1))
+        self.assertAlmostEqual(af.get_raw_score('acb', 'bcaddb'), 3.5)
+        self.assertAlmostEqual(af.get_raw_score('bcaddb', 'acb'), 1.5)
+
+    def test_valid_input_substitution_matrix(self):
+        sm = SubstitutionMatrix.from_dict({('a', 'a'): 2, ('a', 'e'): 1.5, ('e', 'a'): -1, ('e', 'e'): 2})
+        af = Affine(sim_func=sm)
+        self.assertEqual(af.get_raw_score('a', 'ex'), 0.5)
+        self.assertEqual(af.get_raw_score('ex', 'a'), -1.0)
+        self.assertEqual(af.get_raw_score('dva', 'deeva'), 2.5)
+        sm = SubstitutionMatrix.from_function('AGTC', self.sim_func)
+        self.assertAlmostEqual(Affine(gap_continuation=0.2, sim_func=sm).get_raw_score('AAAGAATTCA', 'AAATCA'), 4.4)
+
+    def test_valid_input_band(self):
+        # alignments leaving the band are not scored, unless the band is
+        # adaptive
+        string1 = 'GATTACA' * 12
+        string2 = 'GCATGCT' * 10
+        self.assertEqual(Affine(band=0).get_raw_score('abcdef', 'bcdefa'), 0.0)
+        self.assertEqual(Affine(band=1).get_raw_score('abcdef', 'bcdefa'), 3.0)
+        self.assertEqual(Affine(band='adaptive').get_raw_score('abcdef', 'bcdefa'), 3.0)
+        for band in [0, 4, 200, 'adaptive']:
+            self.assertEqual(Affine(band=band).get_raw_score(string1, string2), 25.0)
+            self.assertEqual(Affine(gap_continuation=0.2, sim_func=self.sim_func, band=band).get_raw_score(
+                string1, string2), self.affine_with_params2.get_raw_score(string1, string2))
+
+    def test_valid_input_raw_scores(self):
+        # the scores are those of get_raw_score, pair by pair
+        dna = SubstitutionMatrix.identity('ACGT', 2, -1)
+        strings1 = ['dva', 'AAAGAATTCA', '', 'd𝄞a', 'GATTACA' * 12, 'GCATGCNA']
+        strings2 = ['deeva', 'AAATCA', 'abc', 'de𝄞𝄞va', 'GCATGCT' * 10, 'GATTACA']
+        for af in [self.affine, self.affine_with_params1, self.affine_with_params2, Affine(sim_func=dna),
+                   Affine(band=1), Affine(band='adaptive')]:
+            expected = [af.get_raw_score(string1, string2) for string1, string2 in zip(strings1, strings2)]
+            self.assertEqual(list(af.get_raw_scores(strings1, strings2)), expected)
+            self.assertEqual(list(af.get_raw_scores(strings1, strings2, n_jobs=-1)), expected)
+            self.assertEqual(list(af.get_raw_scores('dva', strings2)),
+                             [af.get_raw_score('dva', string2) for string2 in strings2])
+        self.assertEqual(len(self.affine.get_raw_scores([], [])), 0)
+
+    @raises(TypeError)
+    def test_invalid_input1_raw_scores(self):
+        self.affine.get_raw_scores(['dva', None], ['deeva', 'dva'])
+
+    @raises(ValueError)
+    def test_invalid_input2_raw_scores(self):
+        self.affine.get_raw_scores(['dva', 'deeva'], ['dva'])
+
     def test_get_gap_start(self):
         self.assertEqual(self.affine_with_params1.get_gap_start(), 2)
 
@@ -84,6 +161,18 @@ class AffineTestCases(unittest.TestCase):
         self.assertEqual(af.get_sim_func(), fn2)
         self.assertAlmostEqual(af.get_raw_score('dva', 'deeva'), 4.5)
 
+    def test_set_band(self):
+        af = Affine(band=0)
+        self.assertEqual(af.get_band(), 0)
+        self.assertEqual(af.get_raw_score('abcdef', 'bcdefa'), 0.0)
+        self.assertEqual(af.set_band('adaptive'), True)
+        self.assertEqual(af.get_band(), 'adaptive')
+        self.assertEqual(af.get_raw_score('abcdef', 'bcdefa'), 3.0)
+
+    @raises(ValueError)
+    def test_invalid_band(self):
+        Affine(band=-1)
+
     @raises(TypeError)
     def test_invalid_input1_raw_score(self):
         self.affine.get_raw_score(None, 'MARHTA')
@@ -287,6 +376,13 @@ class EditexTestCases(unittest.TestCase):
         self.assertEqual(self.ed.get_raw_score('', ''), 0)
         self.assertEqual(self.ed.get_raw_score('', 'MARTHA'), 12)
         self.assertEqual(self.ed.get_raw_score('MARTHA', ''), 12)
+        self.assertEqual(self.ed.get_raw_score('Martha', 'MARTHA'), 0)
+        self.assertEqual(self.ed.get_raw_score('école', 'ÉCOLE'), 0)
+        self.assertEqual(self.ed_with_params1.get_raw_score('Martha', 'MARTHA'), 12)
+        self.assertEqual(self.ed.get_raw_score('MART\U0001F600', 'MARTA'), 2)
+        self.assertEqual(self.ed.get_raw_score('MARЖHA', 'MARЯHA'), 2)
+        self.assertEqual(Editex(group_cost=1.5, mismatch_cost=2.5).get_raw_score('ALIE', 'ALIF'), 2)
+        self.assertEqual(Editex(group_cost=1.5, mismatch_cost=2.5).get_raw_score('MARTHA', 'MARHTA'), 3)
 
     def test_valid_input_sim_score(self):
         self.assertEqual(self.ed.get_sim_score('MARTHA', 'MARTHA'), 1.0)
@@ -366,6 +462,85 @@ class JaroTestCases(unittest.TestCase):
         self.assertAlmostEqual(self.jaro.get_raw_score('DIXON', 'DICKSONX'),
                                0.7666666666666666)
         self.assertEqual(self.jaro.get_raw_score('', 'deeva'), 0)
+        self.assertEqual(self.jaro.get_raw_score('', ''), 0)
+        self.assertEqual(self.jaro.get_raw_score('a', 'a'), 1.0)
+        self.assertEqual(self.jaro.get_raw_score('ab', 'ba'), 0)
+
+    def test_valid_input_unicode_raw_score(self):
+        self.assertAlmostEqual(self.jaro.get_raw_score('café', 'cafe'),
+                               0.8333333333333334)
+        self.assertAlmostEqual(self.jaro.get_raw_score('MÄRTHA', 'MÄRHTA'),
+                               0.9444444444444445)
+        self.assertAlmostEqual(self.jaro.get_raw_score('𝄞MARTHA', '𝄞MARHTA'),
+                               0.9523809523809524)
+
+    def test_valid_input_min_score_raw_score(self):
+        self.assertAlmostEqual(self.jaro.get_raw_score('MARTHA', 'MARHTA', min_score=0.9),
+                               0.9444444444444445)
+        self.assertEqual(self.jaro.get_raw_score('MARTHA', 'MARHTA', min_score=0.95), 0)
+        self.assertEqual(self.jaro.get_raw_score('DIXON', 'DICKSONX', min_score=0.8), 0)
+        # rejected by the length bound alone
+        self.assertEqual(self.jaro.get_raw_score('AB', 'ABCDEFGHIJ', min_score=0.75), 0)
+        self.assertAlmostEqual(self.jaro.get_raw_score('AB', 'ABCDEFGHIJ', min_score=0.7),
+                               0.7333333333333334)
+        self.assertEqual(self.jaro.get_raw_score('', 'deeva', min_score=0.5), 0)
+        self.assertEqual(self.jaro.get_raw_score('a', 'a', min_score=1.0), 1.0)
+
+    def test_valid_input_top_k(self):
+        candidates = ['MARHTA', 'MARTA', 'ARTHUR', 'MARTHA', '', 'DWAYNE', 'MARTHAS']
+        scores = [self.jaro.get_raw_score('MARTHA', candidate) for candidate in candidates]
+        indices, top_scores = self.jaro.top_k('MARTHA', candidates, 3)
+        self.assertEqual(list(indices), [3, 6, 0])
+        self.assertEqual(list(top_scores), [scores[3], scores[6], scores[0]])
+        indices, top_scores = self.jaro.top_k('MARTHA', candidates, 100)
+        self.assertEqual(list(indices), sorted(range(len(candidates)),
+                                               key=lambda i: (-scores[i], i)))
+        indices, top_scores = self.jaro.top_k('MARTHA', [], 3)
+        self.assertEqual(len(indices), 0)
+        self.assertEqual(len(top_scores), 0)
+        indices, top_scores = self.jaro.top_k('', ['a', 'b'], 1)
+        self.assertEqual(list(indices), [0])
+        self.assertEqual(list(top_scores), [0])
+
+    @raises(ValueError)
+    def test_invalid_input_top_k1(self):
+        self.jaro.top_k('MARTHA', ['MARHTA'], 0)
+
+    @raises(TypeError)
+    def test_invalid_input_top_k2(self):
+        self.jaro.top_k('MARTHA', ['MARHTA', None], 1)
+
+    def test_valid_input_word_boundary_raw_score(self):
+        # inputs around the 64 character limit of the bit-parallel kernel
+        self.assertAlmostEqual(self.jaro.get_raw_score('a' * 64, 'a' * 63 + 'b'),
+                               0.9895833333333334)
+        self.assertAlmostEqual(self.jaro.get_raw_score('ab' * 32, 'ba' * 32),
+                               0.8333333333333334)
+        self.assertAlmostEqual(self.jaro.get_raw_score('ab' * 32 + 'a', 'ba' * 32),
+                               0.8282051282051283)
+        self.assertAlmostEqual(self.jaro.get_raw_score('x' + 'abcdefgh' * 8, 'abcdefgh' * 8),
+                               0.9948717948717949)
+        self.assertAlmostEqual(self.jaro.get_raw_score('𝄞' + 'abc' * 21, 'abc' * 21 + '𝄞'),
+                               0.9895833333333334)
+
+    def test_valid_input_long_strings_raw_score(self):
+        # flags of strings over 1024 characters do not fit on the stack
+        self.assertAlmostEqual(self.jaro.get_raw_score('abc' * 400, 'bca' * 400),
+                               0.8333333333333334)
+        self.assertAlmostEqual(self.jaro.get_raw_score('a' * 1500, 'a' * 1000 + 'b' * 500),
+                               0.7777777777777777)
+        self.assertAlmostEqual(self.jaro.get_raw_score('abcdef' * 200, 'fedcba' * 210),
+                               0.8174603174603176)
+
+    def test_valid_input_long_texts_raw_score(self):
+        # occurrences left behind by the search window, and characters of
+        # string1 missing from string2
+        self.assertEqual(self.jaro.get_raw_score('x' * 300 + 'ab' * 200, 'ab' * 200 + 'x' * 300),
+                         0.7847619047619047)
+        self.assertEqual(self.jaro.get_raw_score('é𝄞z' * 150, '𝄞é' * 200),
+                         0.6388888888888888)
+        self.assertEqual(self.jaro.get_raw_score('the quick brown fox ' * 50, 'the quick brown dog ' * 50),
+                         0.9333333333333332)
 
     def test_valid_input_sim_score(self):
         self.assertAlmostEqual(self.jaro.get_sim_score('MARTHA', 'MARHTA'),
@@ -440,6 +615,47 @@ class JaroWinklerTestCases(unittest.TestCase):
         self.assertEqual(jw.get_prefix_weight(), 0.25)
         self.assertAlmostEqual(jw.get_raw_score('MARTHA', 'MARHTA'), 0.9861111111111112)
 
+    def test_valid_input_min_score_raw_score(self):
+        self.assertAlmostEqual(self.jw.get_raw_score('MARTHA', 'MARHTA', min_score=0.96),
+                               0.9611111111111111)
+        self.assertEqual(self.jw.get_raw_score('MARTHA', 'MARHTA', min_score=0.97), 0)
+        # the prefix bonus lifts the length bound of the Jaro score
+        self.assertAlmostEqual(self.jw.get_raw_score('AB', 'ABCDEFGHIJ', min_score=0.75),
+                               0.7866666666666667)
+        self.assertEqual(self.jw.get_raw_score('AB', 'XBCDEFGHIJ', min_score=0.75), 0)
+        jw = JaroWinkler(boost_threshold=0.8)
+        self.assertEqual(jw.get_raw_score('AB', 'ABCDEFGHIJ', min_score=0.75), 0)
+
+    def test_valid_input_top_k(self):
+        candidates = ['MARHTA', 'MARTA', 'ARTHUR', 'MARTHA', '', 'DWAYNE', 'MXRTHA']
+        scores = [self.jw.get_raw_score('MARTHA', candidate) for candidate in candidates]
+        expected = sorted(range(len(candidates)), key=lambda i: (-scores[i], i))
+        indices, top_scores = self.jw.top_k('MARTHA', candidates, 4)
+        self.assertEqual(list(indices), expected[:4])
+        self.assertEqual(list(top_scores), [scores[i] for i in expected[:4]])
+        jw = JaroWinkler(boost_threshold=0.95)
+        scores = [jw.get_raw_score('MARTHA', candidate) for candidate in candidates]
+        expected = sorted(range(len(candidates)), key=lambda i: (-scores[i], i))
+        indices, top_scores = jw.top_k('MARTHA', candidates, 4)
+        self.assertEqual(list(indices), expected[:4])
+        self.assertEqual(list(top_scores), [scores[i] for i in expected[:4]])
+
+    @raises(ValueError)
+    def test_invalid_input_top_k(self):
+        self.jw.top_k('MARTHA', ['MARHTA'], -1)
+
+    def test_get_boost_threshold(self):
+        self.assertEqual(self.jw.get_boost_threshold(), None)
+
+    def test_set_boost_threshold(self):
+        jw = JaroWinkler(boost_threshold=0.7)
+        self.assertEqual(jw.get_boost_threshold(), 0.7)
+        self.assertAlmostEqual(jw.get_raw_score('ABCD', 'ABXY'), 0.6666666666666666)
+        self.assertAlmostEqual(jw.get_raw_score('MARTHA', 'MARHTA'), 0.9611111111111111)
+        self.assertEqual(jw.set_boost_threshold(None), True)
+        self.assertEqual(jw.get_boost_threshold(), None)
+        self.assertAlmostEqual(jw.get_raw_score('ABCD', 'ABXY'), 0.7333333333333333)
+
     def test_valid_input_raw_score(self):
         # https://en.wikipedia.org/wiki/Jaro%E2%80%93Winkler_distance
         self.assertAlmostEqual(self.jw.get_raw_score('MARTHA', 'MARHTA'),
@@ -447,6 +663,10 @@ class JaroWinklerTestCases(unittest.TestCase):
         self.assertAlmostEqual(self.jw.get_raw_score('DWAYNE', 'DUANE'), 0.84)
         self.assertAlmostEqual(self.jw.get_raw_score('DIXON', 'DICKSONX'),
                                0.8133333333333332)
+        self.assertEqual(self.jw.get_raw_score('', 'MARTHA'), 0)
+        self.assertEqual(self.jw.get_raw_score('A', 'A'), 1.0)
+        self.assertAlmostEqual(self.jw.get_raw_score('MÄRTHA', 'MÄRHTA'),
+                               0.9611111111111111)
 
     def test_valid_input_sim_score(self):
         self.assertAlmostEqual(self.jw.get_sim_score('MARTHA', 'MARHTA'),
@@ -536,6 +756,160 @@ class LevenshteinTestCases(unittest.TestCase):
         self.assertEqual(self.lev.get_raw_score('distance', 'difference'), 5)
         self.assertEqual(self.lev.get_raw_score('java was neat', 'scala is great'), 7)
 
+    def test_valid_input_long_strings_raw_score(self):
+        self.assertEqual(self.lev.get_raw_score('a' * 2000, 'b' * 2000), 2000)
+        self.assertEqual(self.lev.get_raw_score('ab' * 1000, 'b' * 1000), 1000)
+        self.assertEqual(self.lev.get_raw_score('levenshtein' * 300,
+                                                'frankenstein' * 300), 1800)
+
+    def test_valid_input_word_boundary_raw_score(self):
+        # inputs around the 64 character limit of the single word kernel
+        self.assertEqual(self.lev.get_raw_score('a' * 64, 'a' * 63 + 'b'), 1)
+        self.assertEqual(self.lev.get_raw_score('a' * 65, 'a' * 64 + 'b'), 1)
+        self.assertEqual(self.lev.get_raw_score('b' + 'a' * 64, 'a' * 65), 1)
+        self.assertEqual(self.lev.get_raw_score('ab' * 64, 'ba' * 64), 2)
+        self.assertEqual(self.lev.get_raw_score('xy' * 70, 'z' + 'xy' * 70), 1)
+        # without common affixes, so that the kernels see the whole inputs
+        self.assertEqual(self.lev.get_raw_score('x' + 'a' * 62 + 'y', 'a' * 64), 2)
+        self.assertEqual(self.lev.get_raw_score('x' + 'a' * 64 + 'y', 'a' * 65), 2)
+        self.assertEqual(self.lev.get_raw_score('x' + 'ab' * 40 + 'y', 'ba' * 41), 2)
+
+    def test_valid_input_common_affixes_raw_score(self):
+        self.assertEqual(self.lev.get_raw_score('Acme Corporation Ltd', 'Acme Corporation Ltd.'), 1)
+        self.assertEqual(self.lev.get_raw_score('Acme Corp Ltd', 'Acme Corporation Ltd'), 7)
+        self.assertEqual(self.lev.get_raw_score('abcabc', 'abc'), 3)
+        self.assertEqual(self.lev.get_raw_score('aaa', 'aaaaa', max_distance=1), 2)
+        self.assertEqual(self.lev.get_raw_score('x' * 100 + 'ab' + 'y' * 100,
+                                                'x' * 100 + 'ba' + 'y' * 100, max_distance=1), 2)
+        lev = Levenshtein(ins_cost=2, del_cost=1, sub_cost=5)
+        self.assertEqual(lev.get_raw_score('Acme Corporation Ltd', 'Acme Corporation Ltd.'), 2)
+        self.assertEqual(lev.get_raw_score('prefix-a-suffix', 'prefix-b-suffix'), 3)
+        self.assertEqual(list(lev.get_raw_scores('prefix-a-suffix', ['prefix-b-suffix', 'prefix--suffix'])),
+                         [3, 1])
+        # costs whose sums are not exact are computed over the whole DP
+        # table, as the common affixes would change the last bits
+        lev = Levenshtein(ins_cost=0.1, del_cost=0.1, sub_cost=0.2)
+        self.assertEqual(lev.get_raw_score('bbbaabaab', 'b'), 0.7999999999999999)
+        self.assertEqual(lev.get_raw_score('aa', 'abbbbbbababaab'), 1.2)
+
+    def test_valid_input_unicode_raw_score(self):
+        # distances are computed over characters, not over encoded bytes
+        self.assertEqual(self.lev.get_raw_score('café', 'cafe'), 1)
+        self.assertEqual(self.lev.get_raw_score('Müller', 'Mueller'), 2)
+        self.assertEqual(self.lev.get_raw_score('東京都', '京都'), 1)
+        self.assertEqual(self.lev.get_raw_score('𝄞𝄞a', 'a𝄞'), 2)
+        self.assertEqual(self.lev.get_raw_score('é' * 100, 'e' * 100), 100)
+        self.assertEqual(self.lev.get_raw_score('Ω' + 'ab' * 50, 'ab' * 50, max_distance=2), 1)
+        self.assertEqual(self.lev.get_sim_score('café', 'cafe'), 1.0 - (1.0/4.0))
+
+    def test_valid_input_max_distance_raw_score(self):
+        self.assertEqual(self.lev.get_raw_score('levenshtein', 'frankenstein', max_distance=6), 6)
+        self.assertEqual(self.lev.get_raw_score('levenshtein', 'frankenstein', max_distance=10), 6)
+        self.assertEqual(self.lev.get_raw_score('levenshtein', 'frankenstein', max_distance=5), 6)
+        self.assertEqual(self.lev.get_raw_score('levenshtein', 'frankenstein', max_distance=2), 3)
+        self.assertEqual(self.lev.get_raw_score('example', 'samples', max_distance=3), 3)
+        self.assertEqual(self.lev.get_raw_score('a', 'abcd', max_distance=2), 3)
+        self.assertEqual(self.lev.get_raw_score('', 'ab', max_distance=2), 2)
+        self.assertEqual(self.lev.get_raw_score('', 'abc', max_distance=2), 3)
+        self.assertEqual(self.lev.get_raw_score('abc', 'abc', max_distance=0), 0)
+        self.assertEqual(self.lev.get_raw_score('abc', 'abd', max_distance=0), 1)
+        self.assertEqual(self.lev.get_raw_score('a' * 1000, 'b' * 1000, max_distance=10), 11)
+
+    def test_valid_input_min_sim_sim_score(self):
+        self.assertEqual(self.lev.get_sim_score('levenshtein', 'frankenstein', min_sim=0.5), 0.5)
+        self.assertEqual(self.lev.get_sim_score('levenshtein', 'frankenstein', min_sim=0.6), 0.0)
+        self.assertEqual(self.lev.get_sim_score('example', 'samples', min_sim=0.5), 1.0 - (3.0/7.0))
+        self.assertEqual(self.lev.get_sim_score('abcdefghij', 'abcdefghiX', min_sim=0.9), 0.9)
+        self.assertEqual(self.lev.get_sim_score('', '', min_sim=0.9), 1.0)
+        self.assertEqual(self.lev.get_sim_score('a', 'b', min_sim=0.0), 0.0)
+
+    def test_valid_input_raw_scores(self):
+        candidates = ['samples', 'example', '', 'exampel', 'e' * 100, 'café']
+        expected = [self.lev.get_raw_score('example', candidate) for candidate in candidates]
+        self.assertEqual(list(self.lev.get_raw_scores('example', candidates)), expected)
+        self.assertEqual(list(self.lev.get_raw_scores('example', candidates, n_jobs=2)), expected)
+        self.assertEqual(list(self.lev.get_raw_scores('example', candidates, n_jobs=-1)), expected)
+        self.assertEqual(list(self.lev.get_raw_scores('', ['abc', ''])), [3, 0])
+        self.assertEqual(len(self.lev.get_raw_scores('abc', [])), 0)
+        long_query = 'levenshtein' * 20
+        self.assertEqual(list(self.lev.get_raw_scores(long_query, ['frankenstein' * 20, long_query])),
+                         [self.lev.get_raw_score(long_query, 'frankenstein' * 20), 0])
+
+    def test_get_costs(self):
+        lev = Levenshtein(ins_cost=2, del_cost=3, sub_cost=4)
+        self.assertEqual(lev.get_ins_cost(), 2)
+        self.assertEqual(lev.get_del_cost(), 3)
+        self.assertEqual(lev.get_sub_cost(), 4)
+
+    def test_set_costs(self):
+        lev = Levenshtein()
+        self.assertEqual(lev.get_raw_score('abc', 'xbcd'), 2)
+        self.assertEqual(lev.set_ins_cost(2), True)
+        self.assertEqual(lev.get_ins_cost(), 2)
+        self.assertEqual(lev.get_raw_score('abc', 'xbcd'), 3)
+        self.assertEqual(lev.set_del_cost(0.5), True)
+        self.assertEqual(lev.get_del_cost(), 0.5)
+        self.assertEqual(lev.set_sub_cost(3), True)
+        self.assertEqual(lev.get_sub_cost(), 3)
+        self.assertEqual(lev.get_raw_score('abc', 'xbcd'), 4.5)
+
+    def test_valid_input_weighted_raw_score(self):
+        self.assertEqual(Levenshtein(sub_cost=1.5).get_raw_score('example', 'samples'), 3.5)
+        self.assertEqual(Levenshtein(sub_cost=2).get_raw_score('a', 'b'), 2)
+        self.assertEqual(Levenshtein(sub_cost=3).get_raw_score('a', 'b'), 2)
+        self.assertEqual(Levenshtein(ins_cost=2).get_raw_score('a', 'ab'), 2)
+        self.assertEqual(Levenshtein(ins_cost=2).get_raw_score('ab', 'a'), 1)
+        self.assertEqual(Levenshtein(del_cost=0.5).get_raw_score('abc', ''), 1.5)
+        self.assertEqual(Levenshtein(ins_cost=0.5).get_raw_score('', 'abc'), 1.5)
+        self.assertEqual(Levenshtein(2, 2, 2).get_raw_score('levenshtein', 'frankenstein'), 12)
+        self.assertEqual(Levenshtein(2, 2, 2).get_raw_score('levenshtein' * 10, 'frankenstein' * 10), 120)
+        self.assertEqual(Levenshtein(ins_cost=2).get_raw_score('levenshtein', 'frankenstein', max_distance=3), 4)
+        self.assertEqual(Levenshtein(ins_cost=0.5).get_raw_score('a', 'abcdefgh', max_distance=4), 3.5)
+        self.assertEqual(Levenshtein(ins_cost=0.5).get_raw_score('a', 'abcdefgh', max_distance=3), 4)
+        self.assertEqual(list(Levenshtein(sub_cost=1.5).get_raw_scores('example', ['samples', 'example', ''])),
+                         [3.5, 0, 7])
+        self.assertEqual(list(Levenshtein(2, 2, 2).get_raw_scores('example', ['samples', ''])), [6, 14])
+
+    def test_valid_input_weighted_sim_score(self):
+        lev = Levenshtein(sub_cost=1.5)
+        self.assertEqual(lev.get_sim_score('example', 'samples'), 1.0 - (3.5/10.5))
+        self.assertEqual(lev.get_sim_score('example', 'samples', min_sim=0.6), 1.0 - (3.5/10.5))
+        self.assertEqual(lev.get_sim_score('example', 'samples', min_sim=0.7), 0.0)
+        self.assertEqual(Levenshtein(ins_cost=2).get_sim_score('a', 'ab'), 1.0 - (2.0/3.0))
+        self.assertEqual(Levenshtein(2, 2, 2).get_sim_score('example', 'samples'), 1.0 - (3.0/7.0))
+
+    @raises(ValueError)
+    def test_invalid_costs(self):
+        Levenshtein(ins_cost=-1)
+
+    @raises(ValueError)
+    def test_invalid_set_sub_cost(self):
+        Levenshtein().set_sub_cost(-0.5)
+
+    @raises(TypeError)
+    def test_invalid_input1_raw_scores(self):
+        self.lev.get_raw_scores(None, ['a'])
+
+    @raises(TypeError)
+    def test_invalid_input2_raw_scores(self):
+        self.lev.get_raw_scores('a', ['b', None])
+
+    @raises(TypeError)
+    def test_invalid_input3_raw_scores(self):
+        self.lev.get_raw_scores('a', None)
+
+    @raises(ValueError)
+    def test_invalid_n_jobs_raw_scores(self):
+        self.lev.get_raw_scores('a', ['b'], n_jobs=0)
+
+    @raises(ValueError)
+    def test_invalid_max_distance_raw_score(self):
+        self.lev.get_raw_score('a', 'b', max_distance=-1)
+
+    @raises(TypeError)
+    def test_invalid_input_min_sim_sim_score(self):
+        self.lev.get_sim_score('a', None, min_sim=0.5)
+
     def test_valid_input_sim_score(self):
         self.assertEqual(self.lev.get_sim_score('a', ''), 1.0 - (1.0/1.0))
         self.assertEqual(self.lev.get_sim_score('', 'a'), 1.0 - (1.0/1.0))
@@ -612,6 +986,59 @@ class LevenshteinTestCases(unittest.TestCase):
         self.lev.get_sim_score(12.90, 12.90)
 
 
+class DamerauLevenshteinTestCases(unittest.TestCase):
+    def setUp(self):
+        self.dl = DamerauLevenshtein()
+
+    def test_valid_input_raw_score(self):
+        self.assertEqual(self.dl.get_raw_score('a', ''), 1)
+        self.assertEqual(self.dl.get_raw_score('', 'a'), 1)
+        self.assertEqual(self.dl.get_raw_score('', ''), 0)
+        self.assertEqual(self.dl.get_raw_score('abc', 'abc'), 0)
+        self.assertEqual(self.dl.get_raw_score('ab', 'ba'), 1)
+        self.assertEqual(self.dl.get_raw_score('abcd', 'acbd'), 1)
+        self.assertEqual(self.dl.get_raw_score('MARTHA', 'MARHTA'), 1)
+        self.assertEqual(self.dl.get_raw_score('abcdef', 'badcfe'), 3)
+        self.assertEqual(self.dl.get_raw_score('example', 'samples'), 3)
+        self.assertEqual(self.dl.get_raw_score('levenshtein', 'frankenstein'), 6)
+        # optimal string alignment does not edit a transposed pair again
+        self.assertEqual(self.dl.get_raw_score('ca', 'abc'), 3)
+        self.assertEqual(self.dl.get_raw_score('café', 'caéf'), 1)
+        self.assertEqual(self.dl.get_raw_score('ab' * 100, 'ba' * 100), 2)
+
+    def test_valid_input_sim_score(self):
+        self.assertEqual(self.dl.get_sim_score('a', ''), 0.0)
+        self.assertEqual(self.dl.get_sim_score('', ''), 1.0)
+        self.assertEqual(self.dl.get_sim_score('abc', 'abc'), 1.0)
+        self.assertEqual(self.dl.get_sim_score('abcd', 'acbd'), 1.0 - (1.0/4.0))
+        self.assertEqual(self.dl.get_sim_score('MARTHA', 'MARHTA'), 1.0 - (1.0/6.0))
+        self.assertEqual(self.dl.get_sim_score('example', 'samples'), 1.0 - (3.0/7.0))
+
+    @raises(TypeError)
+    def test_invalid_input1_raw_score(self):
+        self.dl.get_raw_score('a', None)
+
+    @raises(TypeError)
+    def test_invalid_input2_raw_score(self):
+        self.dl.get_raw_score(None, 'b')
+
+    @raises(TypeError)
+    def test_invalid_input3_raw_score(self):
+        self.dl.get_raw_score('MARHTA', 12.90)
+
+    @raises(TypeError)
+    def test_invalid_input4_raw_score(self):
+        self.dl.get_raw_score(12.90, 12.90)
+
+    @raises(TypeError)
+    def test_invalid_input1_sim_score(self):
+        self.dl.get_sim_score('a', None)
+
+    @raises(TypeError)
+    def test_invalid_input2_sim_score(self):
+        self.dl.get_sim_score(12.90, 'MARTHA')
+
+
 class HammingDistanceTestCases(unittest.TestCase):
     def setUp(self):
         self.hd = HammingDistance()
@@ -760,6 +1187,149 @@ class NeedlemanWunschTestCases(unittest.TestCase):
         self.assertEqual(self.nw_with_params3.get_raw_score('GCATGCUA', 'GATTACA'),
                          2.5)
 
+    def test_valid_input_common_affixes(self):
+        self.assertEqual(self.nw.get_raw_score('Acme Corporation Ltd', 'Acme Corporation Ltd.'), 19.0)
+        self.assertEqual(self.nw.get_raw_score('prefix-dva-suffix', 'prefix-deeva-suffix'), 15.0)
+        self.assertEqual(self.nw.get_raw_score('abcabc', 'abc'), 0.0)
+        self.assertEqual(self.nw.get_raw_score('abc', 'abc'), 3.0)
+        self.assertEqual(self.nw_with_params1.get_raw_score('abcabc', 'abc'), 3.0)
+        self.assertEqual(NeedlemanWunsch(gap_cost=-1.0).get_raw_score('ab', 'ab'), 4.0)
+        # gap costs whose sums are not exact are scored over the whole DP
+        # table, as the identity given as a lambda function is
+        nw = NeedlemanWunsch(gap_cost=2.2)
+        nw_lambda = NeedlemanWunsch(gap_cost=2.2, sim_func=lambda s1, s2: int(s1 == s2))
+        self.assertEqual(nw.get_raw_score('aa', 'aabaaabaaabaaaaaa'), -30.999999999999993)
+        for string1, string2 in [('aa', 'aabaaabaaabaaaaaa'), ('aabbbaaab', 'a'), ('baba', 'aabbaabbaba')]:
+            self.assertEqual(nw.get_raw_score(string1, string2), nw_lambda.get_raw_score(string1, string2))
+            self.assertEqual(list(nw.get_raw_scores([string1], [string2])),
+                             [nw_lambda.get_raw_score(string1, string2)])
+
+    def test_valid_input_substitution_matrix(self):
+        sm = SubstitutionMatrix.from_dict({('a', 'a'): 2, ('a', 'e'): 1.5, ('e', 'a'): -1, ('e', 'e'): 2})
+        nw = NeedlemanWunsch(1.0, sim_func=sm)
+        self.assertEqual(nw.get_raw_score('a', 'ex'), 0.5)
+        self.assertEqual(nw.get_raw_score('ex', 'a'), -1.0)
+        self.assertEqual(nw.get_raw_score('dva', 'deeva'), 2.0)
+        # characters outside of the alphabet are scored by the fallback
+        dna = SubstitutionMatrix.identity('ACGT', 2, -1)
+        self.assertEqual(NeedlemanWunsch(0.5, sim_func=dna).get_raw_score('GCATGCNA', 'GATTACA'),
+                         NeedlemanWunsch(0.5, sim_func=lambda s1, s2: (2 if s1 == s2 else -1)).get_raw_score(
+                             'GCATGCNA', 'GATTACA'))
+
+    def test_valid_input_long_strings(self):
+        # long strings are aligned one anti-diagonal at a time, unless
+        # sim_func has to be called
+        dna = SubstitutionMatrix.identity('ACGT', 2, -1)
+        self.assertEqual(NeedlemanWunsch(0.5).get_raw_score('GATTACA' * 12, 'GCATGCT' * 10), 27.0)
+        self.assertEqual(NeedlemanWunsch(0.5, sim_func=dna).get_raw_score('GATTACA' * 12, 'GCATGCT' * 10), 49.0)
+        self.assertEqual(NeedlemanWunsch(0.5, sim_func=dna).get_raw_score('GATTACA' * 12 + 'N', 'GCATGCT' * 10),
+                         48.5)
+
+    def test_valid_input_band(self):
+        # alignments leaving the band are not scored, unless the band is
+        # adaptive
+        string1 = 'GATTACA' * 12
+        string2 = 'GCATGCT' * 10
+        self.assertEqual(NeedlemanWunsch(band=0).get_raw_score('abcdef', 'bcdefa'), 0.0)
+        self.assertEqual(NeedlemanWunsch(band=1).get_raw_score('abcdef', 'bcdefa'), 3.0)
+        self.assertEqual(NeedlemanWunsch(band='adaptive').get_raw_score('abcdef', 'bcdefa'), 3.0)
+        for band in [0, 4, 200, 'adaptive']:
+            self.assertEqual(NeedlemanWunsch(0.5, band=band).get_raw_score(string1, string2), 27.0)
+            self.assertEqual(NeedlemanWunsch(0.5, sim_func=self.sim_func, band=band).get_raw_score(string1, string2),
+                             7.0)
+            self.assertEqual(NeedlemanWunsch(0.5, sim_func=self.sim_func, band=band).get_raw_score(string2, string1),
+                             7.0)
+
+    def test_set_band(self):
+        nw = NeedlemanWunsch(band=0)
+        self.assertEqual(nw.get_band(), 0)
+        self.assertEqual(nw.get_raw_score('abcdef', 'bcdefa'), 0.0)
+        self.assertEqual(nw.set_band('adaptive'), True)
+        self.assertEqual(nw.get_band(), 'adaptive')
+        self.assertEqual(nw.get_raw_score('abcdef', 'bcdefa'), 3.0)
+
+    @raises(ValueError)
+    def test_invalid_band1(self):
+        NeedlemanWunsch(band=-1)
+
+    @raises(ValueError)
+    def test_invalid_band2(self):
+        self.nw.set_band('auto')
+
+    def test_valid_input_raw_scores(self):
+        # the scores are those of get_raw_score, pair by pair
+        dna = SubstitutionMatrix.identity('ACGT', 2, -1)
+        strings1 = ['dva', 'GCATGCUA', '', 'd𝄞va', 'GATTACA' * 12, 'GCATGCNA']
+        strings2 = ['deeva', 'GATTACA', 'abc', 'de𝄞a', 'GCATGCT' * 10, 'GATTACA']
+        for nw in [self.nw, self.nw_with_params1, self.nw_with_params2, NeedlemanWunsch(0.5, sim_func=dna),
+                   NeedlemanWunsch(band=1), NeedlemanWunsch(band='adaptive')]:
+            expected = [nw.get_raw_score(string1, string2) for string1, string2 in zip(strings1, strings2)]
+            self.assertEqual(list(nw.get_raw_scores(strings1, strings2)), expected)
+            self.assertEqual(list(nw.get_raw_scores(strings1, strings2, n_jobs=-1)), expected)
+            self.assertEqual(list(nw.get_raw_scores('dva', strings2)),
+                             [nw.get_raw_score('dva', string2) for string2 in strings2])
+        self.assertEqual(len(self.nw.get_raw_scores('dva', [])), 0)
+
+    @raises(TypeError)
+    def test_invalid_input1_raw_scores(self):
+        self.nw.get_raw_scores(None, ['dva'])
+
+    @raises(ValueError)
+    def test_invalid_input2_raw_scores(self):
+        self.nw.get_raw_scores(['dva', 'deeva'], ['dva'])
+
+    @raises(ValueError)
+    def test_invalid_n_jobs_raw_scores(self):
+        self.nw.get_raw_scores('dva', ['deeva'], n_jobs=0)
+
+    def test_align(self):
+        self.assertEqual(self.nw.align('dva', 'deeva'),
+                         (1.0, [('equal', 0, 1, 0, 1), ('insert', 1, 1, 1, 3), ('equal', 1, 3, 3, 5)]))
+        self.assertEqual(self.nw.align('d𝄞va', 'de𝄞a'),
+                         (2.0, [('equal', 0, 1, 0, 1), ('replace', 1, 3, 1, 3), ('equal', 3, 4, 3, 4)]))
+        self.assertEqual(self.nw.align('', 'abc'), (-3.0, [('insert', 0, 0, 0, 3)]))
+        self.assertEqual(self.nw.align('abc', ''), (-3.0, [('delete', 0, 3, 0, 0)]))
+        self.assertEqual(self.nw.align('', ''), (0.0, []))
+
+    def test_align_with_band(self):
+        # the band is too narrow for the optimal alignment, which align
+        # finds and scores over the whole DP table anyway
+        nw = NeedlemanWunsch(band=0)
+        self.assertEqual(nw.get_raw_score('abcdef', 'bcdefa'), 0.0)
+        self.assertEqual(nw.align('abcdef', 'bcdefa'),
+                         (3.0, [('delete', 0, 1, 0, 0), ('equal', 1, 6, 0, 5), ('insert', 6, 6, 5, 6)]))
+
+    def test_align_long_strings(self):
+        # long strings are split in halves before being traced back
+        string1 = 'GATTACA' * 40 + 'GCATGCU' * 20
+        string2 = 'GCATGCU' * 25 + 'GATTACA' * 30
+        for nw in [self.nw, self.nw_with_params2, self.nw_with_params3]:
+            score, opcodes = nw.align(string1, string2)
+            self.assertEqual(score, nw.get_raw_score(string1, string2))
+            # the opcodes cover both strings, and the alignment they
+            # describe has the score of the strings
+            alignment_score = 0
+            i = j = 0
+            for tag, i1, i2, j1, j2 in opcodes:
+                self.assertEqual((i1, j1), (i, j))
+                if tag in ('equal', 'replace'):
+                    self.assertEqual(i2 - i1, j2 - j1)
+                    alignment_score += sum(nw.get_sim_func()(string1[k], string2[k - i1 + j1])
+                                           for k in range(i1, i2))
+                else:
+                    alignment_score -= nw.get_gap_cost() * (i2 - i1 + j2 - j1)
+                i, j = i2, j2
+            self.assertEqual((i, j), (len(string1), len(string2)))
+            self.assertAlmostEqual(alignment_score, score)
+
+    @raises(TypeError)
+    def test_invalid_input1_align(self):
+        self.nw.align('a', None)
+
+    @raises(TypeError)
+    def test_invalid_input2_align(self):
+        self.nw.align(['a'], 'b')
+
     @raises(TypeError)
     def test_invalid_input1_raw_score(self):
         self.nw.get_raw_score('a', None)
@@ -830,6 +1400,131 @@ class SmithWatermanTestCases(unittest.TestCase):
         self.assertEqual(self.sw_with_params4.get_raw_score('GCATAGCU', 'GATTACA'),
                          6.5)
 
+    def test_valid_input_substitution_matrix(self):
+        sm = SubstitutionMatrix.from_dict({('a', 'a'): 2, ('a', 'e'): 1.5, ('e', 'a'): -1, ('e', 'e'): 2})
+        sw = SmithWaterman(1.0, sim_func=sm)
+        self.assertEqual(sw.get_raw_score('a', 'ex'), 1.5)
+        self.assertEqual(sw.get_raw_score('ex', 'a'), 0)
+        self.assertEqual(sw.get_raw_score('dva', 'deeva'), 3.0)
+        sm = SubstitutionMatrix.from_function('GCATU', self.sim_func)
+        self.assertEqual(SmithWaterman(gap_cost=1.4, sim_func=sm).get_raw_score('GCATAGCU', 'GATTACA'), 6.5)
+
+    def test_valid_input_long_strings(self):
+        # long strings are aligned one anti-diagonal at a time, unless
+        # sim_func has to be called
+        dna = SubstitutionMatrix.identity('ACGT', 2, -1)
+        self.assertEqual(SmithWaterman(1).get_raw_score('GATTACA' * 12, 'GCATGCT' * 10), 30.0)
+        self.assertEqual(SmithWaterman(1, sim_func=dna).get_raw_score('GATTACA' * 12, 'GCATGCT' * 10), 42.0)
+        self.assertEqual(SmithWaterman(1, sim_func=dna).get_raw_score('GATTACA' * 12, 'GCATGCT' * 10 + 'N'), 42.0)
+
+    def test_valid_input_min_score(self):
+        # the computation stops once the score is known to reach min_score,
+        # or not to
+        string1 = 'GATTACA' * 12
+        string2 = 'xyz' + 'GATTACA' * 3 + 'GCATGCT' * 10 + 'GATTACA' * 2
+        self.assertEqual(self.sw.get_raw_score('cat', 'hat', min_score=2), 2.0)
+        self.assertEqual(self.sw.get_raw_score('cat', 'hat', min_score=2.5), 0.0)
+        self.assertEqual(self.sw.get_raw_score(string1, string2, min_score=10), 10.0)
+        self.assertEqual(self.sw.get_raw_score(string1, string2, min_score=48), 48.0)
+        self.assertEqual(self.sw.get_raw_score(string1, string2, min_score=100), 0.0)
+        self.assertEqual(self.sw_with_params2.get_raw_score(string1, string2, min_score=100), 101.0)
+        self.assertEqual(self.sw_with_params2.get_raw_score(string2, string1, min_score=102), 0.0)
+        self.assertEqual(self.sw.get_raw_score('', 'cat', min_score=1), 0.0)
+
+    def test_valid_input_x_drop(self):
+        # alignments are not extended through cells more than x_drop below
+        # the best score seen
+        string1 = 'GATTACA' * 12
+        string2 = 'xyz' + 'GATTACA' * 3 + 'GCATGCT' * 10 + 'GATTACA' * 2
+        self.assertEqual(self.sw_with_params2.get_raw_score(string1, string2, x_drop=1000), 101.0)
+        self.assertEqual(self.sw_with_params2.get_raw_score(string1, string2, x_drop=3), 82.0)
+        self.assertEqual(self.sw_with_params2.get_raw_score(string1, string2, x_drop=0), 44.0)
+        self.assertEqual(self.sw_with_params2.get_raw_score(string1, string2, min_score=50, x_drop=3), 50.0)
+        self.assertEqual(self.sw_with_params2.get_raw_score(string1, string2, min_score=90, x_drop=3), 0.0)
+        self.assertEqual(self.sw.get_raw_score(string1, string2, x_drop=3), 48.0)
+        self.assertEqual(self.sw.get_raw_score('cat', 'hat', x_drop=0), 2.0)
+
+    @raises(ValueError)
+    def test_invalid_x_drop(self):
+        self.sw.get_raw_score('cat', 'hat', x_drop=-1)
+
+    def test_scan(self):
+        self.assertEqual(list(self.sw.scan('cat', 'the cat and the hat', 2)),
+                         [(6, 2.0), (7, 3.0), (8, 2.0), (19, 2.0)])
+        self.assertEqual(list(self.sw.scan('cat', ['the c', 'at and the h', 'at'], 3)), [(7, 3.0)])
+        self.assertEqual(list(self.sw.scan(['cat', 'and', 'dog'], iter(['the cat ', 'and the hat']), 3)),
+                         [(0, 7, 3.0), (1, 11, 3.0)])
+        self.assertEqual(list(self.sw.scan('cat', '', 1)), [])
+        self.assertEqual(list(self.sw.scan([], 'the cat', 1)), [])
+
+    def test_scan_long_text(self):
+        # the best score of the scan is the measure of the pattern against
+        # the whole text
+        dna = SubstitutionMatrix.identity('ACGT', 2, -1)
+        text = 'GCATGCT' * 100 + 'GATTACA' + 'GCATGCT' * 100
+        chunks = [text[i:i + 64] for i in range(0, len(text), 64)]
+        for sw in [self.sw, self.sw_with_params2, self.sw_with_params4, SmithWaterman(1, sim_func=dna)]:
+            hits = list(sw.scan(['GATTACA', 'TTAC'], chunks, 4))
+            for index, pattern in enumerate(['GATTACA', 'TTAC']):
+                self.assertEqual(max(score for hit_index, end, score in hits if hit_index == index),
+                                 sw.get_raw_score(pattern, text))
+        self.assertEqual([hit for hit in self.sw.scan('GATTACA', chunks, 7)], [(707, 7.0)])
+
+    def test_scan_many_characters(self):
+        # once the profile is full, the scores of the other characters of
+        # the text are computed each time they are met
+        text = ''.join(six.unichr(0x4e00 + i % 3000) + 'cat'[i % 3] for i in range(6000))
+        chunks = [text[i:i + 1000] for i in range(0, len(text), 1000)]
+        sims = SubstitutionMatrix.identity('act', 2, -1)
+        for sim_func in [None, sims]:
+            expected = SmithWatermanScanner(['cat', 'tac'], 1.0, 1.0, sim_func).feed(text)
+            scanner = SmithWatermanScanner(['cat', 'tac'], 1.0, 1.0, sim_func, 70)
+            hits = []
+            for chunk in chunks:
+                hits.extend(scanner.feed(chunk))
+            self.assertEqual(scanner.num_columns, 10)
+            self.assertEqual(hits, expected)
+        pattern = 'GATTACA' * 200
+        hits = list(self.sw.scan(pattern, [text, 'GATTACA' * 5], 1))
+        self.assertEqual(max(score for end, score in hits), self.sw.get_raw_score(pattern, text + 'GATTACA' * 5))
+
+    @raises(TypeError)
+    def test_invalid_input1_scan(self):
+        self.sw.scan(None, 'text', 1)
+
+    @raises(TypeError)
+    def test_invalid_input2_scan(self):
+        self.sw.scan(['a', 1], 'text', 1)
+
+    @raises(TypeError)
+    def test_invalid_input3_scan(self):
+        list(self.sw.scan('a', ['text', None], 1))
+
+    @raises(ValueError)
+    def test_invalid_input4_scan(self):
+        self.sw.scan('a', 'text', 0)
+
+    def test_valid_input_raw_scores(self):
+        # the scores are those of get_raw_score, pair by pair
+        dna = SubstitutionMatrix.identity('ACGT', 2, -1)
+        strings1 = ['cat', 'dva', 'GCATAGCU', '', 'GATTACA' * 12, 'GCATGCNA']
+        strings2 = ['hat', 'deeve', 'GATTACA', 'abc', 'GCATGCT' * 10, 'GATTACA']
+        for sw in [self.sw, self.sw_with_params1, self.sw_with_params2, self.sw_with_params4,
+                   SmithWaterman(1, sim_func=dna)]:
+            expected = [sw.get_raw_score(string1, string2) for string1, string2 in zip(strings1, strings2)]
+            self.assertEqual(list(sw.get_raw_scores(strings1, strings2)), expected)
+            self.assertEqual(list(sw.get_raw_scores(strings1, strings2, n_jobs=-1)), expected)
+            self.assertEqual(list(sw.get_raw_scores('cat', strings2)),
+                             [sw.get_raw_score('cat', string2) for string2 in strings2])
+
+    @raises(TypeError)
+    def test_invalid_input1_raw_scores(self):
+        self.sw.get_raw_scores('cat', ['hat', None])
+
+    @raises(ValueError)
+    def test_invalid_input2_raw_scores(self):
+        self.sw.get_raw_scores(['cat'], ['hat', 'cat'])
+
     @raises(TypeError)
     def test_invalid_input1_raw_score(self):
         self.sw.get_raw_score('a', None)
@@ -855,6 +1550,52 @@ class SmithWatermanTestCases(unittest.TestCase):
         self.sw.get_raw_score(12, 12)
 
 
+class SubstitutionMatrixTestCases(unittest.TestCase):
+    def setUp(self):
+        self.sim_func = lambda s1, s2: (2 if s1 == s2 else -1)
+        self.sm = SubstitutionMatrix('ab', [[1, -2], [0.5, 3]])
+
+    def test_valid_input(self):
+        self.assertEqual(self.sm('a', 'b'), -2.0)
+        self.assertEqual(self.sm('b', 'a'), 0.5)
+        self.assertEqual(self.sm('b', 'b'), 3.0)
+        self.assertEqual(self.sm('c', 'c'), 1)
+        self.assertEqual(self.sm('a', 'c'), 0)
+
+    def test_from_dict(self):
+        sm = SubstitutionMatrix.from_dict({('a', 'e'): 1.5, ('e', 'a'): -1}, self.sim_func)
+        self.assertEqual(sm.get_alphabet(), 'ae')
+        self.assertEqual(sm.get_table().tolist(), [[2.0, 1.5], [-1.0, 2.0]])
+        self.assertEqual(sm('x', 'y'), -1)
+
+    def test_from_function(self):
+        sm = SubstitutionMatrix.from_function('ACGT', self.sim_func)
+        self.assertEqual(sm.get_alphabet(), 'ACGT')
+        self.assertEqual(sm.get_sim_func(), self.sim_func)
+        for char1 in 'ACGTN':
+            for char2 in 'ACGTN':
+                self.assertEqual(sm(char1, char2), self.sim_func(char1, char2))
+
+    def test_identity(self):
+        sm = SubstitutionMatrix.identity(['é', '𝄞'], 2, -1)
+        self.assertEqual(sm('é', 'é'), 2.0)
+        self.assertEqual(sm('𝄞', 'é'), -1.0)
+        self.assertEqual(sm('x', 'x'), 2)
+        self.assertEqual(sm('x', 'y'), -1)
+
+    @raises(ValueError)
+    def test_invalid_alphabet1(self):
+        SubstitutionMatrix('aba', [[0] * 3] * 3)
+
+    @raises(TypeError)
+    def test_invalid_alphabet2(self):
+        SubstitutionMatrix(['ab', 'c'], [[0] * 2] * 2)
+
+    @raises(ValueError)
+    def test_invalid_table(self):
+        SubstitutionMatrix('abc', [[0] * 3] * 2)
+
+
 class SoundexTestCases(unittest.TestCase):
     def setUp(self):
         self.sdx = Soundex()
@@ -1,4 +1,5 @@
 import functools
+import multiprocessing
 
 import six
 
@@ -45,6 +46,28 @@ def sim_check_tversky_parameters(alpha, beta):
             raise ValueError('Tversky parameters should be greater than or equal to zero')
 
 
+def sim_check_for_non_negative_costs(*args):
+    for cost in args:
+        if cost < 0:
+            raise ValueError('Costs should be greater than or equal to zero')
+
+
+def sim_check_for_band(band):
+    if band is not None and band != 'adaptive':
+        if not isinstance(band, six.integer_types) or band < 0:
+            raise ValueError('band should be None, "adaptive" or an integer greater than or equal to zero')
+
+
+def get_band_arguments(band):
+    # band and adaptive arguments of the compiled alignment functions, for
+    # the band parameter of NeedlemanWunsch and Affine
+    if band is None:
+        return -1, False
+    if band == 'adaptive':
+        return 0, True
+    return band, False
+
+
 def sim_check_for_exact_match(*args):
     if args[0] == args[1]:
         return True
@@ -66,6 +89,97 @@ def tok_check_for_none(*args):
         raise TypeError("First argument cannot be None")
 
 
+def get_num_threads(n_jobs):
+    # n_jobs follows the joblib convention: -1 means all CPUs, -2 all CPUs
+    # but one, and so on.
+    if n_jobs == 0:
+        raise ValueError('n_jobs cannot be zero')
+    if n_jobs < 0:
+        return max(multiprocessing.cpu_count() + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def get_string_pairs(strings1, strings2):
+    # Checks the inputs of the batch scores of the alignment measures, a
+    # string and a list of strings or two lists of strings of the same
+    # length, and returns them with the lists as Python lists.
+    sim_check_for_none(strings1, strings2)
+    strings2 = list(strings2)
+    if isinstance(strings1, six.string_types):
+        tok_check_for_string_input(strings1, *strings2)
+        return strings1, strings2
+    strings1 = list(strings1)
+    sim_check_for_same_len(strings1, strings2)
+    tok_check_for_string_input(*(strings1 + strings2))
+    return strings1, strings2
+
+
+def get_max_pair_length(strings1, strings2):
+    # Bound on the sum of the lengths of the strings of a pair, for the
+    # pairs returned by get_string_pairs.
+    if isinstance(strings1, six.string_types):
+        max_len1 = len(strings1)
+    else:
+        max_len1 = max([0] + [len(string1) for string1 in strings1])
+    return max_len1 + max([0] + [len(string2) for string2 in strings2])
+
+
+def get_common_affix_lengths(string1, string2):
+    # Lengths of the common prefix and of the common suffix of two strings.
+    # The suffix is only looked for in what is left after the prefix, so
+    # that the two never overlap.
+    min_len = min(len(string1), len(string2))
+    prefix_len = 0
+    while prefix_len < min_len and string1[prefix_len] == string2[prefix_len]:
+        prefix_len += 1
+    suffix_len = 0
+    while (suffix_len < min_len - prefix_len and
+           string1[-suffix_len - 1] == string2[-suffix_len - 1]):
+        suffix_len += 1
+    return prefix_len, suffix_len
+
+
+def has_exact_sums(costs, num_terms):
+    # True if the sums of at most num_terms values among costs, 0 and 1 are
+    # exact in floating point, so that they do not depend on the order of
+    # the additions: the costs are multiples of 1 / 1024 and the sums stay
+    # below 2 ** 43. Scoring the common prefix and suffix of two strings
+    # apart from the rest of the DP table only gives the same float as the
+    # whole table when this holds.
+    largest = 1.0
+    for cost in costs:
+        cost = float(cost)
+        if not (cost * 1024).is_integer():
+            return False
+        largest = max(largest, abs(cost))
+    return num_terms * largest < 2.0 ** 43
+
+
+def add_distance_slack(bound, scale):
+    # bound widened by a small slack relative to scale, the magnitude of the
+    # distances compared with it. With costs whose sums are not exact, the
+    # same distance computed by adding the costs in different orders differs
+    # in its last bits, so the triangle inequality that prunes a BK-tree and
+    # the growth of the DP rows that prunes a trie only hold up to a few
+    # ulps. The indexes prune with the widened bounds, and check the strings
+    # they keep against the exact ones.
+    return bound + 1e-9 * scale
+
+
+def get_sim_func_with_min_score(sim_func, min_score):
+    # The raw scores of Jaro and Jaro-Winkler can skip the pairs that cannot
+    # reach a minimum score, which callers only keeping scores above a
+    # threshold pass along. Other similarity functions are left as they are.
+    from py_stringmatching.similarity_measure.jaro import Jaro
+    from py_stringmatching.similarity_measure.jaro_winkler import JaroWinkler
+    if (isinstance(getattr(sim_func, '__self__', None), (Jaro, JaroWinkler)) and
+            six.get_method_function(sim_func) in (
+                six.get_unbound_function(Jaro.get_raw_score),
+                six.get_unbound_function(JaroWinkler.get_raw_score))):
+        return functools.partial(sim_func, min_score=min_score)
+    return sim_func
+
+
 def convert_bag_to_set(input_list):
     seen_tokens = {}
     output_set =[]
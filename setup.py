@@ -41,10 +41,39 @@ if __name__ == "__main__":
         # Generate Cython sources, unless building from source release
         generate_cython()
 
+    # OpenMP is used by the batch kernels to run without the GIL on several
+    # threads. Without it (e.g. Apple clang) these kernels run on one thread.
+    if sys.platform == 'win32':
+        openmp_compile_args = ['/openmp']
+        openmp_link_args = []
+    elif sys.platform == 'darwin':
+        openmp_compile_args = []
+        openmp_link_args = []
+    else:
+        openmp_compile_args = ['-fopenmp']
+        openmp_link_args = ['-fopenmp']
+
     # specify extensions that need to be compiled
     extensions = [Extension("py_stringmatching.similarity_measure.cython_levenshtein",
                             ["py_stringmatching/similarity_measure/cython_levenshtein.c"],
-                            include_dirs=[numpy.get_include()])]
+                            include_dirs=[numpy.get_include()],
+                            extra_compile_args=openmp_compile_args,
+                            extra_link_args=openmp_link_args),
+                  Extension("py_stringmatching.similarity_measure.cython_jaro",
+                            ["py_stringmatching/similarity_measure/cython_jaro.c"],
+                            include_dirs=[numpy.get_include()],
+                            extra_compile_args=openmp_compile_args,
+                            extra_link_args=openmp_link_args),
+                  Extension("py_stringmatching.similarity_measure.cython_alignment",
+                            ["py_stringmatching/similarity_measure/cython_alignment.c"],
+                            include_dirs=[numpy.get_include()],
+                            extra_compile_args=openmp_compile_args,
+                            extra_link_args=openmp_link_args),
+                  Extension("py_stringmatching.similarity_measure.cython_editex",
+                            ["py_stringmatching/similarity_measure/cython_editex.c"],
+                            include_dirs=[numpy.get_include()],
+                            extra_compile_args=openmp_compile_args,
+                            extra_link_args=openmp_link_args)]
 
     # find packages to be included. exclude benchmarks.
     packages = find_packages(exclude=["benchmarks"])